@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status
 
 from schema.auth import AuthResponse, SigninRequest, SignupRequest
+from services.password_hasher import password_hasher
 from services.state import state
 
 router = APIRouter(tags=["Auth"])
@@ -8,8 +9,11 @@ router = APIRouter(tags=["Auth"])
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def signup(data: SignupRequest):
+    if state.get_user_by_email(data.email) is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email уже зарегистрирован")
+    password_hash = await password_hasher.hash(data.password)
     try:
-        state.create_user(email=data.email, password=data.password)
+        state.create_user(email=data.email, password_hash=password_hash)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email уже зарегистрирован")
     return {"message": "Пользователь успешно создан"}
@@ -17,7 +21,7 @@ async def signup(data: SignupRequest):
 
 @router.post("/signin", response_model=AuthResponse)
 async def signin(data: SigninRequest):
-    token = state.authenticate(email=data.email, password=data.password)
-    if token is None:
+    user = state.get_user_by_email(data.email)
+    if user is None or not await password_hasher.verify(data.password, user["password_hash"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверная пара email/пароль")
-    return AuthResponse(token=token)
+    return AuthResponse(token=state.create_session(email=data.email))
@@ -1,76 +1,172 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from functools import partial
+from typing import AsyncIterator, Optional
 
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from core.etag import IfMatch, board_etag, if_match_versions, not_modified
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NDJSON, page, wants_ndjson
 from core.security import get_current_user
-from models.user_role import UserRole
-from schema.dashboard import BoardFull, BoardListItem, CreateBoardRequest, UpdateBoardRequest
+from exceptions import ValidationException
+from schema.dashboard import BoardChanges, BoardFull, BoardListItem, CreateBoardRequest, UpdateBoardRequest
 from schema.role import BoardMember
 from schema.sticker import Sticker
-from services.state import state
+from services.backend import BoardBackend, get_backend, open_backend
+from services.board_payload import sticker_json, stickers_json
+from services.board_hub import board_hub
+from services.presence_hub import presence_hub
 
 router = APIRouter(prefix="/boards", tags=["Boards"])
 
 
-def _get_board_or_404(board_id: str) -> dict:
-    board = state.get_board(board_id)
-    if board is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Доска не найдена")
-    return board
-
-
-def _require_member(board: dict, user_id: str) -> str:
-    role = board["members"].get(user_id)
-    if not role:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к доске")
-    return role
-
-
 @router.get("", response_model=list[BoardListItem])
-async def list_boards(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    result = []
-    for board in state.boards.values():
-        role = board["members"].get(user_id)
-        if role:
-            result.append(BoardListItem(id=board["id"], name=board["name"], role=role))
-    return result
+async def list_boards(
+    request: Request,
+    response: Response,
+    after: Optional[str] = Query(default=None, description="id последней доски предыдущей страницы"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы; без него все"),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    if limit is None:
+        boards = await backend.list_boards(current_user["id"], after)
+    else:
+        boards, headers = page(request, await backend.list_boards(current_user["id"], after, limit + 1), limit)
+        response.headers.update(headers)
+    return [BoardListItem(**board) for board in boards]
 
 
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=BoardFull)
-async def create_board(data: CreateBoardRequest, current_user: dict = Depends(get_current_user)):
-    board = state.add_board(name=data.name, creator_id=current_user["id"])
-    return BoardFull(id=board["id"], name=board["name"], role="creator", stickers=[])
-
-
-@router.get("/{board_id}", response_model=BoardFull)
-async def get_board(board_id: str, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(board_id)
-    role = _require_member(board, current_user["id"])
-    stickers = [Sticker(**state.stickers[sid]) for sid in board.get("stickers", [])]
-    return BoardFull(id=board["id"], name=board["name"], role=role, stickers=stickers)
+async def create_board(
+    data: CreateBoardRequest,
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    return BoardFull(**await backend.create_board(current_user["id"], data.name))
+
+
+@router.get(
+    "/{board_id}",
+    response_model=BoardFull,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Версия из If-None-Match актуальна"}},
+)
+async def get_board(
+    board_id: str,
+    if_none_match: str | None = Header(default=None),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    if if_none_match is not None:
+        # сначала только версия: при совпадении стикеры не читаются вовсе
+        version = await backend.get_board_version(board_id, current_user["id"])
+        if not_modified(if_none_match, version):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": board_etag(version)})
+    # JSON собран бэкендом (в памяти — из кэша): без повторной валидации по response_model
+    version, payload = await backend.get_board_json(board_id, current_user["id"])
+    return Response(payload, media_type="application/json", headers={"ETag": board_etag(version)})
 
 
 @router.put("/{board_id}", response_model=BoardFull)
-async def update_board(board_id: str, data: UpdateBoardRequest, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(board_id)
-    role = _require_member(board, current_user["id"])
-    if role == UserRole.VIEWER:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет прав вносить изменения")
-    board["name"] = data.name
-    stickers = [Sticker(**state.stickers[sid]) for sid in board.get("stickers", [])]
-    return BoardFull(id=board["id"], name=board["name"], role=role, stickers=stickers)
+async def update_board(
+    board_id: str,
+    data: UpdateBoardRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    board = await backend.rename_board(board_id, current_user["id"], data.name, if_match=if_match)
+    backend.after_commit(partial(board_hub.publish, board_id, {"type": "board.renamed", "name": board["name"]}))
+    return Response(
+        backend.encode_board(board), media_type="application/json", headers={"ETag": board_etag(board["version"])}
+    )
 
 
 @router.delete("/{board_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_board(board_id: str, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(board_id)
-    if board["creator_id"] != current_user["id"]:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Только creator может удалить доску")
-    state.delete_board(board_id)
+async def delete_board(
+    board_id: str,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    await backend.delete_board(board_id, current_user["id"], if_match=if_match)
+    backend.after_commit(partial(board_hub.close_board, board_id))
+    backend.after_commit(partial(presence_hub.close_board, board_id))
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+@router.get(
+    "/{board_id}/stickers",
+    response_model=list[Sticker],
+    responses={status.HTTP_200_OK: {"content": {NDJSON: {}}}},
+)
+async def list_board_stickers(
+    board_id: str,
+    request: Request,
+    x0: Optional[float] = Query(default=None, description="Левая граница области"),
+    y0: Optional[float] = Query(default=None, description="Верхняя граница области"),
+    x1: Optional[float] = Query(default=None, description="Правая граница области"),
+    y1: Optional[float] = Query(default=None, description="Нижняя граница области"),
+    after: Optional[str] = Query(default=None, description="id последнего стикера предыдущей страницы"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    """Стикеры в области (x0, y0, x1, y1) либо вся доска по возрастанию id.
+
+    Без области выдача постраничная (``after`` / ``limit``, следующая
+    страница — в заголовке Link), а с ``Accept: application/x-ndjson`` —
+    потоком по стикеру на строку с серверного курсора.
+    """
+    viewport = (x0, y0, x1, y1)
+    if any(bound is not None for bound in viewport):
+        if any(bound is None for bound in viewport):
+            raise ValidationException("Область задаётся всеми четырьмя границами x0, y0, x1, y1")
+        stickers = await backend.query_stickers(board_id, current_user["id"], x0, y0, x1, y1)
+        return [Sticker(**sticker) for sticker in stickers]
+    if wants_ndjson(request):
+        # права проверяются до начала ответа: посреди потока статус уже не поменять
+        await backend.get_board_version(board_id, current_user["id"])
+        return StreamingResponse(_stream_stickers(board_id, current_user["id"], after, limit), media_type=NDJSON)
+    limit = limit or DEFAULT_PAGE_SIZE
+    stickers, headers = page(
+        request, await backend.list_stickers(board_id, current_user["id"], after, limit + 1), limit
+    )
+    return Response(
+        stickers_json([sticker_json(sticker) for sticker in stickers]), media_type="application/json", headers=headers
+    )
+
+
+async def _stream_stickers(
+    board_id: str, user_id: str, after: Optional[str], limit: Optional[int]
+) -> AsyncIterator[bytes]:
+    # сессия запроса закрывается до отправки тела, поэтому у потока своя
+    async with open_backend(user_id) as backend:
+        async for stickers in backend.stream_stickers(board_id, user_id, after, limit):
+            yield b"".join([sticker_json(sticker) + b"\n" for sticker in stickers])
+
+
+@router.get("/{board_id}/changes", response_model=BoardChanges)
+async def get_board_changes(
+    board_id: str,
+    response: Response,
+    since: int = Query(..., ge=0, description="Версия доски (ETag), известная клиенту"),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    changes = await backend.get_changes(board_id, current_user["id"], since)
+    response.headers["ETag"] = board_etag(changes["version"])
+    members = changes.pop("members", {})
+    return BoardChanges(
+        **changes,
+        members=[BoardMember(user_id=uid, role=role) for uid, role in members.items()],
+    )
+
+
 @router.get("/{board_id}/members", response_model=list[BoardMember])
-async def list_members(board_id: str, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(board_id)
-    _require_member(board, current_user["id"])
-    return [BoardMember(user_id=uid, role=role) for uid, role in board["members"].items()]
+async def list_members(
+    board_id: str,
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    members = await backend.list_members(board_id, current_user["id"])
+    return [BoardMember(user_id=uid, role=role) for uid, role in members.items()]
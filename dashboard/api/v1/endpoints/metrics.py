@@ -0,0 +1,48 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from config.config import settings
+from core import security
+from services.board_hub import board_hub
+from services.password_hasher import password_hasher
+from services.presence_hub import presence_hub
+from services.state import state
+
+
+def require_metrics_token(authorization: str | None = Header(default=None)) -> None:
+    """Пропускает запрос, если токен метрик не задан или совпал с Bearer-токеном."""
+    token = settings.metrics.token
+    if token and not hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Требуется авторизация")
+
+
+# внутренние счётчики: подключается только с metrics.enabled и не попадает в OpenAPI
+router = APIRouter(tags=["Metrics"], dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Счётчики внутренних компонентов сервиса."""
+    metrics = {
+        "sessions": state.sessions.stats(),
+        "passwords": password_hasher.stats(),
+        "realtime": board_hub.stats(),
+        "presence": presence_hub.stats(),
+    }
+    if security.jwt_verifier is not None:
+        metrics["jwt"] = security.jwt_verifier.stats()
+    if settings.storage.backend == "database":
+        from repository.role_cache import role_cache
+        from repository import db_helper
+        from repository.group_commit import group_commit
+        from repository.write_buffer import sticker_write_buffer
+
+        metrics["roles"] = role_cache.stats()
+        if db_helper.replicas:
+            metrics["db"] = db_helper.stats()
+        if sticker_write_buffer is not None:
+            metrics["write_behind"] = sticker_write_buffer.stats()
+        if group_commit is not None:
+            metrics["group_commit"] = group_commit.stats()
+    return metrics
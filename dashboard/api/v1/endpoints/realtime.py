@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Query, WebSocket
+
+from core.security import user_from_token
+from exceptions import DashboardException
+from services.backend import open_backend
+from services.board_hub import board_hub
+from services.presence_hub import presence_hub
+
+router = APIRouter(prefix="/boards", tags=["Realtime"])
+
+# Код закрытия для ошибок доступа: 4000 + HTTP-статус
+CLOSE_CODE_BASE = 4000
+
+
+async def _authorize(websocket: WebSocket, board_id: str, token: str | None) -> str | None:
+    """Принимает соединение участника доски; иначе закрывает его с кодом 4401/4403/4404."""
+    await websocket.accept()
+    authorization = websocket.headers.get("authorization", "")
+    if token is None and authorization.startswith("Bearer "):
+        token = authorization.split(" ", 1)[1]
+    user = user_from_token(token) if token else None
+    if user is None:
+        await websocket.close(code=CLOSE_CODE_BASE + 401, reason="Неверный токен")
+        return None
+    try:
+        async with open_backend(user["id"]) as backend:
+            await backend.get_board_version(board_id, user["id"])
+    except DashboardException as e:
+        await websocket.close(code=CLOSE_CODE_BASE + e.status_code, reason=e.message)
+        return None
+    return user["id"]
+
+
+@router.websocket("/{board_id}/ws")
+async def board_updates(
+    websocket: WebSocket,
+    board_id: str,
+    token: str | None = Query(default=None, description="Токен, если клиент не может передать Authorization"),
+):
+    """Изменения стикеров, участников и доски в реальном времени.
+
+    Кадр — ``{"events": [...]}``, события: ``sticker.created``,
+    ``sticker.updated``, ``sticker.deleted``, ``member.updated``,
+    ``member.removed``, ``board.renamed``, ``board.deleted``.
+    """
+    user_id = await _authorize(websocket, board_id, token)
+    if user_id is not None:
+        await board_hub.serve(board_id, user_id, websocket)
+
+
+@router.websocket("/{board_id}/presence")
+async def board_presence(
+    websocket: WebSocket,
+    board_id: str,
+    token: str | None = Query(default=None, description="Токен, если клиент не может передать Authorization"),
+):
+    """Курсоры и присутствие на доске; ничего не сохраняется.
+
+    Клиент шлёт ``{"type": "cursor", "x": ..., "y": ...}`` и, если курсор
+    не двигается, любое сообщение (например ``{"type": "ping"}``) хотя бы раз
+    в ``presence.idle_timeout``. Первый кадр — ``presence.snapshot``, дальше
+    ``presence.joined``, ``presence.left`` и ``cursor.moved`` не чаще раза
+    за ``presence.coalesce_window`` на пользователя.
+    """
+    user_id = await _authorize(websocket, board_id, token)
+    if user_id is not None:
+        await presence_hub.serve(board_id, user_id, websocket)
@@ -1,10 +1,14 @@
+from functools import partial
+
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 
+from core.etag import IfMatch, if_match_versions
 from core.security import get_current_user
-from models.user_role import UserRole
 from schema.role import BoardMember, InviteRequest, UpdateRoleRequest
+from services.backend import BoardBackend, get_backend
+from services.board_hub import board_hub
+from services.presence_hub import presence_hub
 from services.state import state
-from .dashboards import _get_board_or_404, _require_member
 
 router = APIRouter(prefix="/boards", tags=["Boards"])
 
@@ -14,15 +18,14 @@ async def update_member_role(
     board_id: str,
     user_id: str,
     data: UpdateRoleRequest,
+    if_match: IfMatch = Depends(if_match_versions),
     current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
 ):
-    board = _get_board_or_404(board_id)
-    role = _require_member(board, current_user["id"])
-    if role != UserRole.CREATOR:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Только creator может менять роли")
-    if user_id not in board["members"]:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
-    board["members"][user_id] = data.role
+    await backend.update_member_role(board_id, current_user["id"], user_id, data.role, if_match=if_match)
+    backend.after_commit(partial(
+        board_hub.publish, board_id, {"type": "member.updated", "user_id": user_id, "role": data.role}
+    ))
     return BoardMember(user_id=user_id, role=data.role)
 
 
@@ -30,34 +33,36 @@ async def update_member_role(
 async def invite_user(
     board_id: str,
     data: InviteRequest,
+    if_match: IfMatch = Depends(if_match_versions),
     current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
 ):
-    board = _get_board_or_404(board_id)
-    role = _require_member(board, current_user["id"])
-
-    if role != UserRole.CREATOR:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Только creator может приглашать")
-
     user = state.get_user_by_email(data.email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь с таким email не найден")
 
-    if user["id"] == current_user["id"]:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Нельзя пригласить самого себя")
-
-    state.set_member_role(board_id, user["id"], data.role)
+    await backend.invite_member(board_id, current_user["id"], user["id"], data.role, if_match=if_match)
+    backend.after_commit(partial(
+        board_hub.publish, board_id, {"type": "member.updated", "user_id": user["id"], "role": data.role}
+    ))
     return {"message": "Пользователь приглашен"}
 
 
 @router.delete("/{board_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_member(board_id: str, user_id: str, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(board_id)
-    role = _require_member(board, current_user["id"])
-    if role != UserRole.CREATOR:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет прав на удаление")
-    if user_id == board["creator_id"]:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нельзя удалить создателя")
-    removed = state.remove_member(board_id, user_id)
-    if not removed:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найден")
+async def delete_member(
+    board_id: str,
+    user_id: str,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    await backend.remove_member(board_id, current_user["id"], user_id, if_match=if_match)
+    backend.after_commit(partial(_member_removed, board_id, user_id))
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def _member_removed(board_id: str, user_id: str) -> None:
+    board_hub.publish(board_id, {"type": "member.removed", "user_id": user_id})
+    # права проверяются при подключении — открытые сокеты удалённого участника закрываем
+    board_hub.remove_member(board_id, user_id)
+    presence_hub.remove_member(board_id, user_id)
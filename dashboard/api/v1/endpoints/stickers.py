@@ -1,55 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from functools import partial
 
+from fastapi import APIRouter, Depends, Response, status
+
+from core.etag import IfMatch, if_match_versions
 from core.security import get_current_user
-from models.user_role import UserRole
-from schema.sticker import CreateStickerRequest, Sticker, UpdateStickerRequest
-from services.state import state
-from .dashboards import _get_board_or_404, _require_member
+from schema.sticker import (
+    BatchCreateStickersRequest,
+    BatchDeleteStickersRequest,
+    BatchItemResult,
+    BatchResponse,
+    BatchUpdateStickersRequest,
+    CreateStickerRequest,
+    PatchStickerRequest,
+    Sticker,
+    UpdateStickerRequest,
+)
+from services.backend import BoardBackend, get_backend
+from services.board_hub import board_hub
 
 router = APIRouter(prefix="/stickers", tags=["Stickers"])
 
 
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=Sticker)
-async def create_sticker(data: CreateStickerRequest, current_user: dict = Depends(get_current_user)):
-    board = _get_board_or_404(data.dashboard_id)
-    role = _require_member(board, current_user["id"])
-    if role == UserRole.VIEWER:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет прав редактировать доску")
-    sticker = state.add_sticker(data.dashboard_id, data.model_dump())
-    return Sticker(**sticker)
+async def create_sticker(
+    data: CreateStickerRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    sticker = Sticker(**await backend.create_sticker(current_user["id"], data.model_dump(), if_match=if_match))
+    backend.after_commit(partial(
+        board_hub.publish, sticker.dashboard_id, {"type": "sticker.created", "sticker": sticker.model_dump()}
+    ))
+    return sticker
 
 
 @router.get("/{sticker_id}", response_model=Sticker)
-async def get_sticker(sticker_id: str, current_user: dict = Depends(get_current_user)):
-    sticker = state.stickers.get(sticker_id)
-    if sticker is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найден")
-    board = _get_board_or_404(sticker["dashboard_id"])
-    _require_member(board, current_user["id"])
-    return Sticker(**sticker)
+async def get_sticker(
+    sticker_id: str,
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    return Sticker(**await backend.get_sticker(sticker_id, current_user["id"]))
 
 
 @router.put("/{sticker_id}", response_model=Sticker)
-async def update_sticker(sticker_id: str, data: UpdateStickerRequest, current_user: dict = Depends(get_current_user)):
-    sticker = state.stickers.get(sticker_id)
-    if sticker is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найден")
-    board = _get_board_or_404(sticker["dashboard_id"])
-    role = _require_member(board, current_user["id"])
-    if role == UserRole.VIEWER:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет прав редактировать")
-    updated = state.update_sticker(sticker_id, data.model_dump())
-    return Sticker(**updated)
+async def update_sticker(
+    sticker_id: str,
+    data: UpdateStickerRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    sticker = Sticker(**await backend.update_sticker(
+        sticker_id, current_user["id"], data.model_dump(), if_match=if_match
+    ))
+    backend.after_commit(partial(
+        board_hub.publish, sticker.dashboard_id, {"type": "sticker.updated", "sticker": sticker.model_dump()}
+    ))
+    return sticker
+
+
+@router.patch("/{sticker_id}", response_model=Sticker)
+async def patch_sticker(
+    sticker_id: str,
+    data: PatchStickerRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    sticker = Sticker(**await backend.update_sticker(sticker_id, current_user["id"], data.changes(), if_match=if_match))
+    backend.after_commit(partial(
+        board_hub.publish, sticker.dashboard_id, {"type": "sticker.updated", "sticker": sticker.model_dump()}
+    ))
+    return sticker
 
 
 @router.delete("/{sticker_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_sticker(sticker_id: str, current_user: dict = Depends(get_current_user)):
-    sticker = state.stickers.get(sticker_id)
-    if sticker is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найден")
-    board = _get_board_or_404(sticker["dashboard_id"])
-    role = _require_member(board, current_user["id"])
-    if role == UserRole.VIEWER:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа")
-    state.remove_sticker(sticker_id)
+async def delete_sticker(
+    sticker_id: str,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    board_id = await backend.delete_sticker(sticker_id, current_user["id"], if_match=if_match)
+    backend.after_commit(partial(board_hub.publish, board_id, {"type": "sticker.deleted", "id": sticker_id}))
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Пачки операций над стикерами одной доски: права проверяются один раз,
+# изменения применяются атомарно, результат — по каждому элементу.
+
+@router.post(":batch", response_model=BatchResponse)
+async def create_stickers(
+    data: BatchCreateStickersRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    stickers = await backend.create_stickers(
+        data.dashboard_id, current_user["id"], [item.model_dump() for item in data.stickers], if_match=if_match
+    )
+    results = [
+        BatchItemResult(id=sticker["id"], status=status.HTTP_201_CREATED, sticker=Sticker(**sticker))
+        for sticker in stickers
+    ]
+    for result in results:
+        backend.after_commit(partial(
+            board_hub.publish, data.dashboard_id, {"type": "sticker.created", "sticker": result.sticker.model_dump()}
+        ))
+    return BatchResponse(results=results)
+
+
+@router.patch(":batch", response_model=BatchResponse)
+async def update_stickers(
+    data: BatchUpdateStickersRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    stickers = await backend.update_stickers(
+        data.dashboard_id, current_user["id"], [{"id": item.id, **item.changes()} for item in data.stickers],
+        if_match=if_match,
+    )
+    results = [
+        BatchItemResult(id=item.id, status=status.HTTP_200_OK, sticker=Sticker(**sticker))
+        if sticker is not None else BatchItemResult(id=item.id, status=status.HTTP_404_NOT_FOUND)
+        for item, sticker in zip(data.stickers, stickers)
+    ]
+    for result in results:
+        if result.sticker is not None:
+            backend.after_commit(partial(
+                board_hub.publish, data.dashboard_id, {"type": "sticker.updated", "sticker": result.sticker.model_dump()}
+            ))
+    return BatchResponse(results=results)
+
+
+@router.delete(":batch", response_model=BatchResponse)
+async def delete_stickers(
+    data: BatchDeleteStickersRequest,
+    if_match: IfMatch = Depends(if_match_versions),
+    current_user: dict = Depends(get_current_user),
+    backend: BoardBackend = Depends(get_backend),
+):
+    deleted = await backend.delete_stickers(data.dashboard_id, current_user["id"], data.ids, if_match=if_match)
+    for sticker_id, ok in zip(data.ids, deleted):
+        if ok:
+            backend.after_commit(partial(
+                board_hub.publish, data.dashboard_id, {"type": "sticker.deleted", "id": sticker_id}
+            ))
+    return BatchResponse(results=[
+        BatchItemResult(
+            id=sticker_id,
+            status=status.HTTP_204_NO_CONTENT if ok else status.HTTP_404_NOT_FOUND,
+        )
+        for sticker_id, ok in zip(data.ids, deleted)
+    ])
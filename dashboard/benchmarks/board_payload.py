@@ -0,0 +1,105 @@
+"""GET /boards/{id}: готовый JSON из кэша против прежней сборки через pydantic.
+
+    python benchmarks/board_payload.py --stickers 10000 --store dict
+
+Оба пути обслуживает FastAPI в одном процессе и с одним State. Прежний путь
+(как до кэша) собирает ``Sticker`` на каждый стикер и отдаёт ``BoardFull``
+через ``response_model``; текущий — ручка сервиса. Меряются первый запрос,
+повторный без изменений и запрос после правки одного стикера.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stickers", type=int, default=10_000)
+    parser.add_argument("--store", choices=["dict", "compact"], default="dict")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # настройки читаются при импорте сервиса
+    os.environ.update({
+        "STORAGE__BACKEND": "memory",
+        "WEB_CONCURRENCY": "1",
+        "PASSWORDS__ITERATIONS": "1000",
+        "STATE__STICKER_STORE": args.store,
+    })
+    os.chdir(ROOT)
+    from fastapi import APIRouter, FastAPI
+    from fastapi.testclient import TestClient
+
+    import main as service
+    from schema.dashboard import BoardFull
+    from schema.sticker import Sticker
+    from services.state import state
+
+    legacy = APIRouter()
+
+    @legacy.get("/legacy/{board_id}", response_model=BoardFull)
+    async def legacy_board(board_id: str):
+        board = state.get_board(board_id)
+        stickers = [Sticker(**state.stickers[sid]) for sid in board["stickers"]]
+        return BoardFull(id=board["id"], name=board["name"], role="creator", stickers=stickers)
+
+    legacy_app = FastAPI()
+    legacy_app.include_router(legacy)
+
+    with TestClient(service.app) as client, TestClient(legacy_app) as legacy_client:
+        credentials = {"email": "bench@example.com", "password": "benchmark"}
+        client.post("/signup", json=credentials)
+        headers = {"Authorization": "Bearer " + client.post("/signin", json=credentials).json()["token"]}
+        board_id = client.post("/boards", json={"name": "bench"}, headers=headers).json()["id"]
+        rnd = random.Random(1)
+        stickers = state.add_stickers(board_id, [
+            {
+                "dashboard_id": board_id,
+                "x": rnd.uniform(0, 1e4),
+                "y": rnd.uniform(0, 1e4),
+                "text": f"sticker text {i}",
+                "width": 120.0,
+                "height": 80.0,
+                "color": "#ffcc00",
+            }
+            for i in range(args.stickers)
+        ])
+
+        def timed(http, url: str, **kwargs) -> float:
+            started = time.perf_counter()
+            response = http.get(url, **kwargs)
+            elapsed = (time.perf_counter() - started) * 1000
+            assert response.status_code == 200, response.text
+            return elapsed
+
+        def measure(http, url: str, **kwargs) -> tuple:
+            first = timed(http, url, **kwargs)
+            unchanged = [timed(http, url, **kwargs) for _ in range(args.repeat)]
+            edited = []
+            for i in range(args.repeat):
+                state.update_sticker(stickers[i % len(stickers)]["id"], {"x": float(i)})
+                edited.append(timed(http, url, **kwargs))
+            return first, statistics.median(unchanged), statistics.median(edited)
+
+        size = len(client.get(f"/boards/{board_id}", headers=headers).content)
+        # первый запрос — с пустым кэшем, как после перезапуска
+        state.board_payloads.clear()
+        state.sticker_payloads.clear()
+        legacy_times = measure(legacy_client, f"/legacy/{board_id}")
+        current_times = measure(client, f"/boards/{board_id}", headers=headers)
+
+    print(f"{args.stickers} стикеров ({args.store}), ответ {size / 1e6:.2f} МБ; мс, повтор и правка — медианы")
+    print(f"{'':10s} {'первый':>8s} {'повтор':>8s} {'правка':>8s}")
+    for label, (first, unchanged, edited) in (("pydantic", legacy_times), ("кэш", current_times)):
+        print(f"{label:10s} {first:8.1f} {unchanged:8.1f} {edited:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
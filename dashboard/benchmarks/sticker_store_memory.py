@@ -0,0 +1,61 @@
+"""Память хранилищ стикеров: dict против compact на одном наборе стикеров.
+
+    python benchmarks/sticker_store_memory.py --stickers 1000000
+
+Стикеры собираются внутри замера со своими строками и числами, как после
+разбора JSON запроса; считается память, которая остаётся занятой после
+заполнения хранилища (tracemalloc).
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.sticker_store import STICKER_STORES  # noqa: E402
+
+COLORS = ["ffeb3b", "8bc34a", "03a9f4", "ff5722", "9c27b0"]
+
+
+def fill(kind: str, stickers: int, boards: list) -> tuple:
+    rnd = random.Random(1)
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = STICKER_STORES[kind]()
+    for i in range(stickers):
+        store.add({
+            "id": str(uuid.uuid4()),
+            "dashboard_id": "".join(boards[i % len(boards)]),
+            "x": rnd.uniform(0, 4000),
+            "y": rnd.uniform(0, 3000),
+            "text": "",
+            "width": rnd.uniform(100, 300),
+            "height": rnd.uniform(80, 200),
+            "color": f"#{COLORS[i % len(COLORS)]}",
+        })
+    elapsed = time.perf_counter() - started
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stickers", type=int, default=1_000_000)
+    parser.add_argument("--boards", type=int, default=1000)
+    args = parser.parse_args()
+
+    # id досок — отдельные символы, чтобы "".join давал новую строку на каждый стикер
+    boards = [list(str(uuid.uuid4())) for _ in range(args.boards)]
+    print(f"{args.stickers} стикеров на {args.boards} досках")
+    for kind in STICKER_STORES:
+        used, elapsed = fill(kind, args.stickers, boards)
+        print(f"{kind:8s} {used / args.stickers:7.1f} Б/стикер  {used / 2**20:8.1f} МиБ  заполнение {elapsed:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
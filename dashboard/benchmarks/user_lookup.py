@@ -0,0 +1,93 @@
+"""Поиск пользователя по email: хэш-индекс UserStore и индекс lower(email) в SQL против перебора.
+
+    python benchmarks/user_lookup.py --sizes 1000 10000 100000 1000000
+
+Запросы идут в другом регистре и с пробелами, как их присылает клиент.
+Перебор (так искал старый AuthService) меряется только до ``--scan-limit``
+пользователей: дальше он занимает минуты. SQL-колонка — запросы
+``AuthDbContext`` к таблице ``users`` services/auth в SQLite в памяти.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from services.auth import AuthDbContext, Base, User  # noqa: E402
+from services.user_store import UserStore, normalize_email  # noqa: E402
+
+
+def fill(size: int) -> UserStore:
+    users = UserStore()
+    for i in range(size):
+        users.add({"id": str(i), "email": f"user{i}@example.com", "password_hash": ""})
+    return users
+
+
+def fill_sql(size: int) -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    session.execute(insert(User), [
+        {"id": uuid.uuid4(), "email": f"user{i}@example.com", "password_hash": ""} for i in range(size)
+    ])
+    session.commit()
+    return session
+
+
+def per_lookup(lookup, queries: list) -> float:
+    started = time.perf_counter()
+    for email in queries:
+        if lookup(email) is None:
+            raise AssertionError(email)
+    return (time.perf_counter() - started) / len(queries)
+
+
+async def per_sql_lookup(context: AuthDbContext, queries: list) -> float:
+    started = time.perf_counter()
+    for email in queries:
+        if await context.users_find_by_email_async(email) is None:
+            raise AssertionError(email)
+    return (time.perf_counter() - started) / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--scan-limit", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    plan = None
+    print(f"{'польз.':>9s} {'индекс':>11s} {'перебор':>11s} {'sql lower':>11s}")
+    for size in args.sizes:
+        users = fill(size)
+        queries = [f" User{rnd.randrange(size)}@Example.COM " for _ in range(args.lookups)]
+        indexed = per_lookup(users.get_by_email, queries)
+        scan = "-"
+        if size <= args.scan_limit:
+            def by_scan(email: str):
+                key = normalize_email(email)
+                return next((user for user in users if user["email"].lower() == key), None)
+            # перебор медленный: на него хватает небольшой части запросов
+            scan = f"{per_lookup(by_scan, queries[:max(10, args.lookups * 1000 // size)]) * 1e6:8.1f} мкс"
+        session = fill_sql(size)
+        sql = asyncio.run(per_sql_lookup(AuthDbContext(session), queries))
+        plan = session.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM users WHERE lower(email) = :email"), {"email": "x"}
+        ).all()[-1][-1]
+        session.close()
+        print(f"{size:9d} {indexed * 1e6:7.2f} мкс {scan:>11s} {sql * 1e6:7.2f} мкс")
+    print("план SQLite:", plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Нагрузка на /boards/{id}/ws: тысячи клиентов на одном воркере uvicorn.
+
+    python benchmarks/ws_fanout.py --clients 2000 --boards 20 --moves 300
+
+Скрипт поднимает сервис (хранилище в памяти) на отдельном порту, подключает
+клиентов поровну к доскам и двигает по стикеру на каждой доске. Меряются
+задержка от PATCH до клиента, число доставленных событий против рассылки
+без схлопывания и память сервера. Нужны ``httpx`` и ``websockets``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def rss_mb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        return int(status.read().split("VmRSS:")[1].split()[0]) // 1024
+
+
+async def run(args: argparse.Namespace, server: subprocess.Popen) -> None:
+    base = f"127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=f"http://{base}") as client:
+        for _ in range(100):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        credentials = {"email": "bench@example.com", "password": "benchmark"}
+        await client.post("/signup", json=credentials)
+        token = (await client.post("/signin", json=credentials)).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        boards = [(await client.post("/boards", json={"name": f"b{i}"}, headers=headers)).json()["id"]
+                  for i in range(args.boards)]
+        stickers = [
+            (await client.post("/stickers", headers=headers, json={
+                "dashboard_id": board_id, "x": 0, "y": 0, "text": "t", "width": 1, "height": 1, "color": "#fff",
+            })).json()["id"]
+            for board_id in boards
+        ]
+
+        rss_before = rss_mb(server.pid)
+        started = time.perf_counter()
+        sockets = [
+            await websockets.connect(f"ws://{base}/boards/{boards[i % args.boards]}/ws?token={token}", max_queue=None)
+            for i in range(args.clients)
+        ]
+        print(f"{args.clients} клиентов на {args.boards} досках подключены за {time.perf_counter() - started:.1f} с, "
+              f"RSS сервера {rss_before} -> {rss_mb(server.pid)} МБ")
+
+        received = [0] * args.clients
+        last_x = [None] * args.clients
+        sent_at = {}
+        latencies = []
+
+        async def read(index: int, websocket) -> None:
+            board = index % args.boards
+            try:
+                async for message in websocket:
+                    now = time.perf_counter()
+                    for event in json.loads(message)["events"]:
+                        received[index] += 1
+                        last_x[index] = event["sticker"]["x"]
+                        sent = sent_at.get((board, last_x[index]))
+                        if sent is not None:
+                            latencies.append(now - sent)
+            except websockets.ConnectionClosed:
+                pass
+
+        readers = [asyncio.create_task(read(i, websocket)) for i, websocket in enumerate(sockets)]
+
+        started = time.perf_counter()
+        for move in range(args.moves):
+            for board, sticker_id in enumerate(stickers):
+                sent_at[(board, float(move))] = time.perf_counter()
+                await client.patch(f"/stickers/{sticker_id}", json={"x": move}, headers=headers)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(1.0)
+
+        patches = args.moves * args.boards
+        final = sum(x == args.moves - 1 for x in last_x)
+        latencies.sort()
+        print(f"{patches} PATCH за {elapsed:.1f} с ({patches / elapsed:.0f}/с) при рассылке {args.clients} клиентам")
+        print(f"доставлено событий {sum(received)} (без схлопывания {args.moves * args.clients}); "
+              f"в конечном состоянии {final}/{args.clients} клиентов")
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[len(latencies) * 95 // 100] * 1000
+            print(f"задержка PATCH -> клиент: p50 {p50:.0f} мс, p95 {p95:.0f} мс")
+        print("хаб:", (await client.get("/metrics")).json()["realtime"], f"RSS сервера {rss_mb(server.pid)} МБ")
+
+        for websocket in sockets:
+            await websocket.close()
+        await asyncio.gather(*readers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--boards", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=300)
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    # по сокету на клиента с обеих сторон
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 4 * args.clients + 1024)), hard))
+    env = {**os.environ, "STORAGE__BACKEND": "memory", "WEB_CONCURRENCY": "1", "PASSWORDS__ITERATIONS": "1000",
+           "METRICS__ENABLED": "true"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        asyncio.run(run(args, server))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from typing import FrozenSet, Optional
+
+from fastapi import Header
+
+# Версии доски, с которыми согласна запись; None — заголовка нет (или "*")
+IfMatch = Optional[FrozenSet[int]]
+
+
+def board_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _versions(header: str, weak: bool) -> FrozenSet[int]:
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            # слабые теги годятся только для If-None-Match (RFC 9110, 13.1.1)
+            if not weak:
+                continue
+            tag = tag[2:]
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return frozenset(versions)
+
+
+def if_match_versions(if_match: str | None = Header(default=None)) -> IfMatch:
+    """Разбирает If-Match для записи в доску; непонятные теги не совпадают ни с чем."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    return _versions(if_match, weak=False)
+
+
+def not_modified(if_none_match: Optional[str], version: int) -> bool:
+    """True, если клиент уже видел эту версию доски и можно ответить 304."""
+    if if_none_match is None:
+        return False
+    return if_none_match.strip() == "*" or version in _versions(if_none_match, weak=True)
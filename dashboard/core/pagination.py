@@ -0,0 +1,26 @@
+from typing import Dict, List, Tuple
+
+from fastapi import Request
+
+# Наибольший размер страницы и размер по умолчанию для стикеров доски
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 500
+
+NDJSON = "application/x-ndjson"
+
+
+def page(request: Request, items: List[dict], limit: int) -> Tuple[List[dict], Dict[str, str]]:
+    """Страница из выборки ``limit + 1`` элементов и заголовки ответа к ней.
+
+    Лишний элемент означает, что выборка не закончилась: в ответ уходит
+    ``Link: <...?after=<id последнего>>; rel="next"``.
+    """
+    if len(items) <= limit:
+        return items, {}
+    items = items[:limit]
+    url = request.url.include_query_params(after=items[-1]["id"], limit=limit)
+    return items, {"Link": f'<{url}>; rel="next"'}
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
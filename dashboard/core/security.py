@@ -1,15 +1,40 @@
+from typing import Optional
+
 from fastapi import Header, HTTPException, status
 
+from config.config import settings
+from core.token_verifier import JwtVerifier
 from services.state import state
 
+jwt_verifier: Optional[JwtVerifier] = (
+    JwtVerifier(
+        secret_key=settings.jwt.secret_key,
+        issuer=settings.jwt.issuer,
+        audience=settings.jwt.audience,
+        algorithms=[settings.jwt.algorithm],
+        cache_size=settings.jwt.cache_size,
+        leeway=settings.jwt.leeway,
+    )
+    if settings.jwt.enabled
+    else None
+)
+
+
+def user_from_token(token: str) -> Optional[dict]:
+    """Пользователь по токену: JWT от AuthServer или сессия State (если локальный вход включён)."""
+    if jwt_verifier is not None and token.count(".") == 2:
+        return jwt_verifier.verify(token)
+    if not settings.storage.local_auth:
+        return None
+    return state.get_user_by_token(token)
+
 
 def get_current_user(authorization: str | None = Header(default=None)) -> dict:
     """Извлекает пользователя из токена Bearer."""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Требуется авторизация")
 
-    token = authorization.split(" ", 1)[1]
-    user = state.get_user_by_token(token)
+    user = user_from_token(authorization.split(" ", 1)[1])
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен")
     return user
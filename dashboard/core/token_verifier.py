@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+import jwt
+
+# .NET JwtSecurityTokenHandler пишет ClaimTypes.NameIdentifier как "nameid"
+USER_ID_CLAIMS = ("sub", "nameid", "http://schemas.xmlsoap.org/ws/2005/05/identity/claims/nameidentifier")
+EMAIL_CLAIMS = ("email", "http://schemas.xmlsoap.org/ws/2005/05/identity/claims/emailaddress")
+
+
+class JwtVerifier:
+    """Локальная проверка JWT, выданных AuthServer, с LRU-кэшем проверенных токенов.
+
+    Ключ кэша — SHA-256 от токена, значение — пользователь и ``exp``.
+    Повторный запрос с тем же токеном обходится без HMAC и разбора JSON,
+    а истёкший токен выбрасывается из кэша при первом обращении.
+    """
+
+    def __init__(
+        self,
+        secret_key: str,
+        issuer: str,
+        audience: str,
+        algorithms: Sequence[str] = ("HS256",),
+        cache_size: int = 10000,
+        leeway: float = 0,
+    ) -> None:
+        self.secret_key = secret_key
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = list(algorithms)
+        self.cache_size = cache_size
+        self.leeway = leeway
+        self._cache: OrderedDict[bytes, Tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Возвращает ``{"id", "email"}`` владельца токена или None."""
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                user, expires_at = cached
+                if expires_at + self.leeway > now:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return user
+                del self._cache[key]
+            self.misses += 1
+
+        try:
+            claims = jwt.decode(
+                token,
+                self.secret_key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp"]},
+            )
+        except jwt.PyJWTError:
+            self.rejected += 1
+            return None
+        user_id = _user_id(claims)
+        if user_id is None:
+            self.rejected += 1
+            return None
+        user = {"id": user_id, "email": _first_claim(claims, EMAIL_CLAIMS)}
+
+        with self._lock:
+            self._cache[key] = (user, float(claims["exp"]))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
+
+
+def _user_id(claims: dict) -> Optional[str]:
+    """Id пользователя в каноническом виде; None, если его нет или это не UUID."""
+    user_id = _first_claim(claims, USER_ID_CLAIMS)
+    try:
+        # репозитории ищут пользователя по UUID: иначе запрос упал бы с 500
+        return str(uuid.UUID(str(user_id)))
+    except ValueError:
+        return None
+
+
+def _first_claim(claims: dict, names: Sequence[str]) -> Optional[str]:
+    for name in names:
+        if claims.get(name):
+            return claims[name]
+    return None
@@ -33,3 +33,15 @@ class DatabaseException(DashboardException):
     """Исключение, возникающее при ошибках работы с базой данных."""
     status_code = 500
     message = "Ошибка при работе с базой данных"
+
+
+class ServiceUnavailableException(DashboardException):
+    """Исключение, возникающее при перегрузке сервиса."""
+    status_code = 503
+    message = "Сервис перегружен, повторите запрос позже"
+
+
+class PreconditionFailedException(DashboardException):
+    """Исключение, возникающее, когда версия доски не совпала с If-Match."""
+    status_code = 412
+    message = "Доска изменилась, обновите данные и повторите запрос"
@@ -1,16 +1,78 @@
-from fastapi import FastAPI
+import asyncio
+import math
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 import os
 
-from api.v1.endpoints import auth, dashboards, roles, stickers
+from api.v1.endpoints import auth, dashboards, metrics, realtime, roles, stickers
+from config.config import settings
+from exceptions import DashboardException
+from services.board_hub import board_hub
+from services.persistence import StatePersistence
+from services.presence_hub import presence_hub
+from services.state import state
 
 # Load .env
 load_dotenv()
 
+# Доски в базе общие для воркеров, а пользователи и сессии /signin — нет:
+# с несколькими воркерами вход только по JWT AuthServer
+if not settings.storage.local_auth and not settings.jwt.enabled:
+    raise RuntimeError(
+        "STORAGE__BACKEND=database с несколькими воркерами требует JWT: "
+        "пользователи и сессии /signin живут в памяти одного процесса"
+    )
+
 raw_origins = os.getenv("CORS_ORIGINS", "")
 origins = [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    persistence = None
+    snapshots = None
+    if settings.persistence.enabled:
+        persistence = StatePersistence(
+            state,
+            directory=settings.persistence.directory,
+            fsync_interval=settings.persistence.fsync_interval,
+            snapshot_interval=settings.persistence.snapshot_interval,
+        )
+        persistence.open()
+        snapshots = asyncio.create_task(persistence.run_snapshots())
+    session_purge = asyncio.create_task(state.sessions.run_purge(settings.sessions.purge_interval))
+    try:
+        yield
+    finally:
+        await board_hub.close()
+        await presence_hub.close()
+        session_purge.cancel()
+        with suppress(asyncio.CancelledError):
+            await session_purge
+        if persistence is not None:
+            snapshots.cancel()
+            with suppress(asyncio.CancelledError):
+                await snapshots
+            await persistence.snapshot()
+            await asyncio.to_thread(persistence.close)
+        if settings.storage.backend == "database":
+            from repository import db_helper
+            from repository.group_commit import group_commit
+            from repository.write_buffer import sticker_write_buffer
+
+            if group_commit is not None:
+                await group_commit.close()
+            if sticker_write_buffer is not None:
+                await sticker_write_buffer.close()
+            await db_helper.dispose()
+
+
 app = FastAPI(
     title="Cockreate Boards & Stickers API",
     version="1.1.0",
@@ -18,6 +80,7 @@ app = FastAPI(
         "REST API для управления досками, стикерами и ролями пользователей. "
         "Все защищённые ручки используют JWT авторизацию."
     ),
+    lifespan=lifespan,
 )
 
 # --- CORS ---
@@ -29,11 +92,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- ERRORS ---
+@app.exception_handler(DashboardException)
+async def dashboard_exception_handler(request: Request, exc: DashboardException):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.message})
+
+
+def _finite(value):
+    """JSON не кодирует Infinity и NaN, а json.loads их принимает: в ответе они строками."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_finite(item) for item in value]
+    return value
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    # ошибки схемы повторяют присланное значение; без этого 422 на x=Infinity превращался в 500
+    return JSONResponse(status_code=422, content={"detail": _finite(jsonable_encoder(exc.errors()))})
+
+
 # --- ROUTERS ---
-app.include_router(auth.router)
+if settings.storage.local_auth:
+    app.include_router(auth.router)
 app.include_router(dashboards.router)
 app.include_router(roles.router)
 app.include_router(stickers.router)
+app.include_router(realtime.router)
+if settings.metrics.enabled:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
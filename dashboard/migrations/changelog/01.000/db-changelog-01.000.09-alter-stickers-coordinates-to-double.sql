@@ -0,0 +1,9 @@
+-- liquibase formatted sql
+
+-- changeset tvkuvatov@edu.hse.ru:alter-stickers-coordinates-to-double
+-- comment: Store sticker coordinates and sizes as double precision like the API does
+alter table stickers
+    alter column x type double precision,
+    alter column y type double precision,
+    alter column width type double precision,
+    alter column height type double precision;
\ No newline at end of file
@@ -0,0 +1,6 @@
+-- liquibase formatted sql
+
+-- changeset tvkuvatov@edu.hse.ru:add-dashboards-version
+-- comment: Board version for ETag / If-Match, bumped on every board, sticker or membership change
+alter table dashboards
+    add column if not exists version bigint not null default 0;
\ No newline at end of file
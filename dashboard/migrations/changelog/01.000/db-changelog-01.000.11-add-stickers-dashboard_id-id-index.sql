@@ -0,0 +1,6 @@
+-- liquibase formatted sql
+
+-- changeset tvkuvatov@edu.hse.ru:add-stickers-dashboard_id-id-index
+-- comment: Keyset pagination of board stickers by id; replaces the dashboard_id-only index
+CREATE INDEX IF NOT EXISTS idx_stickers_dashboard_id_id ON stickers USING btree (dashboard_id, id);
+DROP INDEX IF EXISTS idx_stickers_dashboard_id;
\ No newline at end of file
@@ -7,3 +7,5 @@ class UserRole(str, Enum):
     CREATOR = "creator"
     EDITOR = "editor"
     VIEWER = "viewer"
+    # Так роль создателя хранится в таблице dashboard_roles
+    OWNER = "owner"
@@ -1,16 +1,16 @@
 import uuid
-from typing import List, Tuple, Optional
+from typing import Collection, Dict, List, Tuple, Optional
 
 from kink import inject
-from sqlalchemy import select, delete
+from sqlalchemy import select, update, delete, and_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from dashboard.models.user_role import UserRole
-from dashboard.repository import db_helper
-from dashboard.repository.dashboard_role_repository import DashboardRoleRepository
-from dashboard.repository.dto.dashboad_information import DashboardInformation
-from dashboard.repository.entities import Dashboard, DashboardRole
-from dashboard.repository.exceptions.not_find_role_exception import NotFoundRoleException
+from models.user_role import UserRole
+from repository.dashboard_role_repository import DashboardRoleRepository
+from repository.dto.dashboad_information import DashboardInformation
+from repository.dto.dashboard_content import DashboardContent
+from repository.entities import Dashboard, DashboardRole, Sticker
+from repository.exceptions.not_find_role_exception import NotFoundRoleException
 
 
 @inject
@@ -21,97 +21,205 @@ class DashboardRepository:
 
     async def create_dashboard( # noqa
         self,
+        session: AsyncSession,
         name: str,
         user_id: uuid.UUID
     ) -> Tuple[Dashboard, DashboardRole]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            dashboard = Dashboard(name=name, id = uuid.uuid4())
-            dashboard_role = DashboardRole(
-                dashboard_id = dashboard.id,
-                user_id = user_id,
-                user_role=UserRole.OWNER
-            )
-            session.add_all([dashboard, dashboard_role])
-            await session.commit()
-            await session.refresh(dashboard)
-            return dashboard, dashboard_role
-
-    async def get_user_dashboards(self, user_id: uuid.UUID) -> List[DashboardInformation]: # noqa
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                select(Dashboard, DashboardRole.user_role)
-                .join(DashboardRole, Dashboard.id == DashboardRole.dashboard_id)
-                .where(DashboardRole.user_id == user_id)
-            )
-            return [
-                DashboardInformation(dashboard.id, dashboard.name, role.value)
-                for dashboard, role in result.all()
-            ]
-
-    async def get_user_own_dashboards(self, user_id: uuid.UUID) -> List[DashboardInformation]: # noqa
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                select(Dashboard, DashboardRole.user_role)
-                .join(DashboardRole, Dashboard.id == DashboardRole.dashboard_id)
-                .where(DashboardRole.user_id == user_id and DashboardRole.user_role == UserRole.OWNER)
-            )
-            return [
-                DashboardInformation(dashboard.id, dashboard.name, role.value)
-                for dashboard, role in result.all()
-            ]
+        dashboard = Dashboard(name=name, id = uuid.uuid4())
+        dashboard_role = DashboardRole(
+            dashboard_id = dashboard.id,
+            user_id = user_id,
+            user_role=UserRole.OWNER
+        )
+        session.add_all([dashboard, dashboard_role])
+        await session.flush()
+        return dashboard, dashboard_role
+
+    async def get_user_dashboards( # noqa
+        self,
+        session: AsyncSession,
+        user_id: uuid.UUID,
+        after: Optional[uuid.UUID] = None,
+        limit: Optional[int] = None
+    ) -> List[DashboardInformation]:
+        """Доски пользователя; с ``after`` / ``limit`` — страница по возрастанию id."""
+        query = (
+            select(Dashboard, DashboardRole.user_role)
+            .join(DashboardRole, Dashboard.id == DashboardRole.dashboard_id)
+            .where(DashboardRole.user_id == user_id)
+        )
+        if after is not None:
+            query = query.where(Dashboard.id > after)
+        if after is not None or limit is not None:
+            query = query.order_by(Dashboard.id).limit(limit)
+        result = await session.execute(query)
+        return [
+            DashboardInformation(dashboard.id, dashboard.name, role.value)
+            for dashboard, role in result.all()
+        ]
+
+    async def get_user_own_dashboards( # noqa
+        self,
+        session: AsyncSession,
+        user_id: uuid.UUID
+    ) -> List[DashboardInformation]:
+        result = await session.execute(
+            select(Dashboard, DashboardRole.user_role)
+            .join(DashboardRole, Dashboard.id == DashboardRole.dashboard_id)
+            .where(DashboardRole.user_id == user_id and DashboardRole.user_role == UserRole.OWNER)
+        )
+        return [
+            DashboardInformation(dashboard.id, dashboard.name, role.value)
+            for dashboard, role in result.all()
+        ]
 
     async def update_dashoard_name( # noqa
             self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
             name: str,
             user_id: uuid.UUID,
+            versions: Optional[Collection[int]] = None
     ) -> bool:
-        session: AsyncSession = db_helper.session_getter()
-        await self.dashboard_role_repository.check_is_user_owner(dashboard_id, user_id)
-        async with session:
-            result = await session.execute(
-                select(Dashboard).where(Dashboard.id == dashboard_id)
-            )
-            dashboard = result.scalar_one_or_none()
+        """Переименовывает доску и увеличивает её версию одним UPDATE."""
+        roles = [UserRole.OWNER, UserRole.EDITOR]
+        query = update(Dashboard).where(and_(
+            Dashboard.id == dashboard_id,
+            self.dashboard_role_repository.has_role(dashboard_id, user_id, roles)
+        ))
+        if versions is not None:
+            query = query.where(Dashboard.version.in_(versions))
+        result = await session.execute(
+            query.values(name=name, version=Dashboard.version + 1).returning(Dashboard.id)
+        )
+        if result.scalar_one_or_none() is not None:
+            return True
+        await self.dashboard_role_repository.check_user_role(session, dashboard_id, user_id, roles)
+        return False
 
-            if not dashboard:
-                return False
+    async def delete_by_id(
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            user_id: uuid.UUID,
+            versions: Optional[Collection[int]] = None
+    ) -> bool:
+        """Удаляет доску; с ``versions`` — только если её текущая версия среди них."""
+        query = delete(Dashboard).where(and_(
+            Dashboard.id == dashboard_id,
+            self.dashboard_role_repository.has_role(dashboard_id, user_id, [UserRole.OWNER])
+        ))
+        if versions is not None:
+            query = query.where(Dashboard.version.in_(versions))
+        result = await session.execute(query.returning(Dashboard.id))
+        if result.scalar_one_or_none() is not None:
+            self.dashboard_role_repository.invalidate_roles(session, dashboard_id)
+            return True
+        await self.dashboard_role_repository.check_is_user_owner(session, dashboard_id, user_id)
+        return False
 
-            dashboard.name = name
+    async def bump_version( # noqa
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            versions: Optional[Collection[int]] = None
+    ) -> Optional[int]:
+        """Увеличивает версию доски в текущей транзакции и возвращает новую.
 
-            await session.commit()
-            return True
+        С ``versions`` версия меняется, только если текущая среди них; иначе
+        (или если доски нет) — None. Строка доски остаётся заблокированной до
+        конца транзакции, так что конкурентные записи в доску упорядочены.
+        """
+        query = update(Dashboard).where(Dashboard.id == dashboard_id)
+        if versions is not None:
+            query = query.where(Dashboard.version.in_(versions))
+        result = await session.execute(
+            query.values(version=Dashboard.version + 1).returning(Dashboard.version)
+        )
+        return result.scalar_one_or_none()
+
+    async def add_versions(self, session: AsyncSession, increments: Dict[uuid.UUID, int]) -> None: # noqa
+        """Увеличивает версии нескольких досок одним UPDATE пачкой (executemany); удалённые пропускаются."""
+        table = Dashboard.__table__
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("dashboard_id"))
+            .values(version=table.c.version + bindparam("increment")),
+            [{"dashboard_id": dashboard_id, "increment": n} for dashboard_id, n in increments.items()]
+        )
+
+    async def get_version(self, session: AsyncSession, dashboard_id: uuid.UUID) -> Optional[int]: # noqa
+        result = await session.execute(
+            select(Dashboard.version).where(Dashboard.id == dashboard_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def exists(self, session: AsyncSession, dashboard_id: uuid.UUID) -> bool: # noqa
+        result = await session.execute(
+            select(Dashboard.id).where(Dashboard.id == dashboard_id)
+        )
+        return result.scalar_one_or_none() is not None
 
-    async def delete_by_id(self, dashboard_id: uuid.UUID, user_id: uuid.UUID) -> bool:
-        await self.dashboard_role_repository.check_is_user_owner(dashboard_id, user_id)
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                delete(Dashboard)
-                .where(Dashboard.id == dashboard_id)
-                .returning(Dashboard.id)
+    async def open_dashboard( # noqa
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            user_id: uuid.UUID
+    ) -> Optional[DashboardContent]:
+        """Доска, роль пользователя и все стикеры одним SELECT.
+
+        Строка на стикер (у пустой доски — одна строка без стикера), так что
+        версия и стикеры взяты из одного снимка. None — доски нет или
+        пользователь не её участник; различать это вызывающему.
+        """
+        result = await session.execute(
+            select(
+                Dashboard.name,
+                Dashboard.version,
+                DashboardRole.user_role,
+                Sticker.id,
+                Sticker.dashboard_id,
+                Sticker.x,
+                Sticker.y,
+                Sticker.text,
+                Sticker.width,
+                Sticker.height,
+                Sticker.color,
             )
-            await session.commit()
-            return result.scalar_one_or_none() is not None
+            .join(DashboardRole, and_(
+                DashboardRole.dashboard_id == Dashboard.id,
+                DashboardRole.user_id == user_id
+            ))
+            .outerjoin(Sticker, Sticker.dashboard_id == Dashboard.id)
+            .where(Dashboard.id == dashboard_id)
+            .order_by(Sticker.id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+        first = rows[0]
+        return DashboardContent(
+            id=dashboard_id,
+            name=first.name,
+            version=first.version,
+            role=first.user_role,
+            stickers=rows if first.id is not None else [],
+        )
 
     async def get_dashboard(
             self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
             user_id: uuid.UUID
     ) -> Optional[Dashboard]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(
-                session, dashboard_id, user_id
-            )
-            if not role:
-                raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
+        role = await self.dashboard_role_repository.get_user_role(
+            session, dashboard_id, user_id
+        )
+        if not role:
+            raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
 
-            result = await session.execute(
-                select(Dashboard)
-                .where(Dashboard.id == dashboard_id)
-            )
-            return result.scalar_one_or_none()
\ No newline at end of file
+        result = await session.execute(
+            select(Dashboard)
+            .where(Dashboard.id == dashboard_id)
+        )
+        return result.scalar_one_or_none()
\ No newline at end of file
@@ -2,26 +2,64 @@ import uuid
 from typing import Optional, List
 
 from kink import inject
-from sqlalchemy import select, delete, and_
+from sqlalchemy import select, delete, update, insert, exists, literal, and_, event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import ColumnElement
 
-from dashboard.models.user_role import UserRole
-from dashboard.repository import db_helper
-from dashboard.repository.entities import DashboardRole
-from dashboard.repository.exceptions.incorrect_role_exception import IncorrectRoleException
-from dashboard.repository.exceptions.not_find_role_exception import NotFoundRoleException
+from models.user_role import UserRole
+from repository.entities import DashboardRole
+from repository.exceptions.incorrect_role_exception import IncorrectRoleException
+from repository.exceptions.not_find_role_exception import NotFoundRoleException
+from repository.role_cache import MISS, role_cache
 
 @inject
 class DashboardRoleRepository:
 
-    async def check_is_user_owner(self, dashboard_id: uuid.UUID, user_id: uuid.UUID):
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.get_user_role(session, dashboard_id, user_id)
-            if role is None:
-                raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
-            if role != UserRole.OWNER:
-                raise IncorrectRoleException(required_roles=[UserRole.OWNER], actual_role=role)
+    @staticmethod
+    def has_role(dashboard_id, user_id: uuid.UUID, roles: List[UserRole]) -> ColumnElement[bool]:
+        """EXISTS-условие «у пользователя одна из ролей на доске» для WHERE.
+
+        Проверка прав встраивается в сам UPDATE/DELETE/INSERT, без отдельного
+        SELECT. ``dashboard_id`` может быть колонкой внешнего запроса,
+        например ``Sticker.dashboard_id``.
+        """
+        member = aliased(DashboardRole)
+        return exists().where(and_(
+            member.dashboard_id == dashboard_id,
+            member.user_id == user_id,
+            member.user_role.in_(roles)
+        ))
+
+    @staticmethod
+    def invalidate_roles(session: AsyncSession, dashboard_id: uuid.UUID, user_id: Optional[uuid.UUID] = None):
+        """Сбрасывает кэш ролей сейчас и повторно после commit сессии.
+
+        Второй сброс убирает роль, которую параллельный запрос мог прочитать
+        и закэшировать, пока транзакция ещё не была зафиксирована.
+        """
+        role_cache.invalidate(dashboard_id, user_id)
+        event.listen(
+            session.sync_session, "after_commit",
+            lambda _: role_cache.invalidate(dashboard_id, user_id), once=True
+        )
+
+    async def check_is_user_owner(self, session: AsyncSession, dashboard_id: uuid.UUID, user_id: uuid.UUID):
+        await self.check_user_role(session, dashboard_id, user_id, [UserRole.OWNER])
+
+    async def check_user_role(
+        self,
+        session: AsyncSession,
+        dashboard_id: uuid.UUID,
+        user_id: uuid.UUID,
+        required_roles: List[UserRole]
+    ) -> UserRole:
+        role = await self.get_user_role(session, dashboard_id, user_id)
+        if role is None:
+            raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
+        if role not in required_roles:
+            raise IncorrectRoleException(required_roles=required_roles, actual_role=role)
+        return role
 
     async def get_user_role( # noqa
         self,
@@ -29,6 +67,10 @@ class DashboardRoleRepository:
         dashboard_id: uuid.UUID,
         user_id: uuid.UUID
     ) -> Optional[UserRole]:
+        role = role_cache.get(dashboard_id, user_id)
+        if role is not MISS:
+            return role
+        generation = role_cache.generation
         result = await session.execute(
             select(DashboardRole.user_role)
             .where(and_(
@@ -36,95 +78,122 @@ class DashboardRoleRepository:
                 DashboardRole.user_id == user_id
             ))
         )
-        return result.scalar_one_or_none()
+        role = result.scalar_one_or_none()
+        # реплика может отставать: её ответ не должен пережить сброс кэша на TTL
+        if not session.info.get("replica"):
+            role_cache.put(dashboard_id, user_id, role, generation)
+        return role
 
     async def invite_user(
         self,
+        session: AsyncSession,
         dashboard_id: uuid.UUID,
         inviter_id: uuid.UUID,
         user_id: uuid.UUID,
         role: UserRole
     ) -> Optional[DashboardRole]:
-        await self.check_is_user_owner(dashboard_id, inviter_id)
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            existing = await session.get(
-                DashboardRole,
-                {"dashboard_id": dashboard_id, "user_id": user_id}
-            )
-            if existing:
-                return None
-
-            dashboard_role = DashboardRole(
-                dashboard_id=dashboard_id,
-                user_id=user_id,
-                user_role=role
+        existing = aliased(DashboardRole)
+        result = await session.execute(
+            insert(DashboardRole)
+            .from_select(
+                ["dashboard_id", "user_id", "user_role"],
+                select(
+                    literal(dashboard_id, DashboardRole.dashboard_id.type),
+                    literal(user_id, DashboardRole.user_id.type),
+                    literal(role, DashboardRole.user_role.type)
+                ).where(and_(
+                    self.has_role(dashboard_id, inviter_id, [UserRole.OWNER]),
+                    ~exists().where(and_(
+                        existing.dashboard_id == dashboard_id,
+                        existing.user_id == user_id
+                    ))
+                ))
             )
-            
-            session.add(dashboard_role)
-            await session.commit()
-            await session.refresh(dashboard_role)
-            return dashboard_role
+            .returning(DashboardRole)
+        )
+        dashboard_role = result.scalar_one_or_none()
+        if dashboard_role is None:
+            # либо нет прав, либо пользователь уже участник
+            await self.check_is_user_owner(session, dashboard_id, inviter_id)
+        else:
+            self.invalidate_roles(session, dashboard_id, user_id)
+        return dashboard_role
 
     async def update_user_role(
         self,
+        session: AsyncSession,
         dashboard_id: uuid.UUID,
         owner_id: uuid.UUID,
         user_id: uuid.UUID,
         new_role: UserRole
     ) -> Optional[DashboardRole]:
-        await self.check_is_user_owner(dashboard_id, owner_id)
-
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                select(DashboardRole)
-                .where(and_(
-                    DashboardRole.dashboard_id == dashboard_id,
-                    DashboardRole.user_id == user_id
-                ))
-            )
-            dashboard_role = result.scalar_one_or_none()
-            
-            if dashboard_role:
-                dashboard_role.user_role = new_role
-                await session.commit()
-                await session.refresh(dashboard_role)
-                
-            return dashboard_role
+        result = await session.execute(
+            update(DashboardRole)
+            .where(and_(
+                DashboardRole.dashboard_id == dashboard_id,
+                DashboardRole.user_id == user_id,
+                self.has_role(dashboard_id, owner_id, [UserRole.OWNER])
+            ))
+            .values(user_role=new_role)
+            .returning(DashboardRole)
+        )
+        dashboard_role = result.scalar_one_or_none()
+        if dashboard_role is None:
+            await self.check_is_user_owner(session, dashboard_id, owner_id)
+        else:
+            self.invalidate_roles(session, dashboard_id, user_id)
+        return dashboard_role
 
     async def remove_user_role(
         self,
+        session: AsyncSession,
         dashboard_id: uuid.UUID,
         owner_id: uuid.UUID,
         user_id_to_remove: uuid.UUID
     ) -> bool:
-        await self.check_is_user_owner(dashboard_id, owner_id)
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                delete(DashboardRole)
-                .where(and_(
-                    DashboardRole.dashboard_id == dashboard_id,
-                    DashboardRole.user_id == user_id_to_remove
-                ))
-            )
-            await session.commit()
-            return result.scalar_one_or_none() is not None
+        result = await session.execute(
+            delete(DashboardRole)
+            .where(and_(
+                DashboardRole.dashboard_id == dashboard_id,
+                DashboardRole.user_id == user_id_to_remove,
+                DashboardRole.user_role != UserRole.OWNER,
+                self.has_role(dashboard_id, owner_id, [UserRole.OWNER])
+            ))
+            .returning(DashboardRole.user_id)
+        )
+        if result.scalar_one_or_none() is not None:
+            self.invalidate_roles(session, dashboard_id, user_id_to_remove)
+            return True
+        await self.check_is_user_owner(session, dashboard_id, owner_id)
+        return False
 
     async def get_dashboard_users(
             self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
             user_id: uuid.UUID
     ) -> List[uuid.UUID]:
-        await self.check_is_user_owner(dashboard_id, user_id)
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            result = await session.execute(
-                select(DashboardRole)
-                .where(DashboardRole.dashboard_id == dashboard_id)
-            )
-            return [
-                dashboard_role.user_id
-                for dashboard_role in result.all()
-            ]
\ No newline at end of file
+        await self.check_is_user_owner(session, dashboard_id, user_id)
+        result = await session.execute(
+            select(DashboardRole)
+            .where(DashboardRole.dashboard_id == dashboard_id)
+        )
+        return [
+            dashboard_role.user_id
+            for dashboard_role in result.scalars().all()
+        ]
+
+    async def get_dashboard_members(
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            user_id: uuid.UUID
+    ) -> List[DashboardRole]:
+        role = await self.get_user_role(session, dashboard_id, user_id)
+        if role is None:
+            raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
+        result = await session.execute(
+            select(DashboardRole)
+            .where(DashboardRole.dashboard_id == dashboard_id)
+        )
+        return list(result.scalars().all())
\ No newline at end of file
@@ -1,3 +1,9 @@
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
@@ -5,7 +11,29 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession,
 )
 
-from dashboard.config.config import settings
+from config.config import settings
+
+# записей о недавно писавших пользователях, сверх которых вычищаются истёкшие
+PINNED_PURGE_SIZE = 10_000
+
+
+class Replica:
+    """Реплика только для чтения и её состояние в круге."""
+
+    __slots__ = ("engine", "session_factory", "down_until", "reads", "failures")
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+            info={"replica": True},
+        )
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
 
 
 class DatabaseHelper:
@@ -16,6 +44,9 @@ class DatabaseHelper:
         echo_pool: bool = False,
         pool_size: int = 5,
         max_overflow: int = 10,
+        replica_urls: Sequence[str] = (),
+        read_your_writes: float = 5.0,
+        replica_retry: float = 10.0,
     ) -> None:
         self.engine: AsyncEngine = create_async_engine(
             url=url,
@@ -30,13 +61,107 @@ class DatabaseHelper:
             autocommit=False,
             expire_on_commit=False,
         )
+        self.replicas: List[Replica] = [
+            Replica(create_async_engine(
+                url=replica_url,
+                echo=echo,
+                echo_pool=echo_pool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+            ))
+            for replica_url in replica_urls
+        ]
+        self.read_your_writes = read_your_writes
+        self.replica_retry = replica_retry
+        self._round = itertools.count()
+        # пользователь -> monotonic-время, до которого он читает из основной БД
+        self._pinned: Dict[str, float] = {}
+        self.primary_reads = 0
 
     async def dispose(self) -> None:
         await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
 
     def session_getter(self) -> AsyncSession:
         return self.session_factory()
 
+    @asynccontextmanager
+    async def session(self, read_only: bool = False, user_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        """Сессия с одной транзакцией: commit в конце, rollback при исключении.
+
+        ``read_only`` — чтения идут на реплику (по кругу, пропуская
+        недоступные), если ``user_id`` не писал последние
+        ``read_your_writes`` секунд; иначе и без реплик — основная БД.
+        Успешная запись закрепляет ``user_id`` за основной БД на то же время.
+        """
+        session = await self._read_session(user_id) if read_only else None
+        if session is None:
+            session = self.session_factory()
+        async with session:
+            try:
+                yield session
+            except BaseException as e:
+                await session.rollback()
+                if isinstance(e, DBAPIError) and e.connection_invalidated:
+                    self._mark_down(session)
+                raise
+            await session.commit()
+        if not read_only and user_id is not None:
+            self.pin(user_id)
+
+    def pin(self, user_id: str) -> None:
+        """Чтения ``user_id`` ближайшие ``read_your_writes`` секунд идут в основную БД."""
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        if len(self._pinned) >= PINNED_PURGE_SIZE:
+            self._pinned = {pinned: until for pinned, until in self._pinned.items() if until > now}
+        self._pinned[user_id] = now + self.read_your_writes
+
+    async def _read_session(self, user_id: Optional[str]) -> Optional[AsyncSession]:
+        """Сессия на первой доступной реплике с уже открытым соединением; None — читать из основной БД."""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        if user_id is not None and self._pinned.get(user_id, 0.0) > now:
+            self.primary_reads += 1
+            return None
+        # круг только по доступным: ход выпавшей реплики не достаётся целиком следующей
+        healthy = [replica for replica in self.replicas if replica.down_until <= now]
+        start = next(self._round) % len(healthy) if healthy else 0
+        for replica in healthy[start:] + healthy[:start]:
+            session = replica.session_factory()
+            try:
+                # соединение сразу: отказ реплики виден до запроса, а не посреди него
+                await session.connection()
+            except (DBAPIError, OSError):
+                await session.close()
+                replica.failures += 1
+                replica.down_until = time.monotonic() + self.replica_retry
+                continue
+            replica.reads += 1
+            return session
+        self.primary_reads += 1
+        return None
+
+    def _mark_down(self, session: AsyncSession) -> None:
+        for replica in self.replicas:
+            if session.bind is replica.engine:
+                replica.failures += 1
+                replica.down_until = time.monotonic() + self.replica_retry
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "primary_reads": self.primary_reads,
+            "pinned": sum(until > now for until in self._pinned.values()),
+            "replicas": [
+                {"reads": replica.reads, "failures": replica.failures, "down": replica.down_until > now}
+                for replica in self.replicas
+            ],
+        }
+
 
 db_helper = DatabaseHelper(
     url=str(settings.db.url),
@@ -44,4 +169,7 @@ db_helper = DatabaseHelper(
     echo_pool=settings.db.echo_pool,
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
+    replica_urls=settings.db.replica_urls,
+    read_your_writes=settings.db.read_your_writes,
+    replica_retry=settings.db.replica_retry,
 )
@@ -2,7 +2,7 @@ import uuid
 
 from dataclasses import dataclass
 
-from dashboard.models.user_role import UserRole
+from models.user_role import UserRole
 
 @dataclass
 class DashboardInformation:
@@ -0,0 +1,16 @@
+import uuid
+
+from dataclasses import dataclass
+from typing import Any, List
+
+from models.user_role import UserRole
+
+@dataclass
+class DashboardContent:
+    """Доска с ролью пользователя и стикерами, прочитанные одним запросом."""
+    id: uuid.UUID
+    name: str
+    version: int
+    role: UserRole
+    # строки с колонками стикера: id, dashboard_id, x, y, text, width, height, color
+    stickers: List[Any]
\ No newline at end of file
@@ -2,8 +2,8 @@ from sqlalchemy import MetaData
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import declared_attr
 
-from dashboard.config.config import settings
-from dashboard.utils.case_converter import camel_case_to_snake_case
+from config.config import settings
+from utils.case_converter import camel_case_to_snake_case
 
 
 class BaseModel(DeclarativeBase):
@@ -14,5 +14,5 @@ class BaseModel(DeclarativeBase):
     )
     @declared_attr.directive
     def __tablename__(cls) -> str:
-        return f"{camel_case_to_snake_case(cls.__name__)}"
+        return f"{camel_case_to_snake_case(cls.__name__)}s"
 
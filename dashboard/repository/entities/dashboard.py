@@ -1,3 +1,4 @@
+from sqlalchemy import BigInteger
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 
@@ -7,3 +8,5 @@ from .mixins.uuid_id_pk import UUIDIdPkMixin
 
 class Dashboard(BaseModel, UUIDIdPkMixin):
     name: Mapped[str] = mapped_column(nullable=False)
+    # растёт при любом изменении доски, её стикеров и участников; отдаётся как ETag
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
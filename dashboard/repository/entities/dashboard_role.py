@@ -1,12 +1,12 @@
 import uuid
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import Enum, ForeignKey
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from . import BaseModel
-from ...models.user_role import UserRole
+from models.user_role import UserRole
 
 
 class DashboardRole(BaseModel):
@@ -20,4 +20,7 @@ class DashboardRole(BaseModel):
         PG_UUID(as_uuid=True),
         primary_key=True
     )
-    user_role: Mapped[UserRole] = mapped_column(nullable=False)
\ No newline at end of file
+    user_role: Mapped[UserRole] = mapped_column(
+        Enum(UserRole, native_enum=False, values_callable=lambda roles: [role.value for role in roles]),
+        nullable=False
+    )
\ No newline at end of file
@@ -13,9 +13,9 @@ class Sticker(BaseModel, UUIDIdPkMixin):
         UUID(as_uuid=True),
         ForeignKey("dashboards.id", ondelete="CASCADE")
     )
-    x: Mapped[int] = mapped_column(nullable=False)
-    y: Mapped[int] = mapped_column(nullable=False)
+    x: Mapped[float] = mapped_column(nullable=False)
+    y: Mapped[float] = mapped_column(nullable=False)
     text: Mapped[str] = mapped_column(nullable=False)
-    width: Mapped[int] = mapped_column(nullable=False)
-    height: Mapped[int] = mapped_column(nullable=False)
+    width: Mapped[float] = mapped_column(nullable=False)
+    height: Mapped[float] = mapped_column(nullable=False)
     color: Mapped[str] = mapped_column(nullable=False)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.config import settings
+from repository.db_helper import db_helper
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class GroupCommit:
+    """Общий коммит для записей из разных запросов.
+
+    Операции, пришедшие за ``window`` секунд (и пока идёт предыдущий
+    коммит), выполняет одна фоновая задача подряд в одной транзакции — до
+    ``max_batch`` за раз, каждую в своей точке сохранения. Ошибка операции
+    откатывает только её и достаётся только её запросу; ошибка коммита —
+    всем операциям пачки. Так WAL сбрасывается на диск раз на пачку, а не
+    на запрос; ``window`` добавляет задержку одиночной записи, но растит
+    пачки.
+
+    На SQLite pysqlite не открывает транзакцию перед SAVEPOINT, и точка
+    сохранения фиксируется при освобождении: результат тот же, но коммиты
+    там не экономятся.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        window: float = 0.002,
+        max_batch: int = 64,
+    ) -> None:
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: List[Tuple[Operation, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.operations = 0
+        self.batches = 0
+        self.failed = 0
+        self.errors = 0
+
+    async def run(self, operation: Operation[T]) -> T:
+        """Выполняет ``operation(session)`` в ближайшей пачке и возвращает её результат после коммита."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((operation, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self) -> None:
+        while self._queue:
+            if self.window and len(self._queue) < self.max_batch:
+                await asyncio.sleep(self.window)
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            await self._execute(batch)
+
+    async def _execute(self, batch: List[Tuple[Operation, asyncio.Future]]) -> None:
+        outcomes: List[Tuple[bool, object]] = []
+        try:
+            async with self.session_factory() as session:
+                for operation, future in batch:
+                    # запрос отменён до начала пачки: его запись не выполняется
+                    if future.cancelled():
+                        outcomes.append((False, None))
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            result = await operation(session)
+                    except Exception as e:
+                        outcomes.append((False, e))
+                    else:
+                        outcomes.append((True, result))
+                await session.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.exception("Group commit of %d operations failed", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        for (_, future), (ok, outcome) in zip(batch, outcomes):
+            self.operations += 1
+            if future.done():
+                continue
+            if ok:
+                future.set_result(outcome)
+            else:
+                self.failed += 1
+                future.set_exception(outcome)
+
+    async def close(self) -> None:
+        """Дожидается записи всего, что уже в очереди."""
+        if self._flusher is not None:
+            await self._flusher
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "operations": self.operations,
+            "batches": self.batches,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+group_commit = GroupCommit(
+    db_helper.session_factory,
+    window=settings.group_commit.window,
+    max_batch=settings.group_commit.max_batch,
+) if settings.group_commit.enabled else None
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config.config import settings
+from models.user_role import UserRole
+
+MISS = object()
+
+# (кэш-отправитель, dashboard_id, user_id или None — вся доска), строками: так сообщение проходит через любой транспорт
+InvalidationMessage = Tuple[str, str, Optional[str]]
+
+
+class InvalidationChannel(ABC):
+    """Канал, по которому воркеры сообщают друг другу об изменении ролей.
+
+    Сообщение доходит и до подписчиков отправителя, как у брокеров;
+    свои сообщения ``RoleCache`` пропускает сам.
+    """
+
+    @abstractmethod
+    def publish(self, message: InvalidationMessage) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, callback: Callable[[InvalidationMessage], None]) -> None:
+        ...
+
+
+class LocalInvalidationChannel(InvalidationChannel):
+    """Канал в пределах процесса; заменитель брокера для одного воркера и локальных прогонов."""
+
+    def __init__(self) -> None:
+        self._subscribers: List[Callable[[InvalidationMessage], None]] = []
+
+    def publish(self, message: InvalidationMessage) -> None:
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback: Callable[[InvalidationMessage], None]) -> None:
+        self._subscribers.append(callback)
+
+
+class RoleCache:
+    """Кэш (dashboard_id, user_id) -> роль с TTL и LRU-ограничением.
+
+    Отсутствие роли тоже кэшируется. Записи сбрасываются явно при
+    изменении ролей и удалении доски; ``generation`` растёт при каждом
+    сбросе, и ``put`` с устаревшим поколением игнорируется — чтение из БД,
+    начатое до сброса, не вернёт старую роль в кэш.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_size: int = 100_000,
+        channel: Optional[InvalidationChannel] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.channel = channel
+        # отличает свои сообщения в канале от чужих
+        self._origin = uuid.uuid4().hex
+        self._entries: OrderedDict[Tuple[uuid.UUID, uuid.UUID], Tuple[Optional[UserRole], float]] = OrderedDict()
+        self._by_dashboard: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if channel is not None:
+            channel.subscribe(self._on_message)
+
+    def get(self, dashboard_id: uuid.UUID, user_id: uuid.UUID) -> object:
+        """Роль (возможно None) или ``MISS``."""
+        key = (dashboard_id, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                role, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return role
+                self._remove(key)
+            self.misses += 1
+            return MISS
+
+    def put(self, dashboard_id: uuid.UUID, user_id: uuid.UUID, role: Optional[UserRole], generation: int) -> None:
+        key = (dashboard_id, user_id)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (role, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_dashboard.setdefault(dashboard_id, set()).add(user_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, dashboard_id: uuid.UUID, user_id: Optional[uuid.UUID] = None) -> None:
+        """Сбрасывает роль пользователя на доске или, без ``user_id``, все роли доски."""
+        self._drop(dashboard_id, user_id)
+        if self.channel is not None:
+            self.channel.publish((self._origin, str(dashboard_id), None if user_id is None else str(user_id)))
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def _on_message(self, message: InvalidationMessage) -> None:
+        origin, dashboard_id, user_id = message
+        if origin == self._origin:
+            # своё сообщение: запись уже сброшена в invalidate
+            return
+        self._drop(uuid.UUID(dashboard_id), None if user_id is None else uuid.UUID(user_id))
+
+    def _drop(self, dashboard_id: uuid.UUID, user_id: Optional[uuid.UUID]) -> None:
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if user_id is not None:
+                self._remove((dashboard_id, user_id))
+                return
+            for member_id in list(self._by_dashboard.get(dashboard_id, ())):
+                self._remove((dashboard_id, member_id))
+
+    def _remove(self, key: Tuple[uuid.UUID, uuid.UUID]) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        dashboard_id, user_id = key
+        members = self._by_dashboard.get(dashboard_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self._by_dashboard[dashboard_id]
+
+
+INVALIDATION_CHANNELS = {
+    "none": lambda: None,
+    "local": LocalInvalidationChannel,
+}
+
+role_cache = RoleCache(
+    ttl=settings.role_cache.ttl,
+    max_size=settings.role_cache.max_size if settings.role_cache.enabled else 0,
+    channel=INVALIDATION_CHANNELS[settings.role_cache.channel](),
+)
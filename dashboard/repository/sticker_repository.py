@@ -1,16 +1,19 @@
 import uuid
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from kink import inject
-from sqlalchemy import select, update, delete, and_
+from sqlalchemy import select, update, delete, insert, literal, and_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from dashboard.models.user_role import UserRole
-from dashboard.repository import db_helper
-from dashboard.repository.dashboard_role_repository import DashboardRoleRepository
-from dashboard.repository.entities import Sticker, DashboardRole
-from dashboard.repository.exceptions.incorrect_role_exception import IncorrectRoleException
-from dashboard.repository.exceptions.not_find_role_exception import NotFoundRoleException
+from models.user_role import UserRole
+from repository.dashboard_role_repository import DashboardRoleRepository
+from repository.entities import Sticker, DashboardRole
+from repository.exceptions.incorrect_role_exception import IncorrectRoleException
+from repository.exceptions.not_find_role_exception import NotFoundRoleException
+
+EDITOR_ROLES = [UserRole.EDITOR, UserRole.OWNER]
+# строк за одно чтение серверного курсора при потоковой выдаче
+STREAM_BATCH = 500
 
 
 @inject
@@ -19,117 +22,299 @@ class StickerRepository:
     def __init__(self, dashboard_role_repository: DashboardRoleRepository):
         self.dashboard_role_repository = dashboard_role_repository
 
+    async def _raise_access_error(
+            self,
+            session: AsyncSession,
+            sticker_id: uuid.UUID,
+            user_id: uuid.UUID
+    ) -> None:
+        """Запись не затронула строк: поднимает ошибку роли или молча возвращается, если стикера нет."""
+        result = await session.execute(
+            select(Sticker.dashboard_id, DashboardRole.user_role)
+            .outerjoin(DashboardRole, and_(
+                DashboardRole.dashboard_id == Sticker.dashboard_id,
+                DashboardRole.user_id == user_id
+            ))
+            .where(Sticker.id == sticker_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return
+        dashboard_id, role = row
+        if role is None:
+            raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
+        raise IncorrectRoleException(required_roles=EDITOR_ROLES, actual_role=role)
+
     async def create_sticker(
             self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
             user_id: uuid.UUID,
-            x: int,
-            y: int,
+            x: float,
+            y: float,
             text: str,
-            width: int,
-            height: int,
+            width: float,
+            height: float,
             color: str
-    ) -> Optional[Sticker]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
-            if role not in [UserRole.EDITOR, UserRole.OWNER]:
-                raise IncorrectRoleException(required_roles=[UserRole.EDITOR, UserRole.OWNER], actual_role=role)
-
-            sticker = Sticker(
-                dashboard_id=dashboard_id,
-                x=x,
-                y=y,
-                text=text,
-                width=width,
-                height=height,
-                color=color
+    ) -> Sticker:
+        values = {
+            "id": uuid.uuid4(),
+            "dashboard_id": dashboard_id,
+            "x": x,
+            "y": y,
+            "text": text,
+            "width": width,
+            "height": height,
+            "color": color,
+        }
+        columns = Sticker.__table__.c
+        result = await session.execute(
+            insert(Sticker)
+            .from_select(
+                list(values),
+                select(*[literal(value, columns[name].type) for name, value in values.items()])
+                .where(self.dashboard_role_repository.has_role(dashboard_id, user_id, EDITOR_ROLES))
             )
-            session.add(sticker)
-            await session.commit()
-            await session.refresh(sticker)
-            return sticker
+            .returning(Sticker)
+        )
+        sticker = result.scalar_one_or_none()
+        if sticker is None:
+            role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
+            raise IncorrectRoleException(required_roles=EDITOR_ROLES, actual_role=role)
+        return sticker
 
     async def update_sticker(
             self,
+            session: AsyncSession,
             sticker_id: uuid.UUID,
             user_id: uuid.UUID,
-            dashboard_id: uuid.UUID,
             **updates
     ) -> Optional[Sticker]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
-            if role not in [UserRole.EDITOR, UserRole.OWNER]:
-                return None
-
-            result = await session.execute(
-                update(Sticker)
-                .where(Sticker.id == sticker_id)
-                .values(**updates)
-                .returning(Sticker)
-            )
+        """Обновляет стикер за один запрос; None, если стикера нет.
 
-            sticker = result.scalar_one_or_none()
-            if sticker:
-                await session.commit()
-            return sticker
+        Без прав поднимает NotFoundRoleException / IncorrectRoleException.
+        """
+        result = await session.execute(
+            update(Sticker)
+            .where(and_(
+                Sticker.id == sticker_id,
+                self.dashboard_role_repository.has_role(Sticker.dashboard_id, user_id, EDITOR_ROLES)
+            ))
+            .values(**updates)
+            .returning(Sticker)
+        )
+        sticker = result.scalar_one_or_none()
+        if sticker is None:
+            await self._raise_access_error(session, sticker_id, user_id)
+        return sticker
 
     async def delete_sticker(
             self,
+            session: AsyncSession,
             sticker_id: uuid.UUID,
+            user_id: uuid.UUID
+    ) -> Optional[uuid.UUID]:
+        """Удаляет стикер; возвращает id его доски или None, если стикера нет."""
+        result = await session.execute(
+            delete(Sticker)
+            .where(and_(
+                Sticker.id == sticker_id,
+                self.dashboard_role_repository.has_role(Sticker.dashboard_id, user_id, EDITOR_ROLES)
+            ))
+            .returning(Sticker.dashboard_id)
+        )
+        dashboard_id = result.scalar_one_or_none()
+        if dashboard_id is None:
+            await self._raise_access_error(session, sticker_id, user_id)
+        return dashboard_id
+
+    async def create_stickers( # noqa
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            stickers: List[dict]
+    ) -> List[Sticker]:
+        """Многострочный INSERT ... RETURNING; права проверяет вызывающий."""
+        result = await session.execute(
+            insert(Sticker).returning(Sticker, sort_by_parameter_order=True),
+            [{**fields, "id": uuid.uuid4(), "dashboard_id": dashboard_id} for fields in stickers]
+        )
+        return list(result.scalars().all())
+
+    async def update_stickers( # noqa
+            self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
+            updates: List[Tuple[uuid.UUID, dict]]
+    ) -> List[Optional[Sticker]]:
+        """Один SELECT стикеров доски и UPDATE пачкой (executemany) при flush.
+
+        Права проверяет вызывающий; None для стикеров не с этой доски.
+        """
+        result = await session.execute(
+            select(Sticker)
+            .where(and_(
+                Sticker.id.in_([sticker_id for sticker_id, _ in updates]),
+                Sticker.dashboard_id == dashboard_id
+            ))
+        )
+        stickers: Dict[uuid.UUID, Sticker] = {sticker.id: sticker for sticker in result.scalars()}
+        updated = []
+        for sticker_id, fields in updates:
+            sticker = stickers.get(sticker_id)
+            if sticker is not None:
+                for field, value in fields.items():
+                    setattr(sticker, field, value)
+            updated.append(sticker)
+        await session.flush()
+        return updated
+
+    async def write_stickers( # noqa
+            self,
+            session: AsyncSession,
+            updates: List[Tuple[uuid.UUID, dict]]
+    ) -> None:
+        """UPDATE стикеров по id одним запросом пачкой (executemany), без RETURNING.
+
+        Права проверяет вызывающий; у всех элементов один набор полей,
+        удалённые стикеры пропускаются.
+        """
+        table = Sticker.__table__
+        await session.execute(
+            update(table).where(table.c.id == bindparam("sticker_id")),
+            [{"sticker_id": sticker_id, **fields} for sticker_id, fields in updates]
+        )
+
+    async def get_sticker_with_role(
+            self,
+            session: AsyncSession,
+            sticker_id: uuid.UUID,
             user_id: uuid.UUID
-    ) -> bool:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
-            if role not in [UserRole.EDITOR, UserRole.OWNER]:
-                return False
+    ) -> Optional[Tuple[Sticker, Optional[UserRole]]]:
+        """Стикер и роль пользователя на его доске одним запросом; None, если стикера нет."""
+        result = await session.execute(
+            select(Sticker, DashboardRole.user_role)
+            .outerjoin(DashboardRole, and_(
+                DashboardRole.dashboard_id == Sticker.dashboard_id,
+                DashboardRole.user_id == user_id
+            ))
+            .where(Sticker.id == sticker_id)
+        )
+        row = result.one_or_none()
+        return None if row is None else tuple(row)
 
-            result = await session.execute(
-                delete(Sticker)
-                .where(Sticker.id == sticker_id,)
-            )
+    async def delete_stickers( # noqa
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            sticker_ids: List[uuid.UUID]
+    ) -> List[uuid.UUID]:
+        """Удаляет стикеры доски одним DELETE; возвращает id удалённых."""
+        result = await session.execute(
+            delete(Sticker)
+            .where(and_(
+                Sticker.id.in_(sticker_ids),
+                Sticker.dashboard_id == dashboard_id
+            ))
+            .returning(Sticker.id)
+        )
+        return list(result.scalars().all())
 
-            await session.commit()
-            return result.scalar_one_or_none() is not None
+    async def get_dashboard_id(self, session: AsyncSession, sticker_id: uuid.UUID) -> Optional[uuid.UUID]: # noqa
+        result = await session.execute(
+            select(Sticker.dashboard_id).where(Sticker.id == sticker_id)
+        )
+        return result.scalar_one_or_none()
 
     async def get_stickers_by_dashboard(
             self,
+            session: AsyncSession,
             dashboard_id: uuid.UUID,
             user_id: uuid.UUID
     ) -> List[Sticker]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
-            if not role:
-                return []
-            result = await session.execute(
-                select(Sticker)
-                .where(Sticker.dashboard_id == dashboard_id)
-            )
-            return list(result.scalars().all())
+        role = await self.dashboard_role_repository.get_user_role(session, dashboard_id, user_id)
+        if not role:
+            return []
+        result = await session.execute(
+            select(Sticker)
+            .where(Sticker.dashboard_id == dashboard_id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    def _page_query(dashboard_id: uuid.UUID, after: Optional[uuid.UUID], limit: Optional[int]):
+        """Стикеры доски по возрастанию id после ``after``; идёт по индексу (dashboard_id, id)."""
+        query = select(Sticker).where(Sticker.dashboard_id == dashboard_id)
+        if after is not None:
+            query = query.where(Sticker.id > after)
+        query = query.order_by(Sticker.id)
+        return query if limit is None else query.limit(limit)
+
+    async def get_stickers_page(
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            after: Optional[uuid.UUID],
+            limit: int
+    ) -> List[Sticker]:
+        result = await session.execute(self._page_query(dashboard_id, after, limit))
+        return list(result.scalars())
+
+    async def stream_stickers(
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            after: Optional[uuid.UUID],
+            limit: Optional[int] = None
+    ) -> AsyncIterator[List[Sticker]]:
+        """Стикеры доски пачками из серверного курсора: в памяти не больше одной пачки."""
+        result = await session.stream_scalars(
+            self._page_query(dashboard_id, after, limit).execution_options(yield_per=STREAM_BATCH)
+        )
+        async for stickers in result.partitions():
+            yield stickers
+
+    async def get_stickers_in_area( # noqa
+            self,
+            session: AsyncSession,
+            dashboard_id: uuid.UUID,
+            x0: float,
+            y0: float,
+            x1: float,
+            y1: float
+    ) -> List[Sticker]:
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        result = await session.execute(
+            select(Sticker)
+            .where(and_(
+                Sticker.dashboard_id == dashboard_id,
+                Sticker.x <= x1,
+                Sticker.x + Sticker.width >= x0,
+                Sticker.y <= y1,
+                Sticker.y + Sticker.height >= y0
+            ))
+        )
+        return list(result.scalars().all())
 
     async def get_sticker(
             self,
+            session: AsyncSession,
             sticker_id: uuid.UUID,
             dashboard_id: uuid.UUID,
             user_id: uuid.UUID
     ) -> Optional[Sticker]:
-        session: AsyncSession = db_helper.session_getter()
-        async with session:
-            role = await self.dashboard_role_repository.get_user_role(
-                session, dashboard_id, user_id
-            )
-            if not role:
-                raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
-
-            result = await session.execute(
-                select(Sticker)
-                .where(and_(
-                    Sticker.id == sticker_id,
-                    Sticker.dashboard_id == dashboard_id
-                ))
-            )
-            return result.scalar_one_or_none()
+        role = await self.dashboard_role_repository.get_user_role(
+            session, dashboard_id, user_id
+        )
+        if not role:
+            raise NotFoundRoleException(user_id=user_id, dashboard_id=dashboard_id)
+
+        result = await session.execute(
+            select(Sticker)
+            .where(and_(
+                Sticker.id == sticker_id,
+                Sticker.dashboard_id == dashboard_id
+            ))
+        )
+        return result.scalar_one_or_none()
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from kink import di
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config.config import settings
+from exceptions import ServiceUnavailableException
+from repository.dashboard_repository import DashboardRepository
+from repository.db_helper import db_helper
+from repository.sticker_repository import StickerRepository
+
+logger = logging.getLogger(__name__)
+
+# значения колонок с id и dashboard_id, изменённые колонки, номер изменения
+Entry = Tuple[dict, FrozenSet[str], int]
+
+
+class StickerWriteBuffer:
+    """Отложенная запись изменений стикеров (write-behind).
+
+    Хранит последние значения стикера по его id и набор изменённых полей:
+    подряд идущие изменения одного стикера (перетаскивание) схлопываются в
+    одну строку. Раз в ``flush_interval`` секунд, при ``max_size`` стикерах
+    и при ``close`` буфер пишется в БД одной транзакцией: UPDATE пачкой
+    только изменённых колонок — правка текста, сделанная другим воркером
+    после чтения стикера, не затирается перемещением, — и по доске
+    увеличение версии на число принятых изменений, так что версии те же,
+    что и при немедленной записи.
+
+    Буфер свой у каждого процесса: чтения через него видят изменения сразу,
+    другие воркеры — после сброса. При ошибке записи изменения остаются в
+    буфере до следующего сброса; пока БД их не принимает, буфер растёт
+    только до ``max_pending`` стикеров, а изменения других стикеров сверх
+    этого получают 503, как и перегруженный ``PasswordHasher``.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_interval: float = 0.2,
+        max_size: int = 1000,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.max_pending = max(max_pending, max_size)
+        # id стикера -> Entry
+        self._entries: Dict[uuid.UUID, Entry] = {}
+        self._by_dashboard: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        # изменений доски, ещё не учтённых в её версии в БД
+        self._versions: Dict[uuid.UUID, int] = {}
+        self._seq = 0
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows = 0
+        self.errors = 0
+        self.rejected = 0
+        # monotonic-время последнего неудачного сброса
+        self._failed_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dirty(self) -> bool:
+        """Есть изменения, ещё не записанные в БД (в том числе только версии)."""
+        return bool(self._versions)
+
+    def get(self, sticker_id: uuid.UUID) -> Optional[dict]:
+        """Значения стикера из буфера (не изменять) или None."""
+        entry = self._entries.get(sticker_id)
+        return None if entry is None else entry[0]
+
+    def changes(self, sticker_id: uuid.UUID) -> Optional[dict]:
+        """Только изменённые и ещё не записанные колонки стикера или None."""
+        entry = self._entries.get(sticker_id)
+        return None if entry is None else {field: entry[0][field] for field in entry[1]}
+
+    def dashboard(self, dashboard_id: uuid.UUID) -> List[dict]:
+        """Значения всех стикеров доски в буфере."""
+        return [self._entries[sticker_id][0] for sticker_id in self._by_dashboard.get(dashboard_id, ())]
+
+    def pending_versions(self, dashboard_id: uuid.UUID) -> int:
+        """На сколько версия доски опережает записанную в БД."""
+        return self._versions.get(dashboard_id, 0)
+
+    async def put(self, values: dict, changes: dict) -> dict:
+        """Принимает изменение стикера; возвращает его новые значения.
+
+        ``values`` — стикер, только что прочитанный из БД; поверх него
+        накладываются ещё не записанные поля из буфера и ``changes`` в
+        момент вызова, так что конкурентные изменения разных полей не
+        теряются.
+        """
+        sticker_id, dashboard_id = values["id"], values["dashboard_id"]
+        entry = self._entries.get(sticker_id)
+        if entry is None and len(self._entries) >= self.max_pending:
+            # сбросы не проходят: не копим память без предела, изменение уже стикера в буфере места не требует
+            self.rejected += 1
+            raise ServiceUnavailableException()
+        fields = frozenset(changes)
+        if entry is not None:
+            self.coalesced += 1
+            values = {**values, **{field: entry[0][field] for field in entry[1]}}
+            fields |= entry[1]
+        self._seq += 1
+        values = {**values, **changes}
+        self._entries[sticker_id] = (values, fields, self._seq)
+        self._by_dashboard.setdefault(dashboard_id, set()).add(sticker_id)
+        self._versions[dashboard_id] = self._versions.get(dashboard_id, 0) + 1
+        self.updates += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+        if len(self._entries) >= self.max_size and time.monotonic() - self._failed_at >= self.flush_interval:
+            # заполнивший буфер запрос ждёт сброса: запись в БД не отстаёт бесконечно;
+            # после неудачного сброса повторяет только фоновая задача, а не каждый запрос
+            await self.flush()
+        return values
+
+    def discard(self, sticker_id: uuid.UUID) -> None:
+        """Забывает изменения удалённого стикера; версия доски их всё равно учитывает."""
+        entry = self._entries.pop(sticker_id, None)
+        if entry is not None:
+            self._unlink(entry[0]["dashboard_id"], sticker_id)
+
+    def discard_dashboard(self, dashboard_id: uuid.UUID) -> None:
+        for sticker_id in self._by_dashboard.pop(dashboard_id, ()):
+            del self._entries[sticker_id]
+        self._versions.pop(dashboard_id, None)
+
+    async def flush(self, dashboard_id: Optional[uuid.UUID] = None) -> None:
+        """Пишет буфер (или только изменения доски ``dashboard_id``) в БД.
+
+        Перед записью в обход буфера вызывающий сбрасывает доску, иначе
+        поздний сброс затрёт новые значения, а If-Match сравнится со
+        старой версией.
+        """
+        if dashboard_id is not None and dashboard_id not in self._versions:
+            return
+        async with self._lock:
+            dashboard_ids = list(self._versions) if dashboard_id is None else [dashboard_id]
+            versions = {board_id: self._versions[board_id] for board_id in dashboard_ids if board_id in self._versions}
+            if not versions:
+                return
+            taken = {
+                sticker_id: self._entries[sticker_id]
+                for board_id in versions
+                for sticker_id in self._by_dashboard.get(board_id, ())
+            }
+            try:
+                async with self.session_factory() as session:
+                    # executemany требует одного набора колонок: по запросу на набор
+                    groups: Dict[FrozenSet[str], List[Tuple[uuid.UUID, dict]]] = {}
+                    for sticker_id, (values, fields, _) in taken.items():
+                        groups.setdefault(fields, []).append(
+                            (sticker_id, {field: values[field] for field in fields})
+                        )
+                    for updates in groups.values():
+                        await di[StickerRepository].write_stickers(session, updates)
+                    await di[DashboardRepository].add_versions(session, versions)
+                    await session.commit()
+                    # без await после commit: записанное не может остаться в буфере и записаться дважды
+                    self._forget(taken, versions)
+            except Exception:
+                self.errors += 1
+                self._failed_at = time.monotonic()
+                logger.exception("Sticker write-behind flush failed")
+
+    def _forget(self, taken: Dict[uuid.UUID, Entry], versions: Dict[uuid.UUID, int]) -> None:
+        self.flushes += 1
+        self.rows += len(taken)
+        # изменения, пришедшие во время записи, остаются до следующего сброса
+        for sticker_id, (values, _, seq) in taken.items():
+            entry = self._entries.get(sticker_id)
+            if entry is not None and entry[2] == seq:
+                del self._entries[sticker_id]
+                self._unlink(values["dashboard_id"], sticker_id)
+        for dashboard_id, n in versions.items():
+            left = self._versions.get(dashboard_id, 0) - n
+            if left > 0:
+                self._versions[dashboard_id] = left
+            else:
+                self._versions.pop(dashboard_id, None)
+
+    async def _run(self) -> None:
+        while self._versions:
+            await asyncio.sleep(self.flush_interval)
+            # отмена при остановке не должна прерывать начатую транзакцию
+            await asyncio.shield(self.flush())
+
+    async def close(self) -> None:
+        """Останавливает фоновый сброс и пишет всё, что осталось."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self.flush()
+        # замок привязан к циклу событий; приложение, поднятое в процессе заново, получит новый
+        self._lock = asyncio.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "updates": self.updates,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "errors": self.errors,
+            "rejected": self.rejected,
+        }
+
+    def _unlink(self, dashboard_id: uuid.UUID, sticker_id: uuid.UUID) -> None:
+        stickers = self._by_dashboard.get(dashboard_id)
+        if stickers is not None:
+            stickers.discard(sticker_id)
+            if not stickers:
+                del self._by_dashboard[dashboard_id]
+
+
+sticker_write_buffer = StickerWriteBuffer(
+    db_helper.session_factory,
+    flush_interval=settings.write_behind.flush_interval,
+    max_size=settings.write_behind.max_size,
+    max_pending=settings.write_behind.max_pending,
+) if settings.write_behind.enabled else None
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -28,6 +28,21 @@ class BoardFull(BaseModel):
     stickers: List["Sticker"] = Field(default_factory=list)
 
 
+class BoardChanges(BaseModel):
+    """Изменения доски после версии ``since``; каждая сущность — в текущем виде.
+
+    ``resync`` — изменений столько, что журнал их уже не хранит: доску нужно
+    перечитать через GET /boards/{id}.
+    """
+    version: int
+    resync: bool = False
+    name: Optional[str] = None
+    stickers: List["Sticker"] = Field(default_factory=list)
+    removed_stickers: List[str] = Field(default_factory=list)
+    members: List["BoardMember"] = Field(default_factory=list)
+    removed_members: List[str] = Field(default_factory=list)
+
+
 class CreateBoardRequest(BaseModel):
     name: str
 
@@ -36,4 +51,5 @@ class UpdateBoardRequest(BaseModel):
     name: str
 
 
+from schema.role import BoardMember  # noqa: E402  pylint: disable=wrong-import-position
 from schema.sticker import Sticker  # noqa: E402  pylint: disable=wrong-import-position
@@ -1,5 +1,15 @@
-from typing import Literal
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+
+# операций в одном запросе /stickers:batch
+BATCH_LIMIT = 500
+# пределы координат и размеров стикера: бесконечность, NaN и километровые
+# стикеры отклоняются до того, как попадут в хранилище и индекс
+COORDINATE_LIMIT = 1e9
+SIZE_LIMIT = 1e6
+
+Coordinate = Annotated[float, Field(ge=-COORDINATE_LIMIT, le=COORDINATE_LIMIT, allow_inf_nan=False)]
+Size = Annotated[float, Field(ge=-SIZE_LIMIT, le=SIZE_LIMIT, allow_inf_nan=False)]
 
 
 class Sticker(BaseModel):
@@ -15,18 +25,69 @@ class Sticker(BaseModel):
 
 class CreateStickerRequest(BaseModel):
     dashboard_id: str
-    x: float
-    y: float
+    x: Coordinate
+    y: Coordinate
     text: str
-    width: float
-    height: float
+    width: Size
+    height: Size
     color: str
 
 
 class UpdateStickerRequest(BaseModel):
-    x: float
-    y: float
+    x: Coordinate
+    y: Coordinate
     text: str
-    width: float
-    height: float
+    width: Size
+    height: Size
     color: str
+
+
+class PatchStickerRequest(BaseModel):
+    """Частичное обновление: пишутся только переданные поля."""
+    x: Optional[Coordinate] = None
+    y: Optional[Coordinate] = None
+    text: Optional[str] = None
+    width: Optional[Size] = None
+    height: Optional[Size] = None
+    color: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        fields = self.model_fields_set & PatchStickerRequest.model_fields.keys()
+        if not fields:
+            raise ValueError("Нет полей для обновления")
+        if any(getattr(self, field) is None for field in fields):
+            raise ValueError("Поля стикера не могут быть null")
+        return self
+
+    def changes(self) -> dict:
+        return self.model_dump(include=PatchStickerRequest.model_fields.keys(), exclude_unset=True)
+
+
+class BatchStickerUpdate(PatchStickerRequest):
+    id: str
+
+
+class BatchCreateStickersRequest(BaseModel):
+    dashboard_id: str
+    stickers: List[UpdateStickerRequest] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
+class BatchUpdateStickersRequest(BaseModel):
+    dashboard_id: str
+    stickers: List[BatchStickerUpdate] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
+class BatchDeleteStickersRequest(BaseModel):
+    dashboard_id: str
+    ids: List[str] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: int
+    sticker: Optional[Sticker] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
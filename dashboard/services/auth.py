@@ -2,25 +2,27 @@ import base64
 import jwt
 import re
 import hashlib
-import status
 import uuid
 
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Depends, HTTPException, Security
+from functools import lru_cache
+from fastapi import FastAPI, Depends, HTTPException, Security, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel, SecuritySchemeType, APIKey
 from fastapi.openapi.utils import get_openapi
 # from jwt.exceptions import JWTError
 from pydantic import BaseModel, ValidationError, EmailStr, Field
-from sqlalchemy import create_engine, Column, String, DateTime
+from sqlalchemy import create_engine, Column, String, DateTime, Index, Uuid, func, select
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
 from typing import List, Optional
 import uvicorn
 from uuid import UUID, uuid4
-from passlib.context import CryptContext
 from pydantic import constr
 
+from services.password_hasher import PasswordHasher, password_hasher
+from services.user_store import normalize_email
+
 # Configuration (replace with your actual config loading)
 class Settings:
     SECRET_KEY: str = "your_secret_key_here"  # Load from config or env
@@ -32,13 +34,16 @@ class Settings:
 
 settings = Settings()
 
-# Database setup
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database setup: движок создаётся при первой сессии, драйвер pyodbc нужен только тогда
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+@lru_cache
+def get_engine():
+    return create_engine(settings.SQLALCHEMY_DATABASE_URL)
 
 # Dependency to get DB session
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
@@ -130,13 +135,34 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid4)
+    email = Column(String(255), nullable=False)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # поиск идёт по lower(email), поэтому уникальный индекс тоже по выражению
+    __table_args__ = (Index("ix_users_email_lower", func.lower(email), unique=True),)
+
+class AuthDbContext:
+    """Доступ к пользователям с поиском по индексу lower(email) вместо предикатов."""
+
+    def __init__(self, db: Session):
+        self._db = db
+
+    async def users_exists_by_email_async(self, email):
+        query = select(User.id).where(func.lower(User.email) == normalize_email(email)).limit(1)
+        return self._db.scalar(query) is not None
+
+    async def users_find_by_email_async(self, email):
+        return self._db.scalar(select(User).where(func.lower(User.email) == normalize_email(email)))
+
+    def users_add(self, user):
+        self._db.add(User(id=user.id, email=user.email, password_hash=user.password_hash))
+
+    async def save_changes_async(self):
+        self._db.commit()
+
 # Auth service interface and implementation
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
@@ -187,9 +213,11 @@ class UserFields:
         self.password_hash = password_hash
 
 class AuthService:
-    def __init__(self, context, configuration):
+    def __init__(self, context, configuration, hasher: PasswordHasher = password_hasher):
         self._context = context
         self._configuration = configuration
+        # хэширование уходит в пул потоков, чтобы не блокировать event loop
+        self._hasher = hasher
 
     async def register_async(self, email, password):
         # Валидация email
@@ -201,12 +229,12 @@ class AuthService:
             return AuthResult(success=False, error_message="Пароль должен содержать минимум 6 символов")
 
         # Проверка существования пользователя
-        email_lower = email.lower()
-        if await self._context.users_any_async(lambda u: u.email == email_lower):
+        email_lower = normalize_email(email)
+        if await self._context.users_exists_by_email_async(email_lower):
             return AuthResult(success=False, error_message="Пользователь с таким email уже существует")
 
         # Хэширование пароля
-        password_hash = self.hash_password(password)
+        password_hash = await self._hasher.run(self.hash_password, password)
 
         # Создание пользователя
         user = UserFields(
@@ -221,10 +249,10 @@ class AuthService:
         return AuthResult(success=True, user_id=user.id)
 
     async def login_async(self, email, password):
-        email_lower = email.lower()
-        user = await self._context.users_first_or_default_async(lambda u: u.email == email_lower)
+        email_lower = normalize_email(email)
+        user = await self._context.users_find_by_email_async(email_lower)
 
-        if user is None or not self.verify_password(password, user.password_hash):
+        if user is None or not await self._hasher.run(self.verify_password, password, user.password_hash):
             return LoginResult(success=False)
 
         token = self.generate_jwt_token(user)
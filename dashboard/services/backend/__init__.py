@@ -0,0 +1,53 @@
+__all__ = (
+    "BoardBackend",
+    "get_backend",
+    "open_backend",
+)
+
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+
+from config.config import settings
+from .base import BoardBackend
+
+if settings.storage.backend == "database":
+    from fastapi import Depends, Request
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from core.security import get_current_user
+    from repository import db_helper
+    from .repository_backend import RepositoryBackend
+
+    # запросы, которые только читают и могут идти на реплику
+    READ_METHODS = ("GET", "HEAD")
+
+    async def _request_session(
+        request: Request, current_user: dict = Depends(get_current_user)
+    ) -> AsyncIterator[AsyncSession]:
+        async with db_helper.session(read_only=request.method in READ_METHODS, user_id=current_user["id"]) as session:
+            yield session
+
+    def get_backend(session: AsyncSession = Depends(_request_session)) -> BoardBackend:
+        """FastAPI-зависимость: бэкенд на сессии текущего запроса (GET — на реплике)."""
+        return RepositoryBackend(session=session)
+
+    @asynccontextmanager
+    async def open_backend(user_id: Optional[str] = None) -> AsyncIterator[BoardBackend]:
+        """Бэкенд для чтения вне HTTP-запроса (WebSocket, потоки): короткая сессия на реплике."""
+        async with db_helper.session(read_only=True, user_id=user_id) as session:
+            yield RepositoryBackend(session=session)
+
+else:
+    @lru_cache
+    def get_backend() -> BoardBackend:
+        """FastAPI-зависимость: бэкенд поверх in-memory State."""
+        from services.state import state
+        from .state_backend import StateBackend
+
+        return StateBackend(state)
+
+    @asynccontextmanager
+    async def open_backend(user_id: Optional[str] = None) -> AsyncIterator[BoardBackend]:
+        """Бэкенд для чтения вне HTTP-запроса (WebSocket, потоки)."""
+        yield get_backend()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from core.etag import IfMatch
+from services.board_payload import board_json
+
+
+class BoardBackend(ABC):
+    """Хранилище досок, участников и стикеров, с которым работают ручки API.
+
+    Каждый метод получает id пользователя, от имени которого выполняется
+    операция, и сам проверяет его права. Ошибки поднимаются исключениями из
+    ``exceptions.py``; ручки превращают их в HTTP-ответы.
+
+    Доска возвращается как ``{"id", "name", "role", "version", "stickers"}``,
+    где ``version`` прочитана не позже стикеров; элемент
+    списка досок — ``{"id", "name", "role"}``, стикер — словарь с полями
+    схемы ``schema.sticker.Sticker``.
+
+    Записи принимают ``if_match`` — допустимые версии доски из If-Match; при
+    несовпадении поднимается PreconditionFailedException и ничего не меняется.
+    """
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Вызывает ``callback``, когда записи запроса зафиксированы; здесь — сразу.
+
+        Через него ручки рассылают события подписчикам: изменения, которые
+        потом откатятся, до клиентов не доходят.
+        """
+        callback()
+
+    # -----------------
+    # BOARDS
+    # -----------------
+    @abstractmethod
+    async def list_boards(self, user_id: str, after: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Доски пользователя; с ``after`` / ``limit`` — по возрастанию id, строго после ``after``."""
+
+    @abstractmethod
+    async def create_board(self, user_id: str, name: str) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_board(self, board_id: str, user_id: str) -> dict:
+        ...
+
+    async def get_board_json(self, board_id: str, user_id: str) -> Tuple[int, bytes]:
+        """Версия доски и готовый JSON ответа GET /boards/{id}."""
+        board = await self.get_board(board_id, user_id)
+        return board["version"], self.encode_board(board)
+
+    def encode_board(self, board: dict) -> bytes:
+        """JSON доски, полученной из этого бэкенда, в форме ``BoardFull``."""
+        return board_json(board)
+
+    @abstractmethod
+    async def get_board_version(self, board_id: str, user_id: str) -> int:
+        """Версия доски с проверкой доступа, без чтения стикеров."""
+
+    @abstractmethod
+    async def get_changes(self, board_id: str, user_id: str, since: int) -> dict:
+        """Изменения после версии ``since`` в виде ``schema.dashboard.BoardChanges``;
+        ``members`` — словарь ``{user_id: role}``."""
+
+    @abstractmethod
+    async def rename_board(self, board_id: str, user_id: str, name: str, if_match: IfMatch = None) -> dict:
+        ...
+
+    @abstractmethod
+    async def delete_board(self, board_id: str, user_id: str, if_match: IfMatch = None) -> None:
+        ...
+
+    @abstractmethod
+    async def query_stickers(
+        self, board_id: str, user_id: str, x0: float, y0: float, x1: float, y1: float
+    ) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def list_stickers(self, board_id: str, user_id: str, after: Optional[str], limit: int) -> List[dict]:
+        """Страница стикеров доски по возрастанию id, строго после ``after``."""
+
+    @abstractmethod
+    def stream_stickers(
+        self, board_id: str, user_id: str, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> AsyncIterator[List[dict]]:
+        """Стикеры доски пачками в том же порядке, не собирая их в один список."""
+
+    # -----------------
+    # MEMBERS
+    # -----------------
+    @abstractmethod
+    async def list_members(self, board_id: str, user_id: str) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    async def invite_member(
+        self, board_id: str, user_id: str, invitee_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def update_member_role(
+        self, board_id: str, user_id: str, member_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def remove_member(self, board_id: str, user_id: str, member_id: str, if_match: IfMatch = None) -> None:
+        ...
+
+    # -----------------
+    # STICKERS
+    # -----------------
+    @abstractmethod
+    async def create_sticker(self, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_sticker(self, sticker_id: str, user_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    async def update_sticker(self, sticker_id: str, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        """``data`` — только изменяемые поля; остальные колонки не пишутся."""
+
+    @abstractmethod
+    async def delete_sticker(self, sticker_id: str, user_id: str, if_match: IfMatch = None) -> str:
+        """Возвращает id доски удалённого стикера."""
+
+    # Пакетные операции над стикерами одной доски: права проверяются один
+    # раз, изменения применяются атомарно, результат — по элементу на вход.
+    @abstractmethod
+    async def create_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def update_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[Optional[dict]]:
+        """``items`` — ``{"id", ...поля}``; None для стикеров не с этой доски."""
+
+    @abstractmethod
+    async def delete_stickers(
+        self, board_id: str, user_id: str, sticker_ids: List[str], if_match: IfMatch = None
+    ) -> List[bool]:
+        ...
@@ -0,0 +1,540 @@
+from __future__ import annotations
+
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NoReturn, Optional, TypeVar
+
+from kink import inject
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.etag import IfMatch
+from exceptions import AccessDeniedException, NotFoundException, PreconditionFailedException, ValidationException
+from models.user_role import UserRole
+from repository.dashboard_repository import DashboardRepository
+from repository.dashboard_role_repository import DashboardRoleRepository
+from repository.entities import Sticker
+from repository.exceptions.incorrect_role_exception import IncorrectRoleException
+from repository.exceptions.not_find_role_exception import NotFoundRoleException
+from repository.group_commit import group_commit
+from repository.sticker_repository import EDITOR_ROLES, StickerRepository
+from repository.write_buffer import sticker_write_buffer
+from services.backend.base import BoardBackend
+
+STICKER_FIELDS = ("x", "y", "text", "width", "height", "color")
+
+T = TypeVar("T")
+
+
+def _uuid(value: str, message: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise NotFoundException(message) from None
+
+
+def _api_role(role: UserRole) -> str:
+    return UserRole.CREATOR.value if role == UserRole.OWNER else UserRole(role).value
+
+
+def _try_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _cursor(after: Optional[str]) -> Optional[uuid.UUID]:
+    if after is None:
+        return None
+    try:
+        return uuid.UUID(after)
+    except ValueError:
+        raise ValidationException("Неверный курсор") from None
+
+
+def _db_role(role: str) -> UserRole:
+    return UserRole.OWNER if role == UserRole.CREATOR else UserRole(role)
+
+
+def _sticker_dict(sticker: Sticker) -> dict:
+    return {
+        "id": str(sticker.id),
+        "dashboard_id": str(sticker.dashboard_id),
+        "x": sticker.x,
+        "y": sticker.y,
+        "text": sticker.text,
+        "width": sticker.width,
+        "height": sticker.height,
+        "color": sticker.color,
+    }
+
+
+def _optional_sticker_dict(sticker: Optional[Sticker]) -> Optional[dict]:
+    return None if sticker is None else _sticker_dict(sticker)
+
+
+def _buffered_dict(values: dict) -> dict:
+    return {**values, "id": str(values["id"]), "dashboard_id": str(values["dashboard_id"])}
+
+
+def _run_after_commit(session) -> None:
+    for callback in session.info.pop("after_commit", ()):
+        callback()
+
+
+def _in_area(sticker: dict, x0: float, y0: float, x1: float, y1: float) -> bool:
+    """То же условие, что у ``StickerRepository.get_stickers_in_area``."""
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    return (
+        sticker["x"] <= x1 and sticker["x"] + sticker["width"] >= x0
+        and sticker["y"] <= y1 and sticker["y"] + sticker["height"] >= y0
+    )
+
+
+@inject
+class RepositoryBackend(BoardBackend):
+    """Бэкенд поверх SQLAlchemy-репозиториев; состояние общее для всех воркеров.
+
+    Создаётся на каждый запрос: все репозитории работают в одной сессии
+    ``db_helper.session`` с одной транзакцией, commit — после обработчика.
+    GET и HEAD получают сессию на реплике (по кругу, с пропуском недоступных),
+    кроме пользователей, писавших последние ``read_your_writes`` секунд;
+    записи и их чтения — в основной БД. С включённым write-behind изменения
+    стикеров без If-Match идут в ``sticker_write_buffer``, а чтения
+    накладывают его значения и версии поверх прочитанного из БД. С общим
+    коммитом одиночные записи стикеров идут в транзакцию ``group_commit``.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        dashboard_repository: DashboardRepository,
+        dashboard_role_repository: DashboardRoleRepository,
+        sticker_repository: StickerRepository,
+    ):
+        self.session = session
+        self.dashboards = dashboard_repository
+        self.roles = dashboard_role_repository
+        self.stickers = sticker_repository
+        self.buffer = sticker_write_buffer
+        self.group = group_commit
+        # запись уже зафиксирована общим коммитом или принята буфером, а не ждёт сессию запроса
+        self.written_through = False
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Откладывает ``callback`` до commit сессии запроса; при rollback он не вызывается.
+
+        Если запись прошла мимо сессии (общий коммит, буфер), она уже видна
+        другим запросам, и ``callback`` вызывается сразу.
+        """
+        if self.written_through:
+            callback()
+            return
+        callbacks = self.session.info.get("after_commit")
+        if callbacks is None:
+            callbacks = self.session.info["after_commit"] = []
+            event.listen(self.session.sync_session, "after_commit", _run_after_commit, once=True)
+        callbacks.append(callback)
+
+    async def _deny(self, dashboard_id: uuid.UUID, message: str) -> NoReturn:
+        """Роли нет либо у пользователя, либо у доски вообще — отличаем 404 от 403."""
+        if not await self.dashboards.exists(self.session, dashboard_id):
+            raise NotFoundException("Доска не найдена")
+        raise AccessDeniedException(message)
+
+    async def _require_role(self, dashboard_id: uuid.UUID, user_id: uuid.UUID) -> UserRole:
+        role = await self.roles.get_user_role(self.session, dashboard_id, user_id)
+        if role is None:
+            await self._deny(dashboard_id, "Нет доступа к доске")
+        return role
+
+    async def _require_editor(self, dashboard_id: uuid.UUID, user_id: uuid.UUID, message: str) -> None:
+        role = await self._require_role(dashboard_id, user_id)
+        if role not in (UserRole.OWNER, UserRole.EDITOR):
+            raise AccessDeniedException(message)
+
+    @asynccontextmanager
+    async def _owner_only(self, dashboard_id: uuid.UUID, message: str) -> AsyncIterator[None]:
+        """Переводит ошибки роли из репозитория в 404/403 для действий creator."""
+        try:
+            yield
+        except NotFoundRoleException:
+            await self._deny(dashboard_id, "Нет доступа к доске")
+        except IncorrectRoleException:
+            raise AccessDeniedException(message)
+
+    async def _check_owner(self, dashboard_id: uuid.UUID, user_id: uuid.UUID, message: str) -> None:
+        async with self._owner_only(dashboard_id, message):
+            await self.roles.check_is_user_owner(self.session, dashboard_id, user_id)
+
+    async def _bump(self, dashboard_id: uuid.UUID, if_match: IfMatch) -> None:
+        """Увеличивает версию доски после записи; с If-Match несовпадение откатывает всю транзакцию."""
+        version = await self.dashboards.bump_version(self.session, dashboard_id, if_match)
+        if version is None and if_match is not None:
+            raise PreconditionFailedException()
+
+    def _version(self, dashboard_id: uuid.UUID, version: int) -> int:
+        return version if self.buffer is None else version + self.buffer.pending_versions(dashboard_id)
+
+    def _sticker_dicts(self, stickers) -> List[dict]:
+        """Стикеры из БД; изменённые, но ещё не записанные поля — из буфера."""
+        if not self.buffer:
+            return [_sticker_dict(sticker) for sticker in stickers]
+        return [
+            _sticker_dict(sticker) if (changes := self.buffer.changes(sticker.id)) is None
+            else {**_sticker_dict(sticker), **changes}
+            for sticker in stickers
+        ]
+
+    async def _grouped(self, write: Callable[[RepositoryBackend], Awaitable[T]]) -> T:
+        """Запись на бэкенде поверх транзакции общего коммита, а без него — в сессии запроса.
+
+        Буфер отложенной записи здесь не сбрасывается: внутри пачки его сброс
+        ждал бы блокировок, которые держит сама пачка. Когда результат записи
+        зависит от буфера (проверка If-Match), вызывающий сбрасывает буфер доски
+        заранее (``_settle``); удаление стикера выбрасывает его изменения из
+        буфера, а без If-Match изменения стикера идут в сам буфер, мимо пачки.
+        """
+        if self.group is None:
+            return await write(self)
+        result = await self.group.run(lambda session: write(RepositoryBackend(session=session)))
+        self.written_through = True
+        return result
+
+    async def _settle(self, dashboard_id: uuid.UUID) -> None:
+        """Записывает изменения доски из буфера до записи в обход него (и до проверки If-Match)."""
+        if self.buffer is not None:
+            await self.buffer.flush(dashboard_id)
+
+    async def _settle_sticker(self, sticker_id: str) -> None:
+        if self.buffer is not None and self.buffer.dirty:
+            await self._settle(await self._sticker_dashboard_id(sticker_id))
+
+    async def _sticker_dashboard_id(self, sticker_id: str) -> uuid.UUID:
+        dashboard_id = await self.stickers.get_dashboard_id(self.session, _uuid(sticker_id, "Не найден"))
+        if dashboard_id is None:
+            raise NotFoundException("Не найден")
+        return dashboard_id
+
+    # -----------------
+    # BOARDS
+    # -----------------
+    async def list_boards(self, user_id: str, after: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        boards = await self.dashboards.get_user_dashboards(
+            self.session, uuid.UUID(user_id), _cursor(after), limit
+        )
+        return [
+            {"id": str(board.id), "name": board.name, "role": _api_role(board.role)}
+            for board in boards
+        ]
+
+    async def create_board(self, user_id: str, name: str) -> dict:
+        dashboard, _ = await self.dashboards.create_dashboard(self.session, name, uuid.UUID(user_id))
+        return {
+            "id": str(dashboard.id),
+            "name": dashboard.name,
+            "role": UserRole.CREATOR.value,
+            "version": dashboard.version,
+            "stickers": [],
+        }
+
+    async def get_board(self, board_id: str, user_id: str) -> dict:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        board = await self.dashboards.open_dashboard(self.session, dashboard_id, uuid.UUID(user_id))
+        if board is None:
+            await self._deny(dashboard_id, "Нет доступа к доске")
+        return {
+            "id": str(board.id),
+            "name": board.name,
+            "role": _api_role(board.role),
+            "version": self._version(dashboard_id, board.version),
+            "stickers": self._sticker_dicts(board.stickers),
+        }
+
+    async def get_board_version(self, board_id: str, user_id: str) -> int:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_role(dashboard_id, uuid.UUID(user_id))
+        version = await self.dashboards.get_version(self.session, dashboard_id)
+        if version is None:
+            raise NotFoundException("Доска не найдена")
+        return self._version(dashboard_id, version)
+
+    async def get_changes(self, board_id: str, user_id: str, since: int) -> dict:
+        # журнала изменений в БД нет: без изменений — пустой ответ, иначе полное перечитывание
+        version = await self.get_board_version(board_id, user_id)
+        return {"version": version, "resync": since != version}
+
+    async def rename_board(self, board_id: str, user_id: str, name: str, if_match: IfMatch = None) -> dict:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        try:
+            renamed = await self.dashboards.update_dashoard_name(
+                self.session, dashboard_id, name, uuid.UUID(user_id), if_match
+            )
+        except NotFoundRoleException:
+            await self._deny(dashboard_id, "Нет доступа к доске")
+        except IncorrectRoleException:
+            raise AccessDeniedException("Нет прав вносить изменения")
+        if not renamed and if_match is not None:
+            raise PreconditionFailedException()
+        return await self.get_board(board_id, user_id)
+
+    async def delete_board(self, board_id: str, user_id: str, if_match: IfMatch = None) -> None:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        try:
+            deleted = await self.dashboards.delete_by_id(self.session, dashboard_id, uuid.UUID(user_id), if_match)
+        except NotFoundRoleException:
+            await self._deny(dashboard_id, "Только creator может удалить доску")
+        except IncorrectRoleException:
+            raise AccessDeniedException("Только creator может удалить доску")
+        if not deleted:
+            if if_match is not None and await self.dashboards.exists(self.session, dashboard_id):
+                raise PreconditionFailedException()
+            raise NotFoundException("Доска не найдена")
+        if self.buffer is not None:
+            self.buffer.discard_dashboard(dashboard_id)
+
+    async def query_stickers(
+        self, board_id: str, user_id: str, x0: float, y0: float, x1: float, y1: float
+    ) -> List[dict]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_role(dashboard_id, uuid.UUID(user_id))
+        stickers = await self.stickers.get_stickers_in_area(self.session, dashboard_id, x0, y0, x1, y1)
+        if not self.buffer:
+            return [_sticker_dict(sticker) for sticker in stickers]
+        # стикер из буфера мог войти в область или покинуть её после записанной в БД позиции
+        buffered = self.buffer.dashboard(dashboard_id)
+        moved = {values["id"] for values in buffered}
+        return [_sticker_dict(sticker) for sticker in stickers if sticker.id not in moved] + [
+            _buffered_dict(values) for values in buffered if _in_area(values, x0, y0, x1, y1)
+        ]
+
+    async def list_stickers(self, board_id: str, user_id: str, after: Optional[str], limit: int) -> List[dict]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_role(dashboard_id, uuid.UUID(user_id))
+        stickers = await self.stickers.get_stickers_page(self.session, dashboard_id, _cursor(after), limit)
+        return self._sticker_dicts(stickers)
+
+    async def stream_stickers(
+        self, board_id: str, user_id: str, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> AsyncIterator[List[dict]]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_role(dashboard_id, uuid.UUID(user_id))
+        async for stickers in self.stickers.stream_stickers(self.session, dashboard_id, _cursor(after), limit):
+            yield self._sticker_dicts(stickers)
+            # прочитанные объекты не нужны сессии: карта идентичности не растёт с доской
+            for sticker in stickers:
+                self.session.expunge(sticker)
+
+    # -----------------
+    # MEMBERS
+    # -----------------
+    async def list_members(self, board_id: str, user_id: str) -> Dict[str, str]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        try:
+            members = await self.roles.get_dashboard_members(self.session, dashboard_id, uuid.UUID(user_id))
+        except NotFoundRoleException:
+            await self._deny(dashboard_id, "Нет доступа к доске")
+        return {str(member.user_id): _api_role(member.user_role) for member in members}
+
+    async def invite_member(
+        self, board_id: str, user_id: str, invitee_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        message = "Только creator может приглашать"
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        if invitee_id == user_id:
+            await self._check_owner(dashboard_id, uuid.UUID(user_id), message)
+            raise ValidationException("Нельзя пригласить самого себя")
+        async with self._owner_only(dashboard_id, message):
+            invited = await self.roles.invite_user(
+                self.session, dashboard_id, uuid.UUID(user_id), uuid.UUID(invitee_id), _db_role(role)
+            )
+            if invited is None:
+                await self.roles.update_user_role(
+                    self.session, dashboard_id, uuid.UUID(user_id), uuid.UUID(invitee_id), _db_role(role)
+                )
+        await self._bump(dashboard_id, if_match)
+
+    async def update_member_role(
+        self, board_id: str, user_id: str, member_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        member_uuid = _uuid(member_id, "Пользователь не найден")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        async with self._owner_only(dashboard_id, "Только creator может менять роли"):
+            updated = await self.roles.update_user_role(
+                self.session, dashboard_id, uuid.UUID(user_id), member_uuid, _db_role(role)
+            )
+        if updated is None:
+            raise NotFoundException("Пользователь не найден")
+        await self._bump(dashboard_id, if_match)
+
+    async def remove_member(self, board_id: str, user_id: str, member_id: str, if_match: IfMatch = None) -> None:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        member_uuid = _uuid(member_id, "Не найден")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        async with self._owner_only(dashboard_id, "Нет прав на удаление"):
+            removed = await self.roles.remove_user_role(self.session, dashboard_id, uuid.UUID(user_id), member_uuid)
+        if not removed:
+            member_role = await self.roles.get_user_role(self.session, dashboard_id, member_uuid)
+            if member_role == UserRole.OWNER:
+                raise AccessDeniedException("Нельзя удалить создателя")
+            raise NotFoundException("Не найден")
+        await self._bump(dashboard_id, if_match)
+
+    # -----------------
+    # STICKERS
+    # -----------------
+    async def create_sticker(self, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        dashboard_id = _uuid(data["dashboard_id"], "Доска не найдена")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        return await self._grouped(lambda backend: backend._create_sticker(dashboard_id, user_id, data, if_match))
+
+    async def _create_sticker(self, dashboard_id: uuid.UUID, user_id: str, data: dict, if_match: IfMatch) -> dict:
+        try:
+            sticker = await self.stickers.create_sticker(
+                self.session, dashboard_id, uuid.UUID(user_id), **{field: data[field] for field in STICKER_FIELDS}
+            )
+        except IncorrectRoleException as e:
+            if e.actual_role is None:
+                await self._deny(dashboard_id, "Нет доступа к доске")
+            raise AccessDeniedException("Нет прав редактировать доску")
+        await self._bump(dashboard_id, if_match)
+        return _sticker_dict(sticker)
+
+    async def get_sticker(self, sticker_id: str, user_id: str) -> dict:
+        dashboard_id = await self._sticker_dashboard_id(sticker_id)
+        try:
+            sticker = await self.stickers.get_sticker(self.session, uuid.UUID(sticker_id), dashboard_id, uuid.UUID(user_id))
+        except NotFoundRoleException:
+            raise AccessDeniedException("Нет доступа к доске")
+        if sticker is None:
+            raise NotFoundException("Не найден")
+        return self._sticker_dicts([sticker])[0]
+
+    async def update_sticker(self, sticker_id: str, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        changes = {field: data[field] for field in STICKER_FIELDS if field in data}
+        if self.buffer is not None:
+            if if_match is None:
+                return await self._update_buffered(sticker_id, user_id, changes)
+            await self._settle_sticker(sticker_id)
+        return await self._grouped(lambda backend: backend._update_sticker(sticker_id, user_id, changes, if_match))
+
+    async def _update_sticker(self, sticker_id: str, user_id: str, changes: dict, if_match: IfMatch) -> dict:
+        try:
+            sticker = await self.stickers.update_sticker(
+                self.session, _uuid(sticker_id, "Не найден"), uuid.UUID(user_id), **changes
+            )
+        except (NotFoundRoleException, IncorrectRoleException):
+            raise AccessDeniedException("Нет прав редактировать")
+        if sticker is None:
+            raise NotFoundException("Не найден")
+        await self._bump(sticker.dashboard_id, if_match)
+        return _sticker_dict(sticker)
+
+    async def _update_buffered(self, sticker_id: str, user_id: str, changes: dict) -> dict:
+        """Изменение стикера в буфер: из БД только чтение стикера с ролью, без записи.
+
+        Роль читается из БД при каждом изменении, не из кэша ролей: кэш
+        записей не разрешает, и удалённый с доски редактор теряет право
+        писать сразу, а не через TTL кэша.
+        """
+        found = await self.stickers.get_sticker_with_role(
+            self.session, _uuid(sticker_id, "Не найден"), uuid.UUID(user_id)
+        )
+        if found is None:
+            raise NotFoundException("Не найден")
+        sticker, role = found
+        values = {
+            "id": sticker.id,
+            "dashboard_id": sticker.dashboard_id,
+            **{field: getattr(sticker, field) for field in STICKER_FIELDS},
+        }
+        if role not in EDITOR_ROLES:
+            raise AccessDeniedException("Нет прав редактировать")
+        sticker = _buffered_dict(await self.buffer.put(values, changes))
+        self.written_through = True
+        return sticker
+
+    async def delete_sticker(self, sticker_id: str, user_id: str, if_match: IfMatch = None) -> str:
+        if if_match is not None:
+            await self._settle_sticker(sticker_id)
+        board_id = await self._grouped(lambda backend: backend._delete_sticker(sticker_id, user_id, if_match))
+        if self.buffer is not None:
+            self.buffer.discard(uuid.UUID(sticker_id))
+        return board_id
+
+    async def _delete_sticker(self, sticker_id: str, user_id: str, if_match: IfMatch) -> str:
+        try:
+            dashboard_id = await self.stickers.delete_sticker(
+                self.session, _uuid(sticker_id, "Не найден"), uuid.UUID(user_id)
+            )
+        except (NotFoundRoleException, IncorrectRoleException):
+            raise AccessDeniedException("Нет доступа")
+        if dashboard_id is None:
+            raise NotFoundException("Не найден")
+        await self._bump(dashboard_id, if_match)
+        return str(dashboard_id)
+
+    async def create_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[dict]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_editor(dashboard_id, uuid.UUID(user_id), "Нет прав редактировать доску")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        stickers = await self.stickers.create_stickers(
+            self.session, dashboard_id, [{field: item[field] for field in STICKER_FIELDS} for item in items]
+        )
+        await self._bump(dashboard_id, if_match)
+        return [_sticker_dict(sticker) for sticker in stickers]
+
+    async def update_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[Optional[dict]]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_editor(dashboard_id, uuid.UUID(user_id), "Нет прав редактировать")
+        # значения пачки новее буферизованных: буфер доски пишется раньше неё
+        await self._settle(dashboard_id)
+        updates = [
+            (sticker_id, {field: item[field] for field in STICKER_FIELDS if field in item})
+            for sticker_id, item in ((_try_uuid(item["id"]), item) for item in items)
+            if sticker_id is not None
+        ]
+        updated = iter(await self.stickers.update_stickers(self.session, dashboard_id, updates))
+        await self._bump(dashboard_id, if_match)
+        return [
+            None if _try_uuid(item["id"]) is None else _optional_sticker_dict(next(updated))
+            for item in items
+        ]
+
+    async def delete_stickers(
+        self, board_id: str, user_id: str, sticker_ids: List[str], if_match: IfMatch = None
+    ) -> List[bool]:
+        dashboard_id = _uuid(board_id, "Доска не найдена")
+        await self._require_editor(dashboard_id, uuid.UUID(user_id), "Нет доступа")
+        if if_match is not None:
+            await self._settle(dashboard_id)
+        ids = [_try_uuid(sticker_id) for sticker_id in sticker_ids]
+        deleted = set(await self.stickers.delete_stickers(
+            self.session, dashboard_id, [sticker_id for sticker_id in ids if sticker_id is not None]
+        ))
+        await self._bump(dashboard_id, if_match)
+        results = []
+        for sticker_id in ids:
+            results.append(sticker_id in deleted)
+            if sticker_id in deleted and self.buffer is not None:
+                self.buffer.discard(sticker_id)
+            # повторный id в пачке удалён только один раз
+            deleted.discard(sticker_id)
+        return results
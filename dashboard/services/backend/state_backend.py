@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from core.etag import IfMatch
+from exceptions import AccessDeniedException, NotFoundException, PreconditionFailedException, ValidationException
+from models.user_role import UserRole
+from services.backend.base import BoardBackend
+from services.board_payload import board_json
+from services.state import State
+
+
+class StateBackend(BoardBackend):
+    """Бэкенд поверх in-memory :class:`services.state.State`."""
+
+    def __init__(self, state: State) -> None:
+        self.state = state
+
+    def _get_board_or_404(self, board_id: str) -> dict:
+        board = self.state.get_board(board_id)
+        if board is None:
+            raise NotFoundException("Доска не найдена")
+        return board
+
+    def _require_member(self, board: dict, user_id: str) -> str:
+        role = board["members"].get(user_id)
+        if not role:
+            raise AccessDeniedException("Нет доступа к доске")
+        return role
+
+    def _require_editor(self, board: dict, user_id: str, message: str) -> str:
+        role = self._require_member(board, user_id)
+        if role == UserRole.VIEWER:
+            raise AccessDeniedException(message)
+        return role
+
+    def _require_creator(self, board: dict, user_id: str, message: str) -> None:
+        role = self._require_member(board, user_id)
+        if role != UserRole.CREATOR:
+            raise AccessDeniedException(message)
+
+    def _get_sticker_or_404(self, sticker_id: str) -> dict:
+        sticker = self.state.stickers.get(sticker_id)
+        if sticker is None:
+            raise NotFoundException("Не найден")
+        return sticker
+
+    @contextmanager
+    def _if_match(self, board_id: str, if_match: IfMatch) -> Iterator[None]:
+        """Сверяет версию доски и держит её блокировку до конца записи."""
+        with self.state.hold_board(board_id) as board:
+            if if_match is not None and board is not None and board["version"] not in if_match:
+                raise PreconditionFailedException()
+            yield
+
+    def _full_board(self, board: dict, role: str) -> dict:
+        version = board["version"]
+        return {
+            "id": board["id"],
+            "name": board["name"],
+            "role": role,
+            "version": version,
+            "stickers": self.state.get_board_stickers(board["id"]),
+        }
+
+    # -----------------
+    # BOARDS
+    # -----------------
+    async def list_boards(self, user_id: str, after: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        boards = self.state.boards
+        roles = self.state.get_user_boards(user_id)
+        board_ids = list(roles)
+        if after is not None or limit is not None:
+            board_ids.sort()
+            start = 0 if after is None else bisect_right(board_ids, after)
+            board_ids = board_ids[start:None if limit is None else start + limit]
+        return [
+            {"id": board_id, "name": boards[board_id]["name"], "role": roles[board_id]}
+            for board_id in board_ids
+            if board_id in boards
+        ]
+
+    async def create_board(self, user_id: str, name: str) -> dict:
+        board = self.state.add_board(name=name, creator_id=user_id)
+        return {
+            "id": board["id"],
+            "name": board["name"],
+            "role": UserRole.CREATOR.value,
+            "version": board["version"],
+            "stickers": [],
+        }
+
+    async def get_board(self, board_id: str, user_id: str) -> dict:
+        board = self._get_board_or_404(board_id)
+        role = self._require_member(board, user_id)
+        return self._full_board(board, role)
+
+    async def get_board_json(self, board_id: str, user_id: str) -> Tuple[int, bytes]:
+        board = self._get_board_or_404(board_id)
+        role = self._require_member(board, user_id)
+        payload = self.state.get_board_stickers_json(board_id)
+        if payload is None:
+            raise NotFoundException("Доска не найдена")
+        version, stickers = payload
+        return version, board_json({"id": board["id"], "name": board["name"], "role": role}, stickers)
+
+    def encode_board(self, board: dict) -> bytes:
+        payload = self.state.get_board_stickers_json(board["id"])
+        if payload is None or payload[0] != board["version"]:
+            return board_json(board)
+        return board_json(board, payload[1])
+
+    async def get_board_version(self, board_id: str, user_id: str) -> int:
+        board = self._get_board_or_404(board_id)
+        self._require_member(board, user_id)
+        return board["version"]
+
+    async def get_changes(self, board_id: str, user_id: str, since: int) -> dict:
+        self._require_member(self._get_board_or_404(board_id), user_id)
+        changes = self.state.get_changes(board_id, since)
+        if changes is None:
+            raise NotFoundException("Доска не найдена")
+        return changes
+
+    async def rename_board(self, board_id: str, user_id: str, name: str, if_match: IfMatch = None) -> dict:
+        board = self._get_board_or_404(board_id)
+        role = self._require_editor(board, user_id, "Нет прав вносить изменения")
+        with self._if_match(board_id, if_match):
+            self.state.rename_board(board_id, name)
+            return self._full_board(board, role)
+
+    async def delete_board(self, board_id: str, user_id: str, if_match: IfMatch = None) -> None:
+        board = self._get_board_or_404(board_id)
+        if board["creator_id"] != user_id:
+            raise AccessDeniedException("Только creator может удалить доску")
+        with self._if_match(board_id, if_match):
+            self.state.delete_board(board_id)
+
+    async def query_stickers(
+        self, board_id: str, user_id: str, x0: float, y0: float, x1: float, y1: float
+    ) -> List[dict]:
+        board = self._get_board_or_404(board_id)
+        self._require_member(board, user_id)
+        return self.state.query_stickers(board_id, x0, y0, x1, y1)
+
+    async def list_stickers(self, board_id: str, user_id: str, after: Optional[str], limit: int) -> List[dict]:
+        self._require_member(self._get_board_or_404(board_id), user_id)
+        return next(self.state.iter_sticker_batches(board_id, after, limit, batch_size=limit), [])
+
+    async def stream_stickers(
+        self, board_id: str, user_id: str, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> AsyncIterator[List[dict]]:
+        self._require_member(self._get_board_or_404(board_id), user_id)
+        for stickers in self.state.iter_sticker_batches(board_id, after, limit):
+            yield stickers
+
+    # -----------------
+    # MEMBERS
+    # -----------------
+    async def list_members(self, board_id: str, user_id: str) -> Dict[str, str]:
+        board = self._get_board_or_404(board_id)
+        self._require_member(board, user_id)
+        return self.state.get_members(board_id)
+
+    async def invite_member(
+        self, board_id: str, user_id: str, invitee_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        board = self._get_board_or_404(board_id)
+        self._require_creator(board, user_id, "Только creator может приглашать")
+        if invitee_id == user_id:
+            raise ValidationException("Нельзя пригласить самого себя")
+        with self._if_match(board_id, if_match):
+            self.state.set_member_role(board_id, invitee_id, role)
+
+    async def update_member_role(
+        self, board_id: str, user_id: str, member_id: str, role: str, if_match: IfMatch = None
+    ) -> None:
+        board = self._get_board_or_404(board_id)
+        self._require_creator(board, user_id, "Только creator может менять роли")
+        with self._if_match(board_id, if_match):
+            if not self.state.update_member_role(board_id, member_id, role):
+                raise NotFoundException("Пользователь не найден")
+
+    async def remove_member(self, board_id: str, user_id: str, member_id: str, if_match: IfMatch = None) -> None:
+        board = self._get_board_or_404(board_id)
+        self._require_creator(board, user_id, "Нет прав на удаление")
+        if member_id == board["creator_id"]:
+            raise AccessDeniedException("Нельзя удалить создателя")
+        with self._if_match(board_id, if_match):
+            if not self.state.remove_member(board_id, member_id):
+                raise NotFoundException("Не найден")
+
+    # -----------------
+    # STICKERS
+    # -----------------
+    async def create_sticker(self, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        board = self._get_board_or_404(data["dashboard_id"])
+        self._require_editor(board, user_id, "Нет прав редактировать доску")
+        with self._if_match(board["id"], if_match):
+            return self.state.add_sticker(data["dashboard_id"], data)
+
+    async def get_sticker(self, sticker_id: str, user_id: str) -> dict:
+        sticker = self._get_sticker_or_404(sticker_id)
+        board = self._get_board_or_404(sticker["dashboard_id"])
+        self._require_member(board, user_id)
+        return sticker
+
+    async def update_sticker(self, sticker_id: str, user_id: str, data: dict, if_match: IfMatch = None) -> dict:
+        board_id = self.state.stickers.board_of(sticker_id)
+        if board_id is None:
+            raise NotFoundException("Не найден")
+        board = self._get_board_or_404(board_id)
+        self._require_editor(board, user_id, "Нет прав редактировать")
+        with self._if_match(board_id, if_match):
+            updated = self.state.update_sticker(sticker_id, data)
+        if updated is None:
+            raise NotFoundException("Не найден")
+        return updated
+
+    async def delete_sticker(self, sticker_id: str, user_id: str, if_match: IfMatch = None) -> str:
+        board_id = self.state.stickers.board_of(sticker_id)
+        if board_id is None:
+            raise NotFoundException("Не найден")
+        board = self._get_board_or_404(board_id)
+        self._require_editor(board, user_id, "Нет доступа")
+        with self._if_match(board_id, if_match):
+            removed = self.state.remove_sticker(sticker_id)
+        if not removed:
+            raise NotFoundException("Не найден")
+        return board_id
+
+    async def create_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[dict]:
+        board = self._get_board_or_404(board_id)
+        self._require_editor(board, user_id, "Нет прав редактировать доску")
+        with self._if_match(board_id, if_match):
+            return self.state.add_stickers(board_id, [{**item, "dashboard_id": board_id} for item in items])
+
+    async def update_stickers(
+        self, board_id: str, user_id: str, items: List[dict], if_match: IfMatch = None
+    ) -> List[Optional[dict]]:
+        board = self._get_board_or_404(board_id)
+        self._require_editor(board, user_id, "Нет прав редактировать")
+        with self._if_match(board_id, if_match):
+            return self.state.update_stickers(board_id, items)
+
+    async def delete_stickers(
+        self, board_id: str, user_id: str, sticker_ids: List[str], if_match: IfMatch = None
+    ) -> List[bool]:
+        board = self._get_board_or_404(board_id)
+        self._require_editor(board, user_id, "Нет доступа")
+        with self._if_match(board_id, if_match):
+            return self.state.remove_stickers(board_id, sticker_ids)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from config.config import settings
+
+# Коды закрытия WebSocket
+GOING_AWAY = 1001
+TRY_AGAIN_LATER = 1013
+# 4000 + HTTP-статус, как при отказе в подключении: доступ к доске отозван
+ACCESS_REVOKED = 4403
+
+# Изменение сущности в окне накопления: ("sticker", id), ("member" / "cursor" / "presence", user_id),
+# ("board", None)
+EventKey = Tuple[str, Optional[str]]
+
+
+class BoardSubscriber:
+    """Подписчик доски: свой ограниченный буфер кадров и задача отправки."""
+
+    __slots__ = ("board_id", "user_id", "websocket", "buffer", "wakeup", "close_code", "sender")
+
+    def __init__(self, board_id: str, user_id: str, websocket: WebSocket) -> None:
+        self.board_id = board_id
+        self.user_id = user_id
+        self.websocket = websocket
+        self.buffer: Deque[str] = deque()
+        self.wakeup = asyncio.Event()
+        # код, с которым соединение закрывается сервером; None — подписчик активен
+        self.close_code: Optional[int] = None
+        self.sender: Optional[asyncio.Task] = None
+
+
+class BoardHub:
+    """Рассылка изменений досок подписчикам WebSocket в пределах процесса.
+
+    Ручки публикуют события после commit записи (``BoardBackend.after_commit``). События доски копятся
+    ``coalesce_window`` секунд; повторные изменения одной сущности за это
+    время схлопываются в последнее (создание и удаление внутри окна
+    взаимно уничтожаются). Кадр сериализуется один раз на доску и
+    раздаётся всем подписчикам; клиент, у которого в буфере больше
+    ``max_buffer`` неотправленных кадров, отключается с кодом 1013, чтобы не
+    держать память и не тормозить остальных.
+    """
+
+    def __init__(self, coalesce_window: float = 0.05, max_buffer: int = 256) -> None:
+        self.coalesce_window = coalesce_window
+        self.max_buffer = max_buffer
+        self._subscribers: Dict[str, Set[BoardSubscriber]] = {}
+        self._pending: Dict[str, Dict[EventKey, dict]] = {}
+        self._flushes: Dict[str, asyncio.TimerHandle] = {}
+        self.published = 0
+        self.coalesced = 0
+        self.frames = 0
+        self.dropped = 0
+
+    # -----------------
+    # PUBLISH
+    # -----------------
+    def publish(self, board_id: str, event: dict) -> None:
+        """Ставит событие доски в очередь рассылки; без подписчиков ничего не делает."""
+        if not self._subscribers.get(board_id):
+            return
+        self.published += 1
+        pending = self._pending.setdefault(board_id, {})
+        key = _event_key(event)
+        previous = pending.get(key)
+        if previous is not None:
+            self.coalesced += 1
+            if previous["type"] == "sticker.created":
+                if event["type"] == "sticker.deleted":
+                    # стикер появился и исчез внутри окна — подписчикам о нём знать незачем
+                    del pending[key]
+                    return
+                event = {**event, "type": "sticker.created"}
+            # последнее состояние сущности встаёт на место её последнего изменения
+            del pending[key]
+        pending[key] = event
+        if board_id not in self._flushes:
+            loop = asyncio.get_running_loop()
+            self._flushes[board_id] = loop.call_later(self.coalesce_window, self._flush, board_id)
+
+    def close_board(self, board_id: str) -> None:
+        """Доска удалена: досылает накопленное и отключает подписчиков."""
+        if not self._subscribers.get(board_id):
+            return
+        handle = self._flushes.pop(board_id, None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop(board_id, {})
+        pending[("board", None)] = {"type": "board.deleted"}
+        self._send(board_id, list(pending.values()))
+        for subscriber in list(self._subscribers.get(board_id, ())):
+            self._drop(subscriber, GOING_AWAY, discard_buffer=False)
+
+    def remove_member(self, board_id: str, user_id: str) -> None:
+        """Пользователя убрали с доски: его соединения отключаются с кодом 4403.
+
+        Доступ проверяется только при подключении, поэтому без этого
+        удалённый участник продолжал бы получать события доски.
+        """
+        for subscriber in list(self._subscribers.get(board_id, ())):
+            if subscriber.user_id == user_id:
+                self._drop(subscriber, ACCESS_REVOKED)
+
+    def _flush(self, board_id: str) -> None:
+        self._flushes.pop(board_id, None)
+        pending = self._pending.pop(board_id, None)
+        if pending:
+            self._send(board_id, list(pending.values()))
+
+    def _send(self, board_id: str, events: list) -> None:
+        frame = json.dumps({"events": events}, ensure_ascii=False, default=str)
+        self.frames += 1
+        for subscriber in list(self._subscribers.get(board_id, ())):
+            if len(subscriber.buffer) >= self.max_buffer:
+                self._drop(subscriber, TRY_AGAIN_LATER)
+                continue
+            subscriber.buffer.append(frame)
+            subscriber.wakeup.set()
+
+    # -----------------
+    # SUBSCRIBERS
+    # -----------------
+    async def serve(self, board_id: str, user_id: str, websocket: WebSocket) -> None:
+        """Держит принятое соединение подписанным на доску до отключения клиента."""
+        subscriber = BoardSubscriber(board_id, user_id, websocket)
+        self._subscribers.setdefault(board_id, set()).add(subscriber)
+        subscriber.sender = asyncio.create_task(self._send_loop(subscriber))
+        self._joined(subscriber)
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    self._received(subscriber, message["text"])
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self._unsubscribe(subscriber)
+            subscriber.sender.cancel()
+
+    async def close(self) -> None:
+        """Остановка сервиса: закрывает все соединения с кодом 1001."""
+        for handle in self._flushes.values():
+            handle.cancel()
+        self._flushes.clear()
+        self._pending.clear()
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                self._drop(subscriber, GOING_AWAY)
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "frames": self.frames,
+            "dropped": self.dropped,
+        }
+
+    # Точки расширения для наследников; каналу изменений доски они не нужны
+    def _joined(self, subscriber: BoardSubscriber) -> None:
+        pass
+
+    def _received(self, subscriber: BoardSubscriber, text: str) -> None:
+        pass
+
+    def _left(self, subscriber: BoardSubscriber) -> None:
+        pass
+
+    async def _send_loop(self, subscriber: BoardSubscriber) -> None:
+        websocket = subscriber.websocket
+        try:
+            while True:
+                await subscriber.wakeup.wait()
+                subscriber.wakeup.clear()
+                while subscriber.buffer:
+                    await websocket.send_text(subscriber.buffer.popleft())
+                if subscriber.close_code is not None:
+                    await websocket.close(code=subscriber.close_code)
+                    return
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            self._unsubscribe(subscriber)
+
+    async def _close(self, subscriber: BoardSubscriber) -> None:
+        try:
+            await subscriber.websocket.close(code=subscriber.close_code)
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass
+
+    def _drop(self, subscriber: BoardSubscriber, code: int, discard_buffer: bool = True) -> None:
+        """Отписывает клиента; задача отправки закроет соединение с ``code``."""
+        self._unsubscribe(subscriber)
+        if discard_buffer:
+            subscriber.buffer.clear()
+        subscriber.close_code = code
+        if code == TRY_AGAIN_LATER:
+            self.dropped += 1
+            # отправка висит на клиенте, который не читает: прерываем её и закрываем
+            # отдельно (сервер сам оборвёт соединение, если не дождётся ответа на close)
+            if subscriber.sender is not None:
+                subscriber.sender.cancel()
+                subscriber.sender = asyncio.create_task(self._close(subscriber))
+            return
+        subscriber.wakeup.set()
+
+    def _unsubscribe(self, subscriber: BoardSubscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.board_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        self._left(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.board_id]
+            handle = self._flushes.pop(subscriber.board_id, None)
+            if handle is not None:
+                handle.cancel()
+            self._pending.pop(subscriber.board_id, None)
+
+
+def _event_key(event: dict) -> EventKey:
+    kind = event["type"].split(".", 1)[0]
+    if kind == "sticker":
+        return kind, event["sticker"]["id"] if "sticker" in event else event["id"]
+    return kind, event.get("user_id")
+
+
+board_hub = BoardHub(
+    coalesce_window=settings.realtime.coalesce_window,
+    max_buffer=settings.realtime.max_buffer,
+)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import orjson
+
+
+def sticker_json(sticker: dict) -> bytes:
+    """JSON стикера в форме ``schema.sticker.Sticker`` (координаты и размеры — float)."""
+    encoded = orjson.dumps({
+        "id": sticker["id"],
+        "dashboard_id": sticker["dashboard_id"],
+        "x": float(sticker["x"]),
+        "y": float(sticker["y"]),
+        "text": sticker["text"],
+        "width": float(sticker["width"]),
+        "height": float(sticker["height"]),
+        "color": sticker["color"],
+    })
+    # orjson отдаёт результат в буфере от 1 КБ; копия по размеру — вчетверо меньше памяти в кэше
+    return bytes(memoryview(encoded))
+
+
+def stickers_json(fragments: list) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def board_json(board: dict, stickers: Optional[bytes] = None) -> bytes:
+    """JSON доски в форме ``schema.dashboard.BoardFull``.
+
+    ``stickers`` — готовый JSON-массив стикеров; без него кодируется
+    ``board["stickers"]``.
+    """
+    if stickers is None:
+        stickers = stickers_json([sticker_json(sticker) for sticker in board["stickers"]])
+    head = orjson.dumps({"id": board["id"], "name": board["name"], "role": board["role"]})
+    return head[:-1] + b',"stickers":' + stickers + b"}"
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, TypeVar
+
+from config.config import settings
+from exceptions import ServiceUnavailableException
+
+T = TypeVar("T")
+
+ALGORITHM = "pbkdf2_sha256"
+LATENCY_WINDOW = 1024
+
+
+class PasswordHasher:
+    """Хэширование паролей в отдельном пуле потоков.
+
+    PBKDF2 из hashlib отпускает GIL, поэтому потоков достаточно, а event
+    loop не блокируется на время KDF. Одновременно принимается не больше
+    ``max_pending`` операций (в работе и в очереди пула); сверх этого
+    запрос сразу получает 503, а не ждёт за всей очередью логинов.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, iterations: int = 200_000) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.iterations = iterations
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        # последние LATENCY_WINDOW замеров: ожидание в очереди и полное время, секунды
+        self._waits: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Выполняет ``func(*args)`` в пуле с контролем допуска."""
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise ServiceUnavailableException()
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        started = submitted
+
+        def call() -> T:
+            nonlocal started
+            started = time.perf_counter()
+            return func(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._waits.append(started - submitted)
+            self._latencies.append(time.perf_counter() - submitted)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(self.hash_sync, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self.run(self.verify_sync, password, encoded)
+
+    def hash_sync(self, password: str) -> str:
+        salt = os.urandom(16)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, self.iterations)
+        return "$".join((ALGORITHM, str(self.iterations), _b64(salt), _b64(digest)))
+
+    def verify_sync(self, password: str, encoded: str) -> bool:
+        try:
+            algorithm, iterations, salt, expected = encoded.split("$")
+        except ValueError:
+            return False
+        if algorithm != ALGORITHM:
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+        return hmac.compare_digest(digest, base64.b64decode(expected))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": _percentiles(self._waits),
+            "latency_ms": _percentiles(self._latencies),
+        }
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _percentiles(samples: Deque[float]) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": round(ordered[last // 2] * 1000, 3),
+        "p95": round(ordered[last * 95 // 100] * 1000, 3),
+        "max": round(ordered[last] * 1000, 3),
+    }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.passwords.workers,
+    max_pending=settings.passwords.max_pending,
+    iterations=settings.passwords.iterations,
+)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from config.config import settings
+from services.board_hub import BoardHub, BoardSubscriber
+
+
+class Viewer:
+    """Присутствие пользователя на доске (по всем его вкладкам)."""
+
+    __slots__ = ("connections", "last_seen", "cursor", "idle")
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.last_seen = time.monotonic()
+        self.cursor: Optional[Tuple[float, float]] = None
+        self.idle = False
+
+
+class PresenceHub(BoardHub):
+    """Курсоры и «кто смотрит доску»; живёт только в памяти процесса.
+
+    В ``State`` и базу ничего не пишется. Курсоры схлопываются механизмом
+    :class:`BoardHub`: за ``coalesce_window`` от пользователя уходит только
+    последняя позиция, а все изменения доски — одним кадром на всех. Так
+    трафик растёт как O(n) кадров на доску, а не O(n²) сообщений.
+    Пользователь, от которого ``idle_timeout`` секунд ничего не приходило,
+    пропадает из присутствующих до следующего сообщения.
+    """
+
+    def __init__(self, coalesce_window: float = 0.05, max_buffer: int = 64, idle_timeout: float = 30.0) -> None:
+        super().__init__(coalesce_window=coalesce_window, max_buffer=max_buffer)
+        self.idle_timeout = idle_timeout
+        self._viewers: Dict[str, Dict[str, Viewer]] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.ignored = 0
+        self.expired = 0
+
+    def _joined(self, subscriber: BoardSubscriber) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+        viewers = self._viewers.setdefault(subscriber.board_id, {})
+        viewer = viewers.get(subscriber.user_id)
+        if viewer is None:
+            viewer = viewers[subscriber.user_id] = Viewer()
+        viewer.connections += 1
+        # новому клиенту — текущий состав и курсоры, остальным — что он пришёл
+        subscriber.buffer.append(json.dumps({"events": [{
+            "type": "presence.snapshot",
+            "users": [
+                _presence(user_id, other)
+                for user_id, other in viewers.items()
+                if not other.idle and user_id != subscriber.user_id
+            ],
+        }]}, ensure_ascii=False))
+        subscriber.wakeup.set()
+        self._touch(subscriber.board_id, subscriber.user_id, viewer, joined=viewer.connections == 1)
+
+    def _received(self, subscriber: BoardSubscriber, text: str) -> None:
+        viewer = self._viewers.get(subscriber.board_id, {}).get(subscriber.user_id)
+        if viewer is None:
+            return
+        self._touch(subscriber.board_id, subscriber.user_id, viewer, joined=viewer.idle)
+        # любое сообщение продлевает присутствие, курсор — только {"type": "cursor", "x", "y"}
+        try:
+            message = json.loads(text)
+        except ValueError:
+            self.ignored += 1
+            return
+        if not isinstance(message, dict) or message.get("type") != "cursor":
+            return
+        x, y = message.get("x"), message.get("y")
+        if not (_is_number(x) and _is_number(y)):
+            self.ignored += 1
+            return
+        viewer.cursor = (x, y)
+        self.publish(subscriber.board_id, {"type": "cursor.moved", "user_id": subscriber.user_id, "x": x, "y": y})
+
+    def _left(self, subscriber: BoardSubscriber) -> None:
+        viewers = self._viewers.get(subscriber.board_id)
+        viewer = viewers.get(subscriber.user_id) if viewers else None
+        if viewer is None:
+            return
+        viewer.connections -= 1
+        if viewer.connections > 0:
+            return
+        del viewers[subscriber.user_id]
+        if not viewers:
+            del self._viewers[subscriber.board_id]
+        if not viewer.idle:
+            self.publish(subscriber.board_id, {"type": "presence.left", "user_id": subscriber.user_id})
+
+    def _touch(self, board_id: str, user_id: str, viewer: Viewer, joined: bool) -> None:
+        viewer.last_seen = time.monotonic()
+        if joined:
+            viewer.idle = False
+            self.publish(board_id, {"type": "presence.joined", **_presence(user_id, viewer)})
+
+    async def _sweep(self) -> None:
+        """Раз в пол-``idle_timeout`` убирает из присутствующих тех, кто молчит."""
+        while self._viewers:
+            await asyncio.sleep(self.idle_timeout / 2)
+            deadline = time.monotonic() - self.idle_timeout
+            for board_id, viewers in list(self._viewers.items()):
+                for user_id, viewer in viewers.items():
+                    if not viewer.idle and viewer.last_seen < deadline:
+                        viewer.idle = True
+                        viewer.cursor = None
+                        self.expired += 1
+                        self.publish(board_id, {"type": "presence.left", "user_id": user_id})
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        await super().close()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "viewers": sum(
+                not viewer.idle for viewers in self._viewers.values() for viewer in viewers.values()
+            ),
+            "ignored": self.ignored,
+            "expired": self.expired,
+        }
+
+
+def _presence(user_id: str, viewer: Viewer) -> dict:
+    cursor = viewer.cursor
+    return {"user_id": user_id, "x": cursor[0] if cursor else None, "y": cursor[1] if cursor else None}
+
+
+def _is_number(value) -> bool:
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+presence_hub = PresenceHub(
+    coalesce_window=settings.presence.coalesce_window,
+    max_buffer=settings.presence.max_buffer,
+    idle_timeout=settings.presence.idle_timeout,
+)
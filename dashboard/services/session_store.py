@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class _Session:
+    __slots__ = ("user", "issued_at", "last_seen")
+
+    def __init__(self, user: dict, issued_at: float) -> None:
+        self.user = user
+        self.issued_at = issued_at
+        self.last_seen = issued_at
+
+
+class SessionStore:
+    """Токены сессий с абсолютным и скользящим TTL.
+
+    Сессия живёт не дольше ``absolute_ttl`` с момента выдачи и истекает,
+    если ею не пользовались ``sliding_ttl`` секунд. Просроченные сессии
+    удаляются лениво при обращении и периодически через кучу сроков
+    истечения. У пользователя не больше ``max_per_user`` сессий: при
+    превышении вытесняется та, которой пользовались дольше всего назад.
+    """
+
+    def __init__(
+        self,
+        absolute_ttl: float = 24 * 3600,
+        sliding_ttl: float = 2 * 3600,
+        max_per_user: int = 10,
+    ) -> None:
+        self.absolute_ttl = absolute_ttl
+        self.sliding_ttl = sliding_ttl
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        self._init_data()
+
+    def _init_data(self) -> None:
+        self._sessions: Dict[str, _Session] = {}
+        # user_id -> токены в порядке последнего использования (LRU первым)
+        self._by_user: Dict[str, OrderedDict[str, None]] = {}
+        # (срок истечения, токен); срок мог сдвинуться — проверяется при извлечении
+        self._heap: List[Tuple[float, str]] = []
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, token: str, user: dict, issued_at: Optional[float] = None) -> None:
+        now = time.time() if issued_at is None else issued_at
+        session = _Session(user, now)
+        with self._lock:
+            self._sessions[token] = session
+            tokens = self._by_user.setdefault(user["id"], OrderedDict())
+            tokens[token] = None
+            while len(tokens) > self.max_per_user:
+                oldest, _ = tokens.popitem(last=False)
+                del self._sessions[oldest]
+                self.evicted += 1
+            heapq.heappush(self._heap, (self._expires_at(session), token))
+            self.created += 1
+
+    def get(self, token: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if self._expires_at(session) <= now:
+                self._drop(token, session)
+                self.expired += 1
+                return None
+            session.last_seen = now
+            self._by_user[session.user["id"]].move_to_end(token)
+            return session.user
+
+    def revoke(self, token: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return False
+            self._drop(token, session)
+            return True
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        purged = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, token = heapq.heappop(self._heap)
+                session = self._sessions.get(token)
+                if session is None:
+                    continue
+                expires_at = self._expires_at(session)
+                if expires_at > now:
+                    # Сессией пользовались — возвращаем в кучу с новым сроком
+                    heapq.heappush(self._heap, (expires_at, token))
+                    continue
+                self._drop(token, session)
+                purged += 1
+            self.expired += purged
+        return purged
+
+    async def run_purge(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.purge_expired()
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._sessions),
+            "users": len(self._by_user),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": dict(self._sessions),
+                "by_user": {user_id: OrderedDict(tokens) for user_id, tokens in self._by_user.items()},
+                "heap": list(self._heap),
+            }
+
+    def load(self, data: dict) -> None:
+        with self._lock:
+            self._init_data()
+            self._sessions = data["sessions"]
+            self._by_user = data["by_user"]
+            self._heap = data["heap"]
+
+    def _expires_at(self, session: _Session) -> float:
+        return min(session.issued_at + self.absolute_ttl, session.last_seen + self.sliding_ttl)
+
+    def _drop(self, token: str, session: _Session) -> None:
+        del self._sessions[token]
+        user_id = session.user["id"]
+        tokens = self._by_user.get(user_id)
+        if tokens is not None:
+            tokens.pop(token, None)
+            if not tokens:
+                del self._by_user[user_id]
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+Rect = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+CellRange = Tuple[int, int, int, int]
+
+DEFAULT_CELL_SIZE = 512.0
+# ячеек на стикер, сверх которых он хранится в общем списке, а не в ячейках
+MAX_STICKER_CELLS = 256
+
+
+class StickerGrid:
+    """Равномерная сетка над прямоугольниками стикеров одной доски.
+
+    Каждый стикер регистрируется во всех ячейках, которые пересекает его
+    прямоугольник (x, y, width, height), поэтому запрос по области обходит
+    только ячейки, попавшие в эту область. Стикеры больше ``max_cells``
+    ячеек (и с бесконечными координатами) лежат в общем списке и
+    проверяются каждым запросом: вставка не перебирает миллионы ячеек.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE, max_cells: int = MAX_STICKER_CELLS) -> None:
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._rects: Dict[str, Rect] = {}
+        self._overflow: Set[str] = set()
+        # после копии для снимка — ячейки, множества которых уже не общие с ней
+        self._owned: Optional[Set[Cell]] = None
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, "_owned": None}
+
+    def __setstate__(self, data: dict) -> None:
+        # сетки из снимков до появления общего списка
+        data.setdefault("max_cells", MAX_STICKER_CELLS)
+        data.setdefault("_overflow", set())
+        data.setdefault("_owned", None)
+        self.__dict__.update(data)
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def __copy__(self) -> StickerGrid:
+        """Копия для снимка: множества ячеек общие, пока сетка их не изменит.
+
+        Копировать сотни тысяч множеств под блокировками дорого, поэтому
+        сетка после копии меняет ячейку, только заменив её множество
+        своей копией (copy-on-write); саму копию менять нельзя.
+        """
+        clone = StickerGrid(self.cell_size, self.max_cells)
+        clone._cells = dict(self._cells)
+        clone._rects = dict(self._rects)
+        clone._overflow = set(self._overflow)
+        self._owned = set()
+        return clone
+
+    def insert(self, sticker_id: str, x: float, y: float, width: float, height: float) -> None:
+        rect = _normalize(x, y, x + width, y + height)
+        placement = self._placement(rect)
+        if sticker_id in self._rects:
+            self.remove(sticker_id)
+        self._rects[sticker_id] = rect
+        if placement is None:
+            self._overflow.add(sticker_id)
+            return
+        for cell in _iter_cells(*placement):
+            self._bucket(cell).add(sticker_id)
+
+    def move(self, sticker_id: str, x: float, y: float, width: float, height: float) -> None:
+        old = self._rects.get(sticker_id)
+        rect = _normalize(x, y, x + width, y + height)
+        if old is not None and self._placement(old) == self._placement(rect):
+            self._rects[sticker_id] = rect
+            return
+        self.insert(sticker_id, x, y, width, height)
+
+    def remove(self, sticker_id: str) -> None:
+        rect = self._rects.pop(sticker_id, None)
+        if rect is None:
+            return
+        if sticker_id in self._overflow:
+            self._overflow.discard(sticker_id)
+            return
+        for cell in _iter_cells(*self._placement(rect)):
+            if cell not in self._cells:
+                continue
+            bucket = self._bucket(cell)
+            bucket.discard(sticker_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[str]:
+        """Возвращает id стикеров, пересекающих прямоугольник (x0, y0)-(x1, y1)."""
+        area = _normalize(x0, y0, x1, y1)
+        cell_range = self._cell_range(area)
+        if cell_range is None or _cell_count(cell_range) > len(self._cells):
+            # Область шире заполненной части сетки — дешевле проверить все ячейки
+            candidates = self._rects.keys()
+        else:
+            candidates = set(self._overflow)
+            for cell in _iter_cells(*cell_range):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    candidates.update(bucket)
+        return [sid for sid in candidates if _intersects(self._rects[sid], area)]
+
+    def _bucket(self, cell: Cell) -> Set[str]:
+        """Множество ячейки для изменения; общее со снимком сначала копируется."""
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            bucket = self._cells[cell] = set()
+        elif self._owned is None or cell in self._owned:
+            return bucket
+        else:
+            bucket = self._cells[cell] = set(bucket)
+        if self._owned is not None:
+            self._owned.add(cell)
+        return bucket
+
+    def _cell_range(self, rect: Rect) -> Optional[CellRange]:
+        """Ячейки, покрывающие прямоугольник; None для бесконечных координат."""
+        if not all(math.isfinite(value) for value in rect):
+            return None
+        size = self.cell_size
+        return (
+            math.floor(rect[0] / size),
+            math.floor(rect[1] / size),
+            math.floor(rect[2] / size),
+            math.floor(rect[3] / size),
+        )
+
+    def _placement(self, rect: Rect) -> Optional[CellRange]:
+        """Ячейки, в которых регистрируется стикер; None — он в общем списке."""
+        cell_range = self._cell_range(rect)
+        if cell_range is None or _cell_count(cell_range) > self.max_cells:
+            return None
+        return cell_range
+
+
+def _normalize(x0: float, y0: float, x1: float, y1: float) -> Rect:
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _cell_count(cell_range: CellRange) -> int:
+    cx0, cy0, cx1, cy1 = cell_range
+    return (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+
+
+def _iter_cells(cx0: int, cy0: int, cx1: int, cy1: int) -> Iterator[Cell]:
+    for cx in range(cx0, cx1 + 1):
+        for cy in range(cy0, cy1 + 1):
+            yield cx, cy
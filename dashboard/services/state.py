@@ -1,112 +1,526 @@
 from __future__ import annotations
 
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from copy import copy
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
+from config.config import settings
+from services.board_payload import sticker_json, stickers_json
+from services.persistence import WriteAheadLog
+from services.session_store import SessionStore
+from services.spatial_index import StickerGrid
+from services.sticker_store import NUMERIC_FIELDS, STICKER_STORES
+from services.user_store import UserStore
+
+LOCK_STRIPES = 64
+
+# (версия, "board" | "member" | "sticker", id участника или стикера)
+ChangeEntry = Tuple[int, str, Optional[str]]
+
 
 class State:
-    """Простое in-memory хранилище для моков API."""
+    """Простое in-memory хранилище для моков API.
+
+    Мутации доски выполняются под одной из ``LOCK_STRIPES`` блокировок,
+    выбранной по board_id, поэтому разные доски меняются параллельно, а
+    операции над одной доской линеаризуемы. Каждая мутация доски, её
+    стикеров или участников увеличивает ``board["version"]`` и попадает в
+    кольцевой журнал изменений доски. Обратный индекс участников
+    защищён отдельным набором блокировок по user_id; их берут только
+    после блокировки доски, никогда наоборот.
+    """
 
-    def __init__(self) -> None:
-        self.users: Dict[str, dict] = {}
-        self.tokens: Dict[str, dict] = {}
+    def __init__(
+        self,
+        sticker_store: str = "dict",
+        sessions: Optional[SessionStore] = None,
+        change_log_size: int = 1000,
+        payload_cache: bool = True,
+    ) -> None:
+        self.users = UserStore()
+        self.sessions = sessions or SessionStore()
         self.boards: Dict[str, dict] = {}
-        self.stickers: Dict[str, dict] = {}
+        self.stickers = STICKER_STORES[sticker_store]()
+        # user_id -> {board_id: role}, обратный индекс к board["members"]
+        self.memberships: Dict[str, Dict[str, str]] = {}
+        # board_id -> пространственный индекс стикеров доски
+        self.sticker_grids: Dict[str, StickerGrid] = {}
+        # board_id -> последние изменения доски, по одному на версию; не сохраняются в снимок
+        self.change_logs: Dict[str, Deque[ChangeEntry]] = {}
+        self.change_log_size = change_log_size
+        # Готовый JSON для GET /boards/{id}, тоже не сохраняется в снимок:
+        # sticker_id -> JSON стикера, board_id -> (версия, JSON-массив стикеров)
+        self.payload_cache = payload_cache
+        self.sticker_payloads: Dict[str, bytes] = {}
+        self.board_payloads: Dict[str, Tuple[int, bytes]] = {}
+        # board_id -> (версия, id стикеров по возрастанию) для постраничного чтения
+        self.sticker_orders: Dict[str, Tuple[int, List[str]]] = {}
+        # Журнал мутаций; подключается StatePersistence, без него State живёт только в памяти
+        self.journal: Optional[WriteAheadLog] = None
+        self._board_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._user_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._users_lock = threading.Lock()
+
+    def _board_lock(self, board_id: str) -> threading.RLock:
+        return self._board_locks[hash(board_id) % LOCK_STRIPES]
+
+    def _user_lock(self, user_id: str) -> threading.RLock:
+        return self._user_locks[hash(user_id) % LOCK_STRIPES]
+
+    # -----------------
+    # PERSISTENCE
+    # -----------------
+    _PERSISTENT_FIELDS = ("users", "boards", "stickers", "memberships", "sticker_grids")
+
+    def _journal(self, op: str, **kwargs) -> None:
+        if self.journal is not None:
+            self.journal.append(op, kwargs)
+
+    def replay(self, op: str, kwargs: dict) -> None:
+        """Повторяет мутацию из WAL; сгенерированные id приходят в kwargs."""
+        journal, self.journal = self.journal, None
+        try:
+            getattr(self, op)(**kwargs)
+        finally:
+            self.journal = journal
+
+    def snapshot(self, mark: Callable[[], int]) -> Tuple[int, dict]:
+        """Копия State для снимка; ``mark`` возвращает lsn, которому она соответствует.
+
+        Под всеми блокировками копируются только контейнеры — словари,
+        множества и колонки; стикеры, пользователи и строки в них не
+        меняются на месте и остаются общими. Сериализует копию вызывающий,
+        уже без блокировок и вне event loop.
+        """
+        with ExitStack() as stack:
+            for lock in (*self._board_locks, *self._user_locks, self._users_lock):
+                stack.enter_context(lock)
+            lsn = mark()
+            data = {
+                "users": copy(self.users),
+                "boards": {
+                    board_id: {**board, "members": dict(board["members"]), "stickers": dict(board["stickers"])}
+                    for board_id, board in self.boards.items()
+                },
+                "stickers": copy(self.stickers),
+                "memberships": {user_id: dict(boards) for user_id, boards in self.memberships.items()},
+                "sticker_grids": {board_id: copy(grid) for board_id, grid in self.sticker_grids.items()},
+                "sessions": self.sessions.dump(),
+            }
+            return lsn, data
+
+    def restore(self, data: dict) -> None:
+        for field in self._PERSISTENT_FIELDS:
+            setattr(self, field, data[field])
+        for board in self.boards.values():
+            # снимки до появления версий
+            board.setdefault("version", 0)
+        self.sticker_payloads.clear()
+        self.board_payloads.clear()
+        self.sticker_orders.clear()
+        self.sessions.load(data["sessions"])
 
     # -----------------
     # USERS & AUTH
     # -----------------
-    def create_user(self, email: str, password: str) -> dict:
-        if email in self.users:
-            raise ValueError("Email already exists")
-        user = {"id": str(uuid4()), "email": email, "password": password}
-        self.users[email] = user
+    def create_user(self, email: str, password_hash: str, user_id: Optional[str] = None) -> dict:
+        with self._users_lock:
+            user = {"id": user_id or str(uuid4()), "email": email, "password_hash": password_hash}
+            self.users.add(user)
+            self._journal("create_user", email=email, password_hash=password_hash, user_id=user["id"])
         return user
 
-    def authenticate(self, email: str, password: str) -> Optional[str]:
-        user = self.users.get(email)
-        if not user or user["password"] != password:
+    def create_session(
+        self,
+        email: str,
+        token: Optional[str] = None,
+        issued_at: Optional[float] = None,
+    ) -> Optional[str]:
+        """Выдаёт токен сессии; пароль проверяется вызывающим заранее."""
+        user = self.users.get_by_email(email)
+        if not user:
             return None
-        token = str(uuid4())
-        self.tokens[token] = user
+        token = token or str(uuid4())
+        issued_at = issued_at or time.time()
+        self.sessions.create(token, user, issued_at)
+        self._journal("create_session", email=email, token=token, issued_at=issued_at)
         return token
 
     def get_user_by_token(self, token: str) -> Optional[dict]:
-        return self.tokens.get(token)
+        return self.sessions.get(token)
 
     def get_user_by_email(self, email: str) -> Optional[dict]:
-        return self.users.get(email)
+        return self.users.get_by_email(email)
 
     # -----------------
     # BOARDS
     # -----------------
-    def add_board(self, name: str, creator_id: str) -> dict:
-        board_id = str(uuid4())
+    def add_board(
+        self,
+        name: str,
+        creator_id: str,
+        board_id: Optional[str] = None,
+        created_at: Optional[str] = None,
+    ) -> dict:
+        board_id = board_id or str(uuid4())
         board = {
             "id": board_id,
             "name": name,
-            "created_at": datetime.utcnow().isoformat() + "Z",
+            "created_at": created_at or datetime.utcnow().isoformat() + "Z",
             "members": {creator_id: "creator"},
-            "stickers": [],
+            # sticker_id -> None: упорядоченное множество с удалением за O(1)
+            "stickers": {},
             "creator_id": creator_id,
+            "version": 0,
         }
-        self.boards[board_id] = board
+        with self._board_lock(board_id):
+            self.sticker_grids[board_id] = StickerGrid()
+            self.boards[board_id] = board
+            self._index_member(board_id, creator_id, "creator")
+            self._journal(
+                "add_board", name=name, creator_id=creator_id, board_id=board_id, created_at=board["created_at"]
+            )
         return board
 
     def get_board(self, board_id: str) -> Optional[dict]:
         return self.boards.get(board_id)
 
+    @contextmanager
+    def hold_board(self, board_id: str) -> Iterator[Optional[dict]]:
+        """Держит блокировку доски: проверка версии и запись идут без чужих мутаций между ними."""
+        with self._board_lock(board_id):
+            yield self.get_board(board_id)
+
+    def _bump(self, board: dict, kind: str, key: Optional[str] = None) -> None:
+        board["version"] += 1
+        log = self.change_logs.get(board["id"])
+        if log is None:
+            log = self.change_logs[board["id"]] = deque(maxlen=self.change_log_size)
+        log.append((board["version"], kind, key))
+
+    def get_changes(self, board_id: str, since: int) -> Optional[dict]:
+        """Изменения доски после версии ``since``; None, если доски нет.
+
+        Из журнала берутся только затронутые сущности, их содержимое читается
+        из текущего состояния, так что каждая сущность входит в ответ один
+        раз. Если нужных версий в журнале уже нет, ``resync`` — клиенту
+        следует перечитать доску целиком.
+        """
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return None
+            version = board["version"]
+            changes = {
+                "version": version,
+                "resync": False,
+                "name": None,
+                "stickers": [],
+                "removed_stickers": [],
+                "members": {},
+                "removed_members": [],
+            }
+            if since == version:
+                return changes
+            log = self.change_logs.get(board_id)
+            if since > version or not log or log[0][0] > since + 1:
+                changes["resync"] = True
+                return changes
+            touched: Dict[Tuple[str, Optional[str]], None] = {}
+            for entry_version, kind, key in reversed(log):
+                if entry_version <= since:
+                    break
+                touched.setdefault((kind, key))
+            for kind, key in reversed(touched):
+                if kind == "board":
+                    changes["name"] = board["name"]
+                elif kind == "member":
+                    role = board["members"].get(key)
+                    if role is None:
+                        changes["removed_members"].append(key)
+                    else:
+                        changes["members"][key] = role
+                elif key in board["stickers"]:
+                    changes["stickers"].append(self.stickers[key])
+                else:
+                    changes["removed_stickers"].append(key)
+            return changes
+
+    def get_user_boards(self, user_id: str) -> Dict[str, str]:
+        """Возвращает {board_id: role} для досок, где пользователь участник."""
+        with self._user_lock(user_id):
+            return dict(self.memberships.get(user_id, {}))
+
+    def rename_board(self, board_id: str, name: str) -> Optional[dict]:
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return None
+            board["name"] = name
+            self._bump(board, "board")
+            self._journal("rename_board", board_id=board_id, name=name)
+            return board
+
     def delete_board(self, board_id: str) -> None:
-        board = self.boards.pop(board_id, None)
-        if board:
-            for sticker_id in board.get("stickers", []):
-                self.stickers.pop(sticker_id, None)
+        with self._board_lock(board_id):
+            board = self.boards.pop(board_id, None)
+            self.sticker_grids.pop(board_id, None)
+            self.change_logs.pop(board_id, None)
+            self.board_payloads.pop(board_id, None)
+            self.sticker_orders.pop(board_id, None)
+            if board:
+                for user_id in board["members"]:
+                    self._unindex_member(board_id, user_id)
+                for sticker_id in board["stickers"]:
+                    self.stickers.remove(sticker_id)
+                    self.sticker_payloads.pop(sticker_id, None)
+                self._journal("delete_board", board_id=board_id)
 
     # -----------------
     # MEMBERS
     # -----------------
+    def get_members(self, board_id: str) -> Dict[str, str]:
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            return dict(board["members"]) if board else {}
+
     def set_member_role(self, board_id: str, user_id: str, role: str) -> None:
-        board = self.get_board(board_id)
-        if board is None:
-            raise KeyError("Board not found")
-        board["members"][user_id] = role
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                raise KeyError("Board not found")
+            board["members"][user_id] = role
+            self._bump(board, "member", user_id)
+            self._index_member(board_id, user_id, role)
+            self._journal("set_member_role", board_id=board_id, user_id=user_id, role=role)
+
+    def update_member_role(self, board_id: str, user_id: str, role: str) -> bool:
+        """Меняет роль существующего участника; False, если его нет на доске."""
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None or user_id not in board["members"]:
+                return False
+            self.set_member_role(board_id, user_id, role)
+            return True
 
     def remove_member(self, board_id: str, user_id: str) -> bool:
-        board = self.get_board(board_id)
-        if board is None:
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return False
+            if user_id in board["members"]:
+                board["members"].pop(user_id)
+                self._bump(board, "member", user_id)
+                self._unindex_member(board_id, user_id)
+                self._journal("remove_member", board_id=board_id, user_id=user_id)
+                return True
             return False
-        if user_id in board["members"]:
-            board["members"].pop(user_id)
-            return True
-        return False
+
+    def _index_member(self, board_id: str, user_id: str, role: str) -> None:
+        with self._user_lock(user_id):
+            self.memberships.setdefault(user_id, {})[board_id] = role
+
+    def _unindex_member(self, board_id: str, user_id: str) -> None:
+        with self._user_lock(user_id):
+            boards = self.memberships.get(user_id)
+            if boards is None:
+                return
+            boards.pop(board_id, None)
+            if not boards:
+                del self.memberships[user_id]
 
     # -----------------
     # STICKERS
     # -----------------
-    def add_sticker(self, board_id: str, data: dict) -> dict:
-        sticker_id = str(uuid4())
-        sticker = {**data, "id": sticker_id}
-        self.stickers[sticker_id] = sticker
+    def get_board_stickers(self, board_id: str) -> List[dict]:
+        """Копии стикеров доски: их изменение хранилище не задевает."""
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return []
+            return [dict(self.stickers[sid]) for sid in board["stickers"]]
+
+    def get_board_stickers_json(self, board_id: str) -> Optional[Tuple[int, bytes]]:
+        """Версия доски и JSON-массив её стикеров; None, если доски нет.
+
+        Массив кэшируется до следующей мутации доски, JSON каждого стикера —
+        до изменения этого стикера: после правки одного стикера заново
+        кодируется только он, остальные части лишь склеиваются.
+        """
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return None
+            version = board["version"]
+            cached = self.board_payloads.get(board_id)
+            if cached is not None and cached[0] == version:
+                return cached
+            if not self.payload_cache:
+                return version, stickers_json([sticker_json(self.stickers[sid]) for sid in board["stickers"]])
+            payloads = self.sticker_payloads
+            fragments = []
+            for sticker_id in board["stickers"]:
+                fragment = payloads.get(sticker_id)
+                if fragment is None:
+                    fragment = payloads[sticker_id] = sticker_json(self.stickers[sticker_id])
+                fragments.append(fragment)
+            cached = self.board_payloads[board_id] = (version, stickers_json(fragments))
+            return cached
+
+    def iter_sticker_batches(
+        self, board_id: str, after: Optional[str] = None, limit: Optional[int] = None, batch_size: int = 500
+    ) -> Iterator[List[dict]]:
+        """Стикеры доски по возрастанию id, начиная после ``after``, пачками.
+
+        Порядок id запоминается до следующей мутации доски, поэтому страницы
+        не сортируют доску заново. Каждая пачка читается под блокировкой
+        доски; между пачками доска может меняться — удалённые к тому
+        времени стикеры пропускаются, новые в выдачу не попадают.
+        """
+        with self._board_lock(board_id):
+            board = self.get_board(board_id)
+            if board is None:
+                return
+            cached = self.sticker_orders.get(board_id)
+            if cached is None or cached[0] != board["version"]:
+                cached = self.sticker_orders[board_id] = (board["version"], sorted(board["stickers"]))
+            order = cached[1]
+        start = 0 if after is None else bisect_right(order, after)
+        end = len(order) if limit is None else min(len(order), start + limit)
+        for offset in range(start, end, batch_size):
+            with self._board_lock(board_id):
+                stickers = [self.stickers.get(sid) for sid in order[offset:min(offset + batch_size, end)]]
+            yield [sticker for sticker in stickers if sticker is not None]
+
+    def add_sticker(self, board_id: str, data: dict, sticker_id: Optional[str] = None) -> dict:
+        sticker_id = sticker_id or str(uuid4())
+        with self._board_lock(board_id):
+            sticker = self._insert_sticker(board_id, data, sticker_id)
+            self._journal("add_sticker", board_id=board_id, data=data, sticker_id=sticker_id)
+            return sticker
+
+    def update_sticker(self, sticker_id: str, data: dict) -> Optional[dict]:
+        board_id = self.stickers.board_of(sticker_id)
+        if board_id is None:
+            return None
+        with self._board_lock(board_id):
+            sticker = self._update_sticker(board_id, sticker_id, data)
+            if sticker is not None:
+                self._journal("update_sticker", sticker_id=sticker_id, data=data)
+            return sticker
+
+    def remove_sticker(self, sticker_id: str) -> bool:
+        board_id = self.stickers.board_of(sticker_id)
+        if board_id is None:
+            return False
+        with self._board_lock(board_id):
+            removed = self._remove_sticker(board_id, sticker_id)
+            if removed:
+                self._journal("remove_sticker", sticker_id=sticker_id)
+            return removed
+
+    def add_stickers(self, board_id: str, items: List[dict], sticker_ids: Optional[List[str]] = None) -> List[dict]:
+        """Добавляет пачку стикеров на доску одной операцией и одной записью WAL."""
+        sticker_ids = sticker_ids or [str(uuid4()) for _ in items]
+        with self._board_lock(board_id):
+            stickers = [
+                self._insert_sticker(board_id, data, sticker_id)
+                for data, sticker_id in zip(items, sticker_ids)
+            ]
+            self._journal("add_stickers", board_id=board_id, items=items, sticker_ids=sticker_ids)
+            return stickers
+
+    def update_stickers(self, board_id: str, items: List[dict]) -> List[Optional[dict]]:
+        """Обновляет стикеры доски из ``items`` (``{"id", ...поля}``) атомарно.
+
+        Для стикеров, которых нет на этой доске, в ответе None.
+        """
+        with self._board_lock(board_id):
+            updated = [
+                self._update_sticker(board_id, item["id"], {k: v for k, v in item.items() if k != "id"})
+                for item in items
+            ]
+            self._journal("update_stickers", board_id=board_id, items=items)
+            return updated
+
+    def remove_stickers(self, board_id: str, sticker_ids: List[str]) -> List[bool]:
+        """Удаляет стикеры доски атомарно; False для чужих и отсутствующих."""
+        with self._board_lock(board_id):
+            removed = [self._remove_sticker(board_id, sticker_id) for sticker_id in sticker_ids]
+            self._journal("remove_stickers", board_id=board_id, sticker_ids=sticker_ids)
+            return removed
+
+    # Изменения стикеров без журнала; вызываются под блокировкой доски
+    def _insert_sticker(self, board_id: str, data: dict, sticker_id: str) -> dict:
+        # индекс — первым: если вставка в него упадёт, State ещё не изменён
+        grid = self.sticker_grids.get(board_id)
+        if grid is not None:
+            grid.insert(sticker_id, data["x"], data["y"], data["width"], data["height"])
+        try:
+            sticker = self.stickers.add({**data, "id": sticker_id})
+        except Exception:
+            if grid is not None:
+                grid.remove(sticker_id)
+            raise
         board = self.get_board(board_id)
         if board:
-            board.setdefault("stickers", []).append(sticker_id)
+            board["stickers"][sticker_id] = None
+            self._bump(board, "sticker", sticker_id)
         return sticker
 
-    def update_sticker(self, sticker_id: str, data: dict) -> Optional[dict]:
-        if sticker_id not in self.stickers:
+    def _update_sticker(self, board_id: str, sticker_id: str, data: dict) -> Optional[dict]:
+        if self.stickers.board_of(sticker_id) != board_id:
             return None
-        self.stickers[sticker_id].update(data)
-        return self.stickers[sticker_id]
+        sticker = self.stickers.update(sticker_id, data)
+        if sticker is None:
+            return None
+        self.sticker_payloads.pop(sticker_id, None)
+        board = self.boards.get(board_id)
+        if board:
+            self._bump(board, "sticker", sticker_id)
+        grid = self.sticker_grids.get(board_id)
+        # смена текста или цвета не трогает пространственный индекс
+        if grid is not None and not data.keys().isdisjoint(NUMERIC_FIELDS):
+            grid.move(sticker_id, sticker["x"], sticker["y"], sticker["width"], sticker["height"])
+        return sticker
 
-    def remove_sticker(self, sticker_id: str) -> bool:
-        sticker = self.stickers.pop(sticker_id, None)
-        if not sticker:
+    def _remove_sticker(self, board_id: str, sticker_id: str) -> bool:
+        if self.stickers.board_of(sticker_id) != board_id:
+            return False
+        if not self.stickers.remove(sticker_id):
             return False
-        board = self.boards.get(sticker["dashboard_id"])
+        self.sticker_payloads.pop(sticker_id, None)
+        board = self.boards.get(board_id)
         if board:
-            board["stickers"] = [sid for sid in board.get("stickers", []) if sid != sticker_id]
+            board["stickers"].pop(sticker_id, None)
+            self._bump(board, "sticker", sticker_id)
+        grid = self.sticker_grids.get(board_id)
+        if grid is not None:
+            grid.remove(sticker_id)
         return True
 
+    def query_stickers(self, board_id: str, x0: float, y0: float, x1: float, y1: float) -> List[dict]:
+        """Стикеры доски, пересекающие прямоугольную область (viewport)."""
+        with self._board_lock(board_id):
+            grid = self.sticker_grids.get(board_id)
+            if grid is None:
+                return []
+            return [self.stickers[sid] for sid in grid.query(x0, y0, x1, y1)]
+
 
-state = State()
+state = State(
+    sticker_store=settings.state.sticker_store,
+    change_log_size=settings.state.change_log_size,
+    payload_cache=settings.state.payload_cache,
+    sessions=SessionStore(
+        absolute_ttl=settings.sessions.absolute_ttl,
+        sliding_ttl=settings.sessions.sliding_ttl,
+        max_per_user=settings.sessions.max_per_user,
+    ),
+)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from collections.abc import Mapping
+from copy import copy
+from typing import Dict, Iterator, List, Optional
+
+NUMERIC_FIELDS = ("x", "y", "width", "height")
+
+
+class DictStickerStore(Mapping):
+    """Хранилище стикеров в виде словаря sticker_id -> dict.
+
+    Изменение заменяет dict стикера новым, а не правит его на месте:
+    прочитанный стикер не меняется задним числом, и копии словаря
+    достаточно для согласованного снимка.
+    """
+
+    def __init__(self) -> None:
+        self._stickers: Dict[str, dict] = {}
+
+    def __getitem__(self, sticker_id: str) -> dict:
+        return self._stickers[sticker_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._stickers)
+
+    def __len__(self) -> int:
+        return len(self._stickers)
+
+    def __copy__(self) -> DictStickerStore:
+        clone = DictStickerStore()
+        clone._stickers = dict(self._stickers)
+        return clone
+
+    def add(self, sticker: dict) -> dict:
+        self._stickers[sticker["id"]] = sticker
+        return sticker
+
+    def update(self, sticker_id: str, data: dict) -> Optional[dict]:
+        sticker = self._stickers.get(sticker_id)
+        if sticker is None:
+            return None
+        sticker = self._stickers[sticker_id] = {**sticker, **data}
+        return sticker
+
+    def remove(self, sticker_id: str) -> Optional[dict]:
+        return self._stickers.pop(sticker_id, None)
+
+    def board_of(self, sticker_id: str) -> Optional[str]:
+        sticker = self._stickers.get(sticker_id)
+        return sticker["dashboard_id"] if sticker is not None else None
+
+
+class _BoardColumns:
+    """Колонки стикеров одной доски; стикер занимает один слот во всех колонках."""
+
+    __slots__ = ("board_id", "ids", "x", "y", "width", "height", "color", "text")
+
+    def __init__(self, board_id: str) -> None:
+        self.board_id = board_id
+        self.ids: List[str] = []
+        self.x = array("d")
+        self.y = array("d")
+        self.width = array("d")
+        self.height = array("d")
+        self.color = array("I")
+        self.text: List[str] = []
+
+    def __copy__(self) -> _BoardColumns:
+        clone = _BoardColumns(self.board_id)
+        for field in ("ids", "x", "y", "width", "height", "color", "text"):
+            setattr(clone, field, getattr(self, field)[:])
+        return clone
+
+
+class CompactStickerStore(Mapping):
+    """Колоночное хранилище стикеров.
+
+    Координаты и размеры лежат в массивах ``array('d')`` по доскам, цвета
+    хранятся индексами в общей таблице, а ``dashboard_id`` — один раз на доску.
+    Словари стикеров собираются только при чтении, поэтому изменять
+    возвращённый dict бесполезно — для записи есть :meth:`update`.
+
+    Колонки одной доски меняются только под блокировкой этой доски в State;
+    общая таблица цветов защищена собственной блокировкой.
+    """
+
+    def __init__(self) -> None:
+        self._boards: Dict[str, _BoardColumns] = {}
+        # sticker_id -> доска (строка из её колонок, не копия) и номер слота в колонках
+        self._board_of: Dict[str, str] = {}
+        self._slot_of: Dict[str, int] = {}
+        self._colors: List[str] = []
+        self._color_index: Dict[str, int] = {}
+        self._color_lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        data = self.__dict__.copy()
+        del data["_color_lock"]
+        return data
+
+    def __setstate__(self, data: dict) -> None:
+        self.__dict__.update(data)
+        self._color_lock = threading.Lock()
+        # снимки, где sticker_id указывал прямо на колонки доски
+        if self._board_of and isinstance(next(iter(self._board_of.values())), _BoardColumns):
+            self._board_of = {sticker_id: columns.board_id for sticker_id, columns in self._board_of.items()}
+
+    def __copy__(self) -> CompactStickerStore:
+        """Независимая копия колонок и индексов; строки и числа общие."""
+        clone = CompactStickerStore()
+        clone._boards = {board_id: copy(columns) for board_id, columns in self._boards.items()}
+        clone._board_of = dict(self._board_of)
+        clone._slot_of = dict(self._slot_of)
+        with self._color_lock:
+            clone._colors = list(self._colors)
+            clone._color_index = dict(self._color_index)
+        return clone
+
+    def __getitem__(self, sticker_id: str) -> dict:
+        columns = self._boards[self._board_of[sticker_id]]
+        return self._materialize(columns, self._slot_of[sticker_id])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slot_of)
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, sticker_id: object) -> bool:
+        return sticker_id in self._slot_of
+
+    def add(self, sticker: dict) -> dict:
+        board_id = sticker["dashboard_id"]
+        columns = self._boards.get(board_id)
+        if columns is None:
+            columns = self._boards[board_id] = _BoardColumns(board_id)
+        sticker_id = sticker["id"]
+        self._slot_of[sticker_id] = len(columns.ids)
+        self._board_of[sticker_id] = columns.board_id
+        columns.ids.append(sticker_id)
+        for field in NUMERIC_FIELDS:
+            getattr(columns, field).append(float(sticker[field]))
+        columns.color.append(self._intern_color(sticker["color"]))
+        columns.text.append(sticker["text"])
+        return self._materialize(columns, self._slot_of[sticker_id])
+
+    def update(self, sticker_id: str, data: dict) -> Optional[dict]:
+        board_id = self._board_of.get(sticker_id)
+        if board_id is None:
+            return None
+        columns = self._boards[board_id]
+        slot = self._slot_of[sticker_id]
+        for field in NUMERIC_FIELDS:
+            if field in data:
+                getattr(columns, field)[slot] = float(data[field])
+        if "color" in data:
+            columns.color[slot] = self._intern_color(data["color"])
+        if "text" in data:
+            columns.text[slot] = data["text"]
+        return self._materialize(columns, slot)
+
+    def remove(self, sticker_id: str) -> Optional[dict]:
+        board_id = self._board_of.pop(sticker_id, None)
+        if board_id is None:
+            return None
+        columns = self._boards[board_id]
+        slot = self._slot_of.pop(sticker_id)
+        sticker = self._materialize(columns, slot)
+        # Последний слот переезжает на место удалённого, колонки остаются плотными
+        last = len(columns.ids) - 1
+        if slot != last:
+            moved_id = columns.ids[last]
+            columns.ids[slot] = moved_id
+            for field in ("x", "y", "width", "height", "color", "text"):
+                column = getattr(columns, field)
+                column[slot] = column[last]
+            self._slot_of[moved_id] = slot
+        for field in ("ids", "x", "y", "width", "height", "color", "text"):
+            getattr(columns, field).pop()
+        if not columns.ids:
+            del self._boards[columns.board_id]
+        return sticker
+
+    def board_of(self, sticker_id: str) -> Optional[str]:
+        return self._board_of.get(sticker_id)
+
+    def _intern_color(self, color: str) -> int:
+        index = self._color_index.get(color)
+        if index is not None:
+            return index
+        with self._color_lock:
+            index = self._color_index.get(color)
+            if index is None:
+                self._colors.append(color)
+                index = self._color_index[color] = len(self._colors) - 1
+            return index
+
+    def _materialize(self, columns: _BoardColumns, slot: int) -> dict:
+        return {
+            "id": columns.ids[slot],
+            "dashboard_id": columns.board_id,
+            "x": columns.x[slot],
+            "y": columns.y[slot],
+            "text": columns.text[slot],
+            "width": columns.width[slot],
+            "height": columns.height[slot],
+            "color": self._colors[columns.color[slot]],
+        }
+
+
+STICKER_STORES = {
+    "dict": DictStickerStore,
+    "compact": CompactStickerStore,
+}
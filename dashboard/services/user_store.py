@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional
+
+
+def normalize_email(email: str) -> str:
+    """Ключ поиска пользователя; AuthServer так же хранит email в нижнем регистре."""
+    return email.strip().lower()
+
+
+class UserStore:
+    """Пользователи State с хэш-индексом по нормализованному email.
+
+    Поиск не зависит от регистра и числа пользователей. Блокировки на
+    стороне вызывающего: State меняет хранилище под ``_users_lock``.
+    """
+
+    def __init__(self) -> None:
+        self._by_email: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_email)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._by_email.values())
+
+    def __copy__(self) -> UserStore:
+        # пользователи после создания не меняются: достаточно копии индекса
+        clone = UserStore()
+        clone._by_email = dict(self._by_email)
+        return clone
+
+    def add(self, user: dict) -> None:
+        key = normalize_email(user["email"])
+        if key in self._by_email:
+            raise ValueError("Email already exists")
+        self._by_email[key] = user
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        return self._by_email.get(normalize_email(email))
+
+    def exists(self, email: str) -> bool:
+        return normalize_email(email) in self._by_email
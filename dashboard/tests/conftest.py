@@ -0,0 +1,74 @@
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import main
+from repository.entities import BaseModel
+from services.backend.repository_backend import RepositoryBackend
+from services.backend.state_backend import StateBackend
+from services.state import State, state
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фабрика сессий на чистой SQLite-базе; открывать внутри цикла событий теста."""
+
+    @asynccontextmanager
+    async def open_database():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'boards.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(BaseModel.metadata.create_all)
+        try:
+            yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return open_database
+
+
+@pytest.fixture(params=["memory", "database"])
+def open_backends(request, database):
+    """Открывает хранилище и отдаёт фабрику бэкендов: по одной «транзакции запроса» на вызов."""
+
+    @asynccontextmanager
+    async def open_backends():
+        if request.param == "memory":
+            backend = StateBackend(State())
+
+            @asynccontextmanager
+            async def transaction():
+                yield backend
+
+            yield transaction
+            return
+        async with database() as sessions:
+            @asynccontextmanager
+            async def transaction():
+                async with sessions() as session, session.begin():
+                    yield RepositoryBackend(session=session)
+
+            yield transaction
+
+    return open_backends
+
+
+@pytest.fixture
+def client():
+    """Клиент сервиса с хранилищем в памяти (настройки по умолчанию)."""
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def login():
+    """Создаёт пользователя прямо в State, без хэширования пароля; возвращает его и заголовки."""
+
+    def login():
+        email = f"{uuid.uuid4().hex}@example.com"
+        user = state.create_user(email, "")
+        return user, {"Authorization": f"Bearer {state.create_session(email)}"}
+
+    return login
@@ -0,0 +1,49 @@
+"""BoardBackend: одинаковое поведение бэкенда в памяти и в БД."""
+import asyncio
+import uuid
+
+import pytest
+
+from exceptions import AccessDeniedException, NotFoundException
+
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def test_roles_and_sticker_lifecycle(open_backends):
+    creator, viewer, stranger = (str(uuid.uuid4()) for _ in range(3))
+
+    async def scenario():
+        async with open_backends() as transaction:
+            async with transaction() as backend:
+                board = await backend.create_board(creator, "board")
+                assert board["role"] == "creator" and board["stickers"] == []
+            board_id = board["id"]
+            async with transaction() as backend:
+                await backend.invite_member(board_id, creator, viewer, "viewer")
+                sticker = await backend.create_sticker(creator, {**STICKER, "dashboard_id": board_id})
+
+            async with transaction() as backend:
+                assert [(b["id"], b["role"]) for b in await backend.list_boards(viewer)] == [(board_id, "viewer")]
+                assert (await backend.get_sticker(sticker["id"], viewer))["text"] == "note"
+                with pytest.raises(AccessDeniedException):
+                    await backend.update_sticker(sticker["id"], viewer, {"x": 1.0})
+                with pytest.raises(AccessDeniedException):
+                    await backend.get_board(board_id, stranger)
+                with pytest.raises(NotFoundException):
+                    await backend.get_board(str(uuid.uuid4()), creator)
+
+            async with transaction() as backend:
+                await backend.update_member_role(board_id, creator, viewer, "editor")
+                updated = await backend.update_sticker(sticker["id"], viewer, {"x": 5.0})
+                assert updated["x"] == 5.0 and updated["text"] == "note"
+            async with transaction() as backend:
+                assert await backend.delete_sticker(sticker["id"], viewer) == board_id
+                with pytest.raises(NotFoundException):
+                    await backend.get_sticker(sticker["id"], creator)
+                await backend.remove_member(board_id, creator, viewer)
+            async with transaction() as backend:
+                assert await backend.list_members(board_id, creator) == {creator: "creator"}
+                await backend.delete_board(board_id, creator)
+                assert await backend.list_boards(creator) == []
+
+    asyncio.run(scenario())
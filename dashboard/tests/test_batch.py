@@ -0,0 +1,47 @@
+"""/stickers:batch — пачки операций над стикерами одной доски."""
+
+STICKER = {"x": 0, "y": 0, "text": "note", "width": 100, "height": 80, "color": "#ffcc00"}
+
+
+def test_batch_create_update_delete(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+
+    created = client.post("/stickers:batch", headers=headers, json={
+        "dashboard_id": board_id, "stickers": [{**STICKER, "x": i} for i in range(3)],
+    })
+    assert created.status_code == 200
+    results = created.json()["results"]
+    assert [r["status"] for r in results] == [201] * 3
+    ids = [r["id"] for r in results]
+    assert [r["sticker"]["x"] for r in results] == [0, 1, 2]
+
+    updated = client.patch("/stickers:batch", headers=headers, json={
+        "dashboard_id": board_id, "stickers": [{"id": ids[0], "text": "edited"}, {"id": "missing", "x": 1}],
+    }).json()["results"]
+    assert [r["status"] for r in updated] == [200, 404]
+    assert updated[0]["sticker"]["text"] == "edited" and updated[0]["sticker"]["x"] == 0
+
+    deleted = client.request("DELETE", "/stickers:batch", headers=headers, json={
+        "dashboard_id": board_id, "ids": [ids[1], ids[1], "missing"],
+    }).json()["results"]
+    assert [r["status"] for r in deleted] == [204, 404, 404]
+    board = client.get(f"/boards/{board_id}", headers=headers).json()
+    assert sorted(s["id"] for s in board["stickers"]) == sorted([ids[0], ids[2]])
+
+
+def test_batch_by_viewer_is_rejected_whole(client, login):
+    _, creator = login()
+    user, viewer = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=creator).json()["id"]
+    invited = client.post(f"/boards/{board_id}/invite", json={"email": user["email"], "role": "viewer"}, headers=creator)
+    assert invited.status_code == 201
+
+    response = client.post("/stickers:batch", headers=viewer, json={
+        "dashboard_id": board_id, "stickers": [STICKER, STICKER],
+    })
+    assert response.status_code == 403
+    assert client.get(f"/boards/{board_id}", headers=creator).json()["stickers"] == []
+    # пустую пачку отклоняет схема
+    empty = client.post("/stickers:batch", headers=creator, json={"dashboard_id": board_id, "stickers": []})
+    assert empty.status_code == 422
@@ -0,0 +1,132 @@
+"""BoardHub: схлопывание событий, отключение медленных клиентов и /boards/{id}/ws."""
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from services.board_hub import ACCESS_REVOKED, GOING_AWAY, TRY_AGAIN_LATER, BoardHub
+
+STICKER = {"x": 0, "y": 0, "text": "note", "width": 100, "height": 80, "color": "#ffcc00"}
+
+
+class FakeWebSocket:
+    """Соединение без сети: входящие сообщения — из очереди, отправленные кадры копятся в списке."""
+
+    def __init__(self, reading: bool = True) -> None:
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.frames = []
+        self.close_code = None
+        # клиент не читает: отправка кадра не завершается
+        self.reading = reading
+
+    async def receive(self) -> dict:
+        return await self.incoming.get()
+
+    async def send_text(self, text: str) -> None:
+        if not self.reading:
+            await asyncio.Event().wait()
+        self.frames.append(json.loads(text))
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+        self.disconnect()
+
+    def send(self, message: dict) -> None:
+        self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(message)})
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+    def events(self) -> list:
+        return [event for frame in self.frames for event in frame["events"]]
+
+
+def _updated(sticker_id: str, x: int) -> dict:
+    return {"type": "sticker.updated", "sticker": {"id": sticker_id, "x": x}}
+
+
+def test_events_within_window_are_coalesced():
+    async def scenario():
+        hub = BoardHub(coalesce_window=0.01)
+        websocket = FakeWebSocket()
+        serving = asyncio.create_task(hub.serve("board", "user", websocket))
+        await asyncio.sleep(0)
+        for x in range(5):
+            hub.publish("board", _updated("moved", x))
+        hub.publish("board", {"type": "sticker.created", "sticker": {"id": "temporary"}})
+        hub.publish("board", {"type": "sticker.deleted", "id": "temporary"})
+        hub.publish("board", {"type": "board.renamed", "name": "renamed"})
+        await asyncio.sleep(0.05)
+
+        # одна доска — один кадр; от стикера — последнее состояние, созданный и удалённый пропал
+        assert websocket.frames == [{"events": [_updated("moved", 4), {"type": "board.renamed", "name": "renamed"}]}]
+        assert hub.stats()["coalesced"] == 5 and hub.stats()["frames"] == 1
+        websocket.disconnect()
+        await serving
+        assert hub.stats()["subscribers"] == 0
+        # без подписчиков публикация ничего не копит
+        hub.publish("board", _updated("moved", 5))
+        assert hub.stats()["published"] == 8
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_dropped_with_1013():
+    async def scenario():
+        hub = BoardHub(coalesce_window=0.001, max_buffer=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(reading=False)
+        serving = [asyncio.create_task(hub.serve("board", user, ws)) for user, ws in (("fast", fast), ("slow", slow))]
+        await asyncio.sleep(0)
+        for x in range(5):
+            hub.publish("board", _updated("moved", x))
+            await asyncio.sleep(0.01)
+
+        assert slow.close_code == TRY_AGAIN_LATER
+        assert [event["sticker"]["x"] for event in fast.events()] == list(range(5))
+        assert hub.stats()["dropped"] == 1 and hub.stats()["subscribers"] == 1
+        await hub.close()
+        await asyncio.gather(*serving)
+        assert fast.close_code == GOING_AWAY
+
+    asyncio.run(scenario())
+
+
+def test_removed_member_is_disconnected_and_deleted_board_closes():
+    async def scenario():
+        hub = BoardHub(coalesce_window=0.01)
+        stays, removed = FakeWebSocket(), FakeWebSocket()
+        serving = [
+            asyncio.create_task(hub.serve("board", user, ws)) for user, ws in (("stays", stays), ("gone", removed))
+        ]
+        await asyncio.sleep(0)
+        hub.remove_member("board", "gone")
+        hub.publish("board", _updated("moved", 1))
+        hub.close_board("board")
+        await asyncio.gather(*serving)
+
+        assert removed.close_code == ACCESS_REVOKED and removed.frames == []
+        # накопленное досылается вместе с board.deleted
+        assert stays.events() == [_updated("moved", 1), {"type": "board.deleted"}]
+        assert stays.close_code == GOING_AWAY
+
+    asyncio.run(scenario())
+
+
+def test_websocket_endpoint(client, login):
+    _, headers = login()
+    token = headers["Authorization"].split(" ", 1)[1]
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    sticker = client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers).json()
+
+    with client.websocket_connect(f"/boards/{board_id}/ws?token={token}") as websocket:
+        client.patch(f"/stickers/{sticker['id']}", json={"x": 42}, headers=headers)
+        assert websocket.receive_json() == {"events": [{"type": "sticker.updated", "sticker": {**sticker, "x": 42}}]}
+
+    _, stranger = login()
+    stranger_token = stranger["Authorization"].split(" ", 1)[1]
+    for token, code in (("bad", 4401), (stranger_token, 4403)):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/boards/{board_id}/ws?token={token}") as websocket:
+                websocket.receive_text()
+        assert closed.value.code == code
@@ -0,0 +1,65 @@
+"""Готовый JSON доски: совпадает с ответом через pydantic и обновляется по версии."""
+import json
+
+import pytest
+
+from schema.dashboard import BoardFull
+from schema.sticker import Sticker
+from services.board_payload import board_json
+from services.state import State
+
+STICKER = {"x": 1, "y": 2.5, "text": "заметка \"в кавычках\"", "width": 100, "height": 80, "color": "#ffcc00"}
+
+
+def _pydantic(state: State, board_id: str) -> dict:
+    board = state.get_board(board_id)
+    stickers = [Sticker(**state.stickers[sid]) for sid in board["stickers"]]
+    return BoardFull(id=board_id, name=board["name"], role="creator", stickers=stickers).model_dump(mode="json")
+
+
+def _cached(state: State, board_id: str) -> dict:
+    board = state.get_board(board_id)
+    _, stickers = state.get_board_stickers_json(board_id)
+    return json.loads(board_json({**board, "role": "creator"}, stickers))
+
+
+@pytest.mark.parametrize("sticker_store", ["dict", "compact"])
+@pytest.mark.parametrize("payload_cache", [True, False])
+def test_cached_json_matches_pydantic(sticker_store, payload_cache):
+    state = State(sticker_store=sticker_store, payload_cache=payload_cache)
+    board_id = state.add_board("доска", "owner")["id"]
+    assert _cached(state, board_id) == _pydantic(state, board_id)
+    stickers = state.add_stickers(board_id, [{**STICKER, "dashboard_id": board_id, "x": i} for i in range(5)])
+    assert _cached(state, board_id) == _pydantic(state, board_id)
+
+    state.update_sticker(stickers[0]["id"], {"x": 42, "text": "edited"})
+    state.remove_sticker(stickers[1]["id"])
+    assert _cached(state, board_id) == _pydantic(state, board_id)
+
+
+def test_edit_reencodes_only_the_changed_sticker():
+    state = State()
+    board_id = state.add_board("board", "owner")["id"]
+    stickers = state.add_stickers(board_id, [{**STICKER, "dashboard_id": board_id} for _ in range(3)])
+    version, first = state.get_board_stickers_json(board_id)
+    assert state.get_board_stickers_json(board_id)[1] is first
+
+    fragments = dict(state.sticker_payloads)
+    state.update_sticker(stickers[0]["id"], {"x": 9})
+    new_version, _ = state.get_board_stickers_json(board_id)
+    assert new_version == version + 1
+    assert state.sticker_payloads[stickers[0]["id"]] != fragments[stickers[0]["id"]]
+    for sticker in stickers[1:]:
+        assert state.sticker_payloads[sticker["id"]] is fragments[sticker["id"]]
+    state.delete_board(board_id)
+    assert not state.sticker_payloads and not state.board_payloads
+
+
+def test_get_board_endpoint_matches_schema(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers)
+    response = client.get(f"/boards/{board_id}", headers=headers)
+    assert response.headers["content-type"] == "application/json"
+    assert BoardFull.model_validate_json(response.content).model_dump(mode="json") == response.json()
+    assert response.json()["stickers"][0]["x"] == 1.0
@@ -0,0 +1,91 @@
+"""GET /boards/{id}/changes: изменения доски после известной клиенту версии."""
+import asyncio
+import uuid
+
+from services.backend.repository_backend import RepositoryBackend
+from services.state import State
+
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def test_changes_list_each_entity_once():
+    state = State()
+    board_id = state.add_board("board", "owner")["id"]
+    kept = state.add_sticker(board_id, {**STICKER, "dashboard_id": board_id})["id"]
+    removed = state.add_sticker(board_id, {**STICKER, "dashboard_id": board_id})["id"]
+    since = state.get_board(board_id)["version"]
+
+    for x in range(5):
+        state.update_sticker(kept, {"x": float(x)})
+    state.remove_sticker(removed)
+    state.set_member_role(board_id, "guest", "viewer")
+    state.set_member_role(board_id, "gone", "editor")
+    state.remove_member(board_id, "gone")
+    state.rename_board(board_id, "renamed")
+
+    changes = state.get_changes(board_id, since)
+    assert changes["version"] == since + 10 and not changes["resync"]
+    assert changes["name"] == "renamed"
+    assert [sticker["id"] for sticker in changes["stickers"]] == [kept]
+    assert changes["stickers"][0]["x"] == 4.0
+    assert changes["removed_stickers"] == [removed]
+    assert changes["members"] == {"guest": "viewer"}
+    assert changes["removed_members"] == ["gone"]
+
+    current = state.get_changes(board_id, changes["version"])
+    assert current["stickers"] == [] and not current["resync"]
+    assert state.get_changes("missing", 0) is None
+
+
+def test_resync_when_the_log_no_longer_covers_the_version():
+    state = State(change_log_size=3)
+    board_id = state.add_board("board", "owner")["id"]
+    for i in range(5):
+        state.rename_board(board_id, f"name {i}")
+    assert state.get_changes(board_id, 2)["name"] == "name 4"
+    assert state.get_changes(board_id, 1)["resync"]
+    # версия из будущего — например, после перезапуска без журнала
+    assert state.get_changes(board_id, 50)["resync"]
+
+
+def test_changes_endpoint(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    sticker = client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers).json()
+    client.delete(f"/stickers/{sticker['id']}", headers=headers)
+
+    response = client.get(f"/boards/{board_id}/changes?since=0", headers=headers)
+    assert response.status_code == 200 and response.headers["ETag"] == '"2"'
+    assert response.json() == {
+        "version": 2,
+        "resync": False,
+        "name": None,
+        "stickers": [],
+        "removed_stickers": [sticker["id"]],
+        "members": [],
+        "removed_members": [],
+    }
+    assert client.get(f"/boards/{board_id}/changes?since=-1", headers=headers).status_code == 422
+    _, stranger = login()
+    assert client.get(f"/boards/{board_id}/changes?since=0", headers=stranger).status_code == 403
+
+
+def test_backends_report_changes_since_version(open_backends):
+    user = str(uuid.uuid4())
+
+    async def scenario():
+        async with open_backends() as transaction:
+            async with transaction() as backend:
+                board = await backend.create_board(user, "board")
+                await backend.rename_board(board["id"], user, "renamed")
+            async with transaction() as backend:
+                changes = await backend.get_changes(board["id"], user, 0)
+                unchanged = await backend.get_changes(board["id"], user, 1)
+        assert changes["version"] == 1 and not unchanged["resync"]
+        if isinstance(backend, RepositoryBackend):
+            # журнала изменений в БД нет: клиент перечитывает доску
+            assert changes["resync"]
+        else:
+            assert changes["name"] == "renamed" and not changes["resync"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+"""Настройки из окружения: поле секции через двойное подчёркивание или секция JSON-ом."""
+from config.config import Settings
+
+
+def test_nested_fields_from_environment(monkeypatch):
+    monkeypatch.setenv("STORAGE__BACKEND", "database")
+    monkeypatch.setenv("DB__URL", "sqlite+aiosqlite:///./boards.db")
+    monkeypatch.setenv("STATE__STICKER_STORE", "compact")
+    monkeypatch.setenv("SESSIONS__MAX_PER_USER", "3")
+    monkeypatch.setenv("ROLE_CACHE__CHANNEL", "local")
+    monkeypatch.setenv("ROLE_CACHE__TTL", "10")
+    monkeypatch.setenv("WRITE_BEHIND__ENABLED", "true")
+    monkeypatch.setenv("WRITE_BEHIND__MAX_SIZE", "50")
+    monkeypatch.setenv("GROUP_COMMIT__ENABLED", "true")
+    monkeypatch.setenv("GROUP_COMMIT__MAX_BATCH", "8")
+
+    settings = Settings()
+
+    assert settings.storage.backend == "database"
+    assert settings.db.url == "sqlite+aiosqlite:///./boards.db"
+    assert settings.state.sticker_store == "compact"
+    assert settings.sessions.max_per_user == 3
+    assert settings.role_cache.channel == "local"
+    assert settings.role_cache.ttl == 10
+    assert settings.write_behind.enabled and settings.write_behind.max_size == 50
+    assert settings.group_commit.enabled and settings.group_commit.max_batch == 8
+
+
+def test_section_as_json(monkeypatch):
+    monkeypatch.setenv("WRITE_BEHIND", '{"enabled": true, "flush_interval": 0.5}')
+
+    settings = Settings()
+
+    assert settings.write_behind.enabled
+    assert settings.write_behind.flush_interval == 0.5
+    assert settings.write_behind.max_size == 1000
@@ -0,0 +1,110 @@
+"""DatabaseHelper.session: одна сессия и одна транзакция на запрос, чтения с реплик."""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from repository.db_helper import DatabaseHelper
+from repository.entities import BaseModel
+from services.backend.repository_backend import RepositoryBackend
+
+USER = str(uuid.uuid4())
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+async def _open_helper(path, **kwargs) -> DatabaseHelper:
+    helper = DatabaseHelper(url=f"sqlite+aiosqlite:///{path}", **kwargs)
+    async with helper.engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+    return helper
+
+
+def test_request_uses_one_connection_and_one_commit(tmp_path):
+    async def scenario():
+        helper = await _open_helper(tmp_path / "boards.db")
+        checkouts, commits = [], []
+        event.listen(helper.engine.sync_engine, "checkout", lambda *_: checkouts.append(1))
+        event.listen(helper.engine.sync_engine, "commit", lambda *_: commits.append(1))
+
+        async with helper.session(user_id=USER) as session:
+            backend = RepositoryBackend(session=session)
+            board = await backend.create_board(USER, "board")
+            await backend.rename_board(board["id"], USER, "renamed")
+            await backend.invite_member(board["id"], USER, str(uuid.uuid4()), "viewer")
+            await backend.create_sticker(USER, {**STICKER, "dashboard_id": board["id"]})
+        assert len(checkouts) == 1 and len(commits) == 1
+
+        async with helper.session(read_only=True, user_id=USER) as session:
+            stored = await RepositoryBackend(session=session).get_board(board["id"], USER)
+        assert stored["name"] == "renamed" and len(stored["stickers"]) == 1
+        await helper.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_failed_request_is_rolled_back(tmp_path):
+    async def scenario():
+        helper = await _open_helper(tmp_path / "boards.db")
+        with pytest.raises(RuntimeError):
+            async with helper.session(user_id=USER) as session:
+                await RepositoryBackend(session=session).create_board(USER, "lost")
+                raise RuntimeError("handler failed")
+        async with helper.session(read_only=True) as session:
+            boards = await RepositoryBackend(session=session).list_boards(USER)
+        await helper.dispose()
+        return boards
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_reads_round_robin_over_healthy_replicas_and_pin_writers(tmp_path):
+    async def scenario():
+        replica_urls = [
+            f"sqlite+aiosqlite:///{tmp_path / 'first.db'}",
+            f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'broken.db'}",
+            f"sqlite+aiosqlite:///{tmp_path / 'second.db'}",
+        ]
+        helper = await _open_helper(
+            tmp_path / "boards.db", replica_urls=replica_urls, read_your_writes=0.2, replica_retry=60
+        )
+        first, broken, second = helper.replicas
+
+        async def read_from(user_id=None):
+            async with helper.session(read_only=True, user_id=user_id) as session:
+                return session.bind
+
+        # недоступная реплика пропускается и выпадает из круга на replica_retry
+        assert [await read_from() for _ in range(4)] == [first.engine, second.engine, first.engine, second.engine]
+        assert helper.stats()["replicas"] == [
+            {"reads": 2, "failures": 0, "down": False},
+            {"reads": 0, "failures": 1, "down": True},
+            {"reads": 2, "failures": 0, "down": False},
+        ]
+
+        async with helper.session(user_id=USER) as session:
+            await RepositoryBackend(session=session).create_board(USER, "board")
+        # писавший читает из основной БД, остальные — с реплик
+        assert await read_from(USER) is helper.engine
+        assert await read_from(str(uuid.uuid4())) is not helper.engine
+        assert helper.stats()["pinned"] == 1 and helper.stats()["primary_reads"] == 1
+
+        await asyncio.sleep(0.3)
+        assert await read_from(USER) is not helper.engine
+        assert helper.stats()["pinned"] == 0
+        await helper.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_without_replicas_reads_use_primary(tmp_path):
+    async def scenario():
+        helper = await _open_helper(tmp_path / "boards.db")
+        async with helper.session(user_id=USER) as session:
+            await RepositoryBackend(session=session).create_board(USER, "board")
+        async with helper.session(read_only=True, user_id=USER) as session:
+            assert session.bind is helper.engine
+        assert helper.stats() == {"primary_reads": 0, "pinned": 0, "replicas": []}
+        await helper.dispose()
+
+    asyncio.run(scenario())
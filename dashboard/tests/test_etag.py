@@ -0,0 +1,85 @@
+"""Версии досок: ETag, If-None-Match → 304 и If-Match → 412."""
+import asyncio
+import uuid
+
+import pytest
+
+from core.etag import if_match_versions, not_modified
+from exceptions import PreconditionFailedException
+
+STICKER = {"x": 0, "y": 0, "text": "note", "width": 100, "height": 80, "color": "#ffcc00"}
+
+
+def test_get_board_answers_304_until_it_changes(client, login):
+    _, headers = login()
+    created = client.post("/boards", json={"name": "board"}, headers=headers)
+    board_id = created.json()["id"]
+    first = client.get(f"/boards/{board_id}", headers=headers)
+    etag = first.headers["ETag"]
+    assert etag == '"0"'
+
+    cached = client.get(f"/boards/{board_id}", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["ETag"] == etag
+
+    client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers)
+    changed = client.get(f"/boards/{board_id}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] == '"1"' and len(changed.json()["stickers"]) == 1
+
+
+def test_if_match_rejects_stale_writes_with_412(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    sticker = client.post(
+        "/stickers", json={**STICKER, "dashboard_id": board_id}, headers={**headers, "If-Match": '"0"'}
+    ).json()
+
+    # второй клиент всё ещё видит версию 0
+    stale = client.patch(f"/stickers/{sticker['id']}", json={"x": 5}, headers={**headers, "If-Match": '"0"'})
+    assert stale.status_code == 412
+    assert client.get(f"/stickers/{sticker['id']}", headers=headers).json()["x"] == 0
+
+    fresh = client.patch(f"/stickers/{sticker['id']}", json={"x": 5}, headers={**headers, "If-Match": '"1"'})
+    assert fresh.status_code == 200
+    renamed = client.put(f"/boards/{board_id}", json={"name": "renamed"}, headers={**headers, "If-Match": '"2"'})
+    assert renamed.status_code == 200 and renamed.headers["ETag"] == '"3"'
+    assert client.delete(f"/boards/{board_id}", headers={**headers, "If-Match": '"2"'}).status_code == 412
+    assert client.delete(f"/boards/{board_id}", headers={**headers, "If-Match": "*"}).status_code == 204
+
+
+def test_backends_roll_back_writes_with_stale_version(open_backends):
+    user = str(uuid.uuid4())
+
+    async def scenario():
+        async with open_backends() as transaction:
+            async with transaction() as backend:
+                board = await backend.create_board(user, "board")
+                sticker = await backend.create_sticker(user, {**STICKER, "dashboard_id": board["id"]})
+            with pytest.raises(PreconditionFailedException):
+                async with transaction() as backend:
+                    await backend.update_sticker(sticker["id"], user, {"x": 5.0}, if_match=frozenset({0}))
+            async with transaction() as backend:
+                assert (await backend.get_sticker(sticker["id"], user))["x"] == 0
+                assert await backend.get_board_version(board["id"], user) == 1
+                await backend.rename_board(board["id"], user, "renamed", if_match=frozenset({0, 1}))
+                assert await backend.get_board_version(board["id"], user) == 2
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("header, versions", [
+    (None, None),
+    ("*", None),
+    ('"3", "5"', frozenset({3, 5})),
+    ('W/"3"', frozenset()),
+    ("garbage", frozenset()),
+])
+def test_if_match_parsing(header, versions):
+    assert if_match_versions(header) == versions
+
+
+def test_not_modified_accepts_weak_tags():
+    assert not_modified('W/"7"', 7)
+    assert not_modified("*", 7)
+    assert not not_modified('"6"', 7)
+    assert not not_modified(None, 7)
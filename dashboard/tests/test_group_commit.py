@@ -0,0 +1,103 @@
+"""GroupCommit: записи разных запросов одной транзакцией, ошибка откатывает только свою точку сохранения."""
+import asyncio
+import uuid
+
+from exceptions import AccessDeniedException, PreconditionFailedException
+from repository.group_commit import GroupCommit
+from services.backend.repository_backend import RepositoryBackend
+
+USER = str(uuid.uuid4())
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def _backend(session, group=None) -> RepositoryBackend:
+    backend = RepositoryBackend(session=session)
+    backend.buffer = None
+    backend.group = group
+    return backend
+
+
+def test_failed_operation_rolls_back_only_its_savepoint(database):
+    async def scenario():
+        async with database() as sessions:
+            async with sessions() as session, session.begin():
+                board = await _backend(session).create_board(USER, "board")
+            group = GroupCommit(sessions, window=0.01)
+
+            async def failing(session):
+                await _backend(session)._create_sticker(uuid.UUID(board["id"]), USER, {**STICKER, "text": "lost"}, None)
+                raise RuntimeError("boom")
+
+            async def create(session, text):
+                return await _backend(session)._create_sticker(
+                    uuid.UUID(board["id"]), USER, {**STICKER, "text": text}, None
+                )
+
+            results = await asyncio.gather(
+                group.run(lambda session: create(session, "first")),
+                group.run(failing),
+                group.run(lambda session: create(session, "second")),
+                return_exceptions=True,
+            )
+            assert [result["text"] for result in (results[0], results[2])] == ["first", "second"]
+            assert isinstance(results[1], RuntimeError)
+            assert group.stats() == {"queued": 0, "operations": 3, "batches": 1, "failed": 1, "errors": 0}
+
+            async with sessions() as session:
+                stored = await _backend(session).get_board(board["id"], USER)
+            assert sorted(sticker["text"] for sticker in stored["stickers"]) == ["first", "second"]
+            await group.close()
+
+    asyncio.run(scenario())
+
+
+def test_backend_writes_go_through_group(database):
+    async def scenario():
+        async with database() as sessions:
+            async with sessions() as session, session.begin():
+                board = await _backend(session).create_board(USER, "board")
+            group = GroupCommit(sessions, window=0.01)
+
+            async def write(data, user_id=USER, if_match=None):
+                async with sessions() as session, session.begin():
+                    return await _backend(session, group).create_sticker(
+                        user_id, {**STICKER, **data, "dashboard_id": board["id"]}, if_match
+                    )
+
+            results = await asyncio.gather(
+                write({"x": 1.0}),
+                write({"x": 2.0}, if_match=frozenset({0})),
+                write({"x": 3.0}, user_id=str(uuid.uuid4())),
+                return_exceptions=True,
+            )
+            assert results[0]["x"] == 1.0
+            # устаревший If-Match и чужая доска: их точки сохранения откатываются, ошибки — своим запросам
+            assert isinstance(results[1], PreconditionFailedException)
+            assert isinstance(results[2], AccessDeniedException)
+            assert group.stats()["batches"] == 1 and group.stats()["failed"] == 2
+
+            async with sessions() as session:
+                stored = await _backend(session).get_board(board["id"], USER)
+            assert [sticker["x"] for sticker in stored["stickers"]] == [1.0]
+            assert stored["version"] == board["version"] + 1
+            await group.close()
+
+    asyncio.run(scenario())
+
+
+def test_commit_failure_reaches_every_operation():
+    class BrokenSession:
+        async def __aenter__(self):
+            raise ConnectionError("database is gone")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def scenario():
+        group = GroupCommit(lambda: BrokenSession(), window=0)
+        results = await asyncio.gather(*(group.run(lambda session: None) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert group.stats()["errors"] == 1 and group.stats()["batches"] == 0
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,33 @@
+"""/metrics: подключается только флагом и закрывается токеном."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from api.v1.endpoints import metrics
+from config.config import settings
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_not_mounted_by_default():
+    assert not settings.metrics.enabled
+    assert "/metrics" not in {route.path for route in main.app.routes}
+
+
+def test_open_without_token(monkeypatch):
+    monkeypatch.setattr(settings.metrics, "token", "")
+    response = _client().get("/metrics")
+    assert response.status_code == 200
+    assert {"sessions", "passwords", "realtime", "presence"} <= set(response.json())
+
+
+def test_token_required_when_set(monkeypatch):
+    monkeypatch.setattr(settings.metrics, "token", "scraper-secret")
+    client = _client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scraper-secret"}).status_code == 200
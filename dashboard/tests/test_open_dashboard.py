@@ -0,0 +1,57 @@
+"""DashboardRepository.open_dashboard: доска, роль и стикеры одним SELECT."""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from exceptions import AccessDeniedException, NotFoundException
+from models.user_role import UserRole
+from repository.dashboard_repository import DashboardRepository
+from repository.dashboard_role_repository import DashboardRoleRepository
+from repository.sticker_repository import StickerRepository
+from services.backend.repository_backend import RepositoryBackend
+
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def test_open_dashboard_in_one_statement(database):
+    roles = DashboardRoleRepository()
+    dashboards = DashboardRepository(roles)
+    stickers = StickerRepository(roles)
+    owner, viewer = uuid.uuid4(), uuid.uuid4()
+
+    async def scenario():
+        async with database() as sessions:
+            async with sessions() as session, session.begin():
+                empty, _ = await dashboards.create_dashboard(session, "empty", owner)
+                full, _ = await dashboards.create_dashboard(session, "full", owner)
+                await roles.invite_user(session, full.id, owner, viewer, UserRole.VIEWER)
+                await stickers.create_stickers(session, full.id, [{**STICKER, "x": float(i)} for i in range(3)])
+                await dashboards.bump_version(session, full.id, None)
+
+            statements = []
+            async with sessions() as session:
+                event.listen(session.bind.sync_engine, "before_cursor_execute", lambda *_: statements.append(1))
+                opened = await dashboards.open_dashboard(session, full.id, viewer)
+                assert len(statements) == 1
+                assert (opened.name, opened.version, opened.role) == ("full", 1, UserRole.VIEWER)
+                assert sorted(sticker.x for sticker in opened.stickers) == [0.0, 1.0, 2.0]
+                # стикеры по возрастанию id, как и в постраничной выдаче
+                assert sorted(sticker.id for sticker in opened.stickers) == [sticker.id for sticker in opened.stickers]
+
+                opened_empty = await dashboards.open_dashboard(session, empty.id, owner)
+                assert opened_empty.stickers == [] and opened_empty.role == UserRole.OWNER
+                assert await dashboards.open_dashboard(session, empty.id, viewer) is None
+                assert await dashboards.open_dashboard(session, uuid.uuid4(), owner) is None
+
+                # бэкенд отличает чужую доску (403) от несуществующей (404)
+                backend = RepositoryBackend(session=session)
+                board = await backend.get_board(str(full.id), str(viewer))
+                assert board["role"] == "viewer" and board["version"] == 1 and len(board["stickers"]) == 3
+                with pytest.raises(AccessDeniedException):
+                    await backend.get_board(str(empty.id), str(viewer))
+                with pytest.raises(NotFoundException):
+                    await backend.get_board(str(uuid.uuid4()), str(owner))
+
+    asyncio.run(scenario())
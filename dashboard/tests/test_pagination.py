@@ -0,0 +1,70 @@
+"""Постраничная выдача по курсору (Link: rel="next") и поток NDJSON."""
+import asyncio
+import json
+import uuid
+
+from core.pagination import NDJSON
+
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def _next(response) -> str | None:
+    link = response.headers.get("Link")
+    return link[1:link.index(">")] if link else None
+
+
+def test_sticker_pages_follow_link(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    created = client.post("/stickers:batch", headers=headers, json={
+        "dashboard_id": board_id, "stickers": [{**STICKER, "x": i} for i in range(7)],
+    }).json()["results"]
+
+    seen, pages = [], 0
+    url = f"/boards/{board_id}/stickers?limit=3"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        seen += [sticker["id"] for sticker in response.json()]
+        pages += 1
+        url = _next(response)
+    assert pages == 3
+    assert seen == sorted(result["id"] for result in created)
+
+    streamed = client.get(f"/boards/{board_id}/stickers?after={seen[1]}", headers={**headers, "Accept": NDJSON})
+    assert streamed.headers["content-type"] == NDJSON
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == seen[2:]
+    assert client.get(f"/boards/{board_id}/stickers?limit=0", headers=headers).status_code == 422
+
+
+def test_board_pages(client, login):
+    _, headers = login()
+    boards = sorted(client.post("/boards", json={"name": f"b{i}"}, headers=headers).json()["id"] for i in range(3))
+    first = client.get("/boards?limit=2", headers=headers)
+    assert [board["id"] for board in first.json()] == boards[:2]
+    last = client.get(_next(first), headers=headers)
+    assert [board["id"] for board in last.json()] == boards[2:] and _next(last) is None
+    # без limit — все доски сразу, как раньше
+    assert len(client.get("/boards", headers=headers).json()) == 3
+
+
+def test_backends_page_and_stream_by_id(open_backends):
+    user = str(uuid.uuid4())
+
+    async def scenario():
+        async with open_backends() as transaction:
+            async with transaction() as backend:
+                board = await backend.create_board(user, "board")
+                created = await backend.create_stickers(board["id"], user, [STICKER] * 5)
+            ids = sorted(sticker["id"] for sticker in created)
+            async with transaction() as backend:
+                page = await backend.list_stickers(board["id"], user, ids[0], 2)
+                streamed = [
+                    sticker["id"]
+                    async for batch in backend.stream_stickers(board["id"], user, ids[1], 10)
+                    for sticker in batch
+                ]
+        assert [sticker["id"] for sticker in page] == ids[1:3]
+        assert streamed == ids[2:]
+
+    asyncio.run(scenario())
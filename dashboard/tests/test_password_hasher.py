@@ -0,0 +1,89 @@
+"""PasswordHasher: хэширование в пуле потоков и 503 сверх max_pending."""
+import asyncio
+import threading
+
+import pytest
+
+from exceptions import ServiceUnavailableException
+from services.auth import AuthService
+from services.password_hasher import PasswordHasher
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(workers=2, iterations=1000)
+
+    async def scenario():
+        encoded = await hasher.hash("secret")
+        assert encoded.startswith("pbkdf2_sha256$1000$")
+        assert await hasher.verify("secret", encoded)
+        assert not await hasher.verify("wrong", encoded)
+        assert not await hasher.verify("secret", "md5$broken")
+
+    asyncio.run(scenario())
+    assert hasher.stats()["completed"] == 4 and hasher.stats()["in_flight"] == 0
+
+
+def test_rejects_over_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=2, iterations=1000)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableException):
+            await hasher.hash("secret")
+        release.set()
+        assert await asyncio.gather(*blocked) == [True, True]
+        # очередь освободилась — запросы снова принимаются
+        assert await hasher.hash("secret")
+
+    asyncio.run(scenario())
+    assert hasher.stats()["rejected"] == 1
+
+
+class _Context:
+    """AuthDbContext без БД: пользователи в словаре по email."""
+
+    def __init__(self):
+        self.users = {}
+
+    async def users_exists_by_email_async(self, email):
+        return email in self.users
+
+    async def users_find_by_email_async(self, email):
+        return self.users.get(email)
+
+    def users_add(self, user):
+        self.users[user.email] = user
+
+    async def save_changes_async(self):
+        pass
+
+
+class _RecordingHasher(PasswordHasher):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    async def run(self, func, *args):
+        self.calls.append(func.__name__)
+        return await super().run(func, *args)
+
+
+def test_auth_service_hashes_in_the_pool():
+    hasher = _RecordingHasher(workers=1)
+    config = {"JwtSettings": {"SecretKey": "secret"}}
+    service = AuthService(_Context(), config, hasher=hasher)
+
+    async def scenario():
+        assert (await service.register_async("User@Example.com", "password")).success
+        assert (await service.login_async(" user@example.COM", "password")).success
+        assert not (await service.login_async("user@example.com", "wrong")).success
+
+        # пул переполнен: регистрация получает тот же 503, что и /signup
+        busy = AuthService(_Context(), config, hasher=PasswordHasher(max_pending=0))
+        with pytest.raises(ServiceUnavailableException):
+            await busy.register_async("other@example.com", "password")
+
+    asyncio.run(scenario())
+    assert hasher.calls == ["hash_password", "verify_password", "verify_password"]
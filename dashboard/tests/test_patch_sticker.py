@@ -0,0 +1,34 @@
+"""PATCH /stickers/{id}: пишутся только переданные поля."""
+import pytest
+
+STICKER = {"x": 10, "y": 20, "text": "note", "width": 100, "height": 80, "color": "#ffcc00"}
+
+
+def test_patch_changes_only_sent_fields(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    sticker = client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers).json()
+
+    response = client.patch(f"/stickers/{sticker['id']}", json={"x": 500}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {**sticker, "x": 500}
+    # стикер сдвинулся и в индексе области
+    found = client.get(f"/boards/{board_id}/stickers?x0=450&y0=0&x1=550&y1=50", headers=headers).json()
+    assert [s["id"] for s in found] == [sticker["id"]]
+
+    patched = client.patch(f"/stickers/{sticker['id']}", json={"text": "edited", "color": "#000"}, headers=headers)
+    assert patched.json() == {**sticker, "x": 500, "text": "edited", "color": "#000"}
+
+
+@pytest.mark.parametrize("body", [{}, {"x": None}, {"width": 1e7}, {"unknown": 1}])
+def test_patch_rejects_empty_and_null_fields(client, login, body):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    sticker = client.post("/stickers", json={**STICKER, "dashboard_id": board_id}, headers=headers).json()
+    assert client.patch(f"/stickers/{sticker['id']}", json=body, headers=headers).status_code == 422
+
+
+def test_patch_missing_sticker(client, login):
+    _, headers = login()
+    assert client.patch("/stickers/missing", json={"x": 1}, headers=headers).status_code == 404
+
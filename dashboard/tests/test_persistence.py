@@ -0,0 +1,81 @@
+"""StatePersistence: восстановление State из WAL и снимка."""
+import asyncio
+
+from services.persistence import SEGMENT_PATTERN, SNAPSHOT_NAME, StatePersistence
+from services.state import State
+
+STICKER = {"x": 1.0, "y": 2.0, "text": "note", "width": 10.0, "height": 10.0, "color": "#fff"}
+
+
+def _fill(state: State) -> str:
+    user = state.create_user("User@Example.com", "hash")
+    token = state.create_session("user@example.com")
+    board_id = state.add_board("board", user["id"])["id"]
+    state.set_member_role(board_id, "guest", "viewer")
+    first = state.add_sticker(board_id, {**STICKER, "dashboard_id": board_id})["id"]
+    state.add_stickers(board_id, [{**STICKER, "dashboard_id": board_id, "x": float(i)} for i in range(3)])
+    state.update_sticker(first, {"text": "edited"})
+    state.rename_board(board_id, "renamed")
+    return token
+
+
+def _reopen(directory) -> State:
+    restored = State()
+    StatePersistence(restored, directory).open()
+    return restored
+
+
+def _assert_same(restored: State, state: State, token: str) -> None:
+    assert restored.boards == state.boards
+    assert dict(restored.stickers) == dict(state.stickers)
+    assert restored.memberships == state.memberships
+    assert restored.get_user_by_token(token)["email"] == "User@Example.com"
+    board_id = next(iter(state.boards))
+    assert {s["id"] for s in restored.query_stickers(board_id, 0, 0, 5, 5)} == set(state.boards[board_id]["stickers"])
+
+
+def test_restore_from_wal(tmp_path):
+    state = State()
+    persistence = StatePersistence(state, tmp_path, fsync_interval=0.01)
+    persistence.open()
+    token = _fill(state)
+    persistence.close()
+
+    _assert_same(_reopen(tmp_path), state, token)
+
+
+def test_restore_from_snapshot_and_wal_tail(tmp_path):
+    state = State()
+    persistence = StatePersistence(state, tmp_path, fsync_interval=0.01)
+    persistence.open()
+    token = _fill(state)
+    asyncio.run(persistence.snapshot())
+    # сегменты, вошедшие в снимок, удалены
+    assert len(list(tmp_path.glob(SEGMENT_PATTERN))) == 1
+    board_id = next(iter(state.boards))
+    removed = next(iter(state.boards[board_id]["stickers"]))
+    state.remove_sticker(removed)
+    state.remove_member(board_id, "guest")
+    persistence.close()
+
+    assert (tmp_path / SNAPSHOT_NAME).exists()
+    restored = _reopen(tmp_path)
+    _assert_same(restored, state, token)
+    assert removed not in restored.stickers
+    assert "guest" not in restored.memberships
+
+
+def test_truncated_wal_record_is_skipped(tmp_path):
+    state = State()
+    persistence = StatePersistence(state, tmp_path, fsync_interval=0.01)
+    persistence.open()
+    board_id = state.add_board("board", "user")["id"]
+    state.add_sticker(board_id, {**STICKER, "dashboard_id": board_id})
+    persistence.close()
+    segment = next(tmp_path.glob(SEGMENT_PATTERN))
+    # запись, которую процесс не успел дописать
+    segment.write_bytes(segment.read_bytes()[:-5])
+
+    restored = _reopen(tmp_path)
+    assert list(restored.boards) == [board_id]
+    assert len(restored.stickers) == 0
@@ -0,0 +1,70 @@
+"""PresenceHub: курсоры и присутствие на доске."""
+import asyncio
+
+from services.presence_hub import PresenceHub
+from tests.test_board_hub import FakeWebSocket
+
+
+def test_cursors_and_presence():
+    async def scenario():
+        hub = PresenceHub(coalesce_window=0.01)
+        alice, bob = FakeWebSocket(), FakeWebSocket()
+        serving = [asyncio.create_task(hub.serve("board", "alice", alice))]
+        await asyncio.sleep(0)
+        alice.send({"type": "cursor", "x": 1, "y": 2})
+        await asyncio.sleep(0.03)
+        serving.append(asyncio.create_task(hub.serve("board", "bob", bob)))
+        await asyncio.sleep(0)
+        # курсоры одного пользователя за окно схлопываются в последний
+        for x in range(10):
+            alice.send({"type": "cursor", "x": x, "y": 0})
+        bob.send({"type": "cursor", "x": "left", "y": 0})
+        bob.incoming.put_nowait({"type": "websocket.receive", "text": "not json"})
+        await asyncio.sleep(0.03)
+
+        snapshot = {"type": "presence.snapshot", "users": [{"user_id": "alice", "x": 1, "y": 2}]}
+        joined = {"type": "presence.joined", "user_id": "bob", "x": None, "y": None}
+        assert bob.frames[0] == {"events": [snapshot]}
+        assert bob.events()[1:] == [joined, {"type": "cursor.moved", "user_id": "alice", "x": 9, "y": 0}]
+        assert joined in alice.events()
+        assert hub.stats()["viewers"] == 2 and hub.stats()["ignored"] == 2
+
+        alice.disconnect()
+        await serving[0]
+        await asyncio.sleep(0.03)
+        assert bob.events()[-1] == {"type": "presence.left", "user_id": "alice"}
+        assert hub.stats()["viewers"] == 1
+        await hub.close()
+        await serving[1]
+
+    asyncio.run(scenario())
+
+
+def test_silent_viewer_expires_until_next_message():
+    async def scenario():
+        hub = PresenceHub(coalesce_window=0.01, idle_timeout=0.05)
+        quiet, watcher = FakeWebSocket(), FakeWebSocket()
+        serving = [
+            asyncio.create_task(hub.serve("board", user, ws)) for user, ws in (("quiet", quiet), ("watcher", watcher))
+        ]
+        for _ in range(6):
+            await asyncio.sleep(0.02)
+            watcher.send({"type": "ping"})
+        assert {"type": "presence.left", "user_id": "quiet"} in watcher.events()
+        assert hub.stats()["expired"] == 1 and hub.stats()["viewers"] == 1
+
+        quiet.send({"type": "ping"})
+        await asyncio.sleep(0.03)
+        assert watcher.events()[-1] == {"type": "presence.joined", "user_id": "quiet", "x": None, "y": None}
+        await hub.close()
+        await asyncio.gather(*serving)
+
+    asyncio.run(scenario())
+
+
+def test_presence_endpoint(client, login):
+    _, headers = login()
+    token = headers["Authorization"].split(" ", 1)[1]
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    with client.websocket_connect(f"/boards/{board_id}/presence?token={token}") as websocket:
+        assert websocket.receive_json() == {"events": [{"type": "presence.snapshot", "users": []}]}
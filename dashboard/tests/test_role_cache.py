@@ -0,0 +1,77 @@
+"""RoleCache: TTL, LRU, поколения и сброс через канал."""
+import uuid
+
+from models.user_role import UserRole
+from repository.role_cache import MISS, LocalInvalidationChannel, RoleCache
+
+BOARD = uuid.uuid4()
+USER = uuid.uuid4()
+
+
+def test_put_and_get():
+    cache = RoleCache()
+    assert cache.get(BOARD, USER) is MISS
+    cache.put(BOARD, USER, UserRole.EDITOR, cache.generation)
+    assert cache.get(BOARD, USER) == UserRole.EDITOR
+    # отсутствие роли тоже кэшируется
+    cache.put(BOARD, uuid.UUID(int=0), None, cache.generation)
+    assert cache.get(BOARD, uuid.UUID(int=0)) is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("repository.role_cache.time.monotonic", lambda: now[0])
+    cache = RoleCache(ttl=30)
+    cache.put(BOARD, USER, UserRole.VIEWER, cache.generation)
+    now[0] += 29
+    assert cache.get(BOARD, USER) == UserRole.VIEWER
+    now[0] += 2
+    assert cache.get(BOARD, USER) is MISS
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = RoleCache(max_size=2)
+    first, second, third = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    cache.put(BOARD, first, UserRole.VIEWER, cache.generation)
+    cache.put(BOARD, second, UserRole.VIEWER, cache.generation)
+    cache.get(BOARD, first)
+    cache.put(BOARD, third, UserRole.VIEWER, cache.generation)
+    assert cache.get(BOARD, second) is MISS
+    assert cache.get(BOARD, first) == UserRole.VIEWER
+    assert cache.get(BOARD, third) == UserRole.VIEWER
+
+
+def test_read_started_before_invalidation_is_not_cached():
+    cache = RoleCache()
+    generation = cache.generation
+    cache.invalidate(BOARD, USER)
+    cache.put(BOARD, USER, UserRole.EDITOR, generation)
+    assert cache.get(BOARD, USER) is MISS
+
+
+def test_invalidate_whole_board():
+    cache = RoleCache()
+    other_board = uuid.uuid4()
+    for user_id in (USER, uuid.uuid4()):
+        cache.put(BOARD, user_id, UserRole.EDITOR, cache.generation)
+    cache.put(other_board, USER, UserRole.EDITOR, cache.generation)
+    cache.invalidate(BOARD)
+    assert cache.get(BOARD, USER) is MISS
+    assert cache.get(other_board, USER) == UserRole.EDITOR
+
+
+def test_channel_invalidates_other_caches_once():
+    channel = LocalInvalidationChannel()
+    publisher, subscriber = RoleCache(channel=channel), RoleCache(channel=channel)
+    for cache in (publisher, subscriber):
+        cache.put(BOARD, USER, UserRole.EDITOR, cache.generation)
+
+    publisher.invalidate(BOARD, USER)
+
+    assert publisher.get(BOARD, USER) is MISS
+    assert subscriber.get(BOARD, USER) is MISS
+    # своё сообщение, вернувшееся из канала, не считается вторым сбросом
+    assert publisher.stats()["invalidations"] == 1
+    assert subscriber.stats()["invalidations"] == 1
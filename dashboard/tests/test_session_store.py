@@ -0,0 +1,59 @@
+"""SessionStore: абсолютный и скользящий TTL, вытеснение по LRU."""
+from types import SimpleNamespace
+
+import pytest
+
+from services import session_store
+from services.session_store import SessionStore
+
+USER = {"id": "user", "email": "user@example.com"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_sliding_and_absolute_ttl(clock):
+    sessions = SessionStore(absolute_ttl=100, sliding_ttl=30)
+    sessions.create("idle", USER)
+    sessions.create("active", USER)
+    for _ in range(4):
+        clock.value += 20
+        assert sessions.get("active") == USER
+    # "idle" не трогали дольше sliding_ttl, "active" продлевался обращениями
+    assert sessions.get("idle") is None
+    clock.value += 25
+    # абсолютный срок не сдвигается: 105 секунд с выдачи
+    assert sessions.get("active") is None
+    assert sessions.stats()["expired"] == 2
+    assert len(sessions) == 0
+
+
+def test_purge_skips_extended_sessions(clock):
+    sessions = SessionStore(absolute_ttl=100, sliding_ttl=30)
+    sessions.create("idle", USER)
+    sessions.create("active", USER)
+    clock.value += 20
+    sessions.get("active")
+    clock.value += 15
+    assert sessions.purge_expired() == 1
+    assert sessions.get("active") == USER
+    clock.value += 31
+    assert sessions.purge_expired() == 1
+    assert sessions.stats() == {"active": 0, "users": 0, "created": 2, "expired": 2, "evicted": 0}
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    sessions = SessionStore(max_per_user=2)
+    sessions.create("first", USER)
+    sessions.create("second", USER)
+    clock.value += 1
+    sessions.get("first")
+    sessions.create("third", USER)
+    assert sessions.get("second") is None
+    assert sessions.get("first") == USER and sessions.get("third") == USER
+    assert sessions.stats()["evicted"] == 1
+    assert sessions.revoke("first") and not sessions.revoke("first")
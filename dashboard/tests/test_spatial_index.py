@@ -0,0 +1,84 @@
+"""StickerGrid и выборка стикеров по области."""
+import math
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from schema.sticker import CreateStickerRequest
+from services.spatial_index import StickerGrid
+from services.state import State
+
+
+def _brute_force(rects: dict, x0: float, y0: float, x1: float, y1: float) -> set:
+    return {
+        sid for sid, (x, y, w, h) in rects.items()
+        if min(x, x + w) <= x1 and x0 <= max(x, x + w) and min(y, y + h) <= y1 and y0 <= max(y, y + h)
+    }
+
+
+def test_grid_matches_brute_force():
+    rnd = random.Random(7)
+    grid = StickerGrid(cell_size=100, max_cells=4)
+    rects = {}
+    for step in range(3000):
+        op = rnd.random()
+        if op < 0.5 or not rects:
+            sid = f"s{step}"
+            rects[sid] = (rnd.uniform(-1000, 1000), rnd.uniform(-1000, 1000), rnd.uniform(-400, 400), 30.0)
+            grid.insert(sid, *rects[sid])
+        elif op < 0.8:
+            sid = rnd.choice(list(rects))
+            rects[sid] = (rnd.uniform(-1000, 1000), rnd.uniform(-1000, 1000), rnd.uniform(-50, 50), -30.0)
+            grid.move(sid, *rects[sid])
+        else:
+            sid = rnd.choice(list(rects))
+            del rects[sid]
+            grid.remove(sid)
+        if step % 50 == 0:
+            x0, y0 = rnd.uniform(-1200, 1200), rnd.uniform(-1200, 1200)
+            area = (x0, y0, x0 + rnd.uniform(0, 800), y0 + rnd.uniform(0, 800))
+            assert set(grid.query(*area)) == _brute_force(rects, *area)
+    assert len(grid) == len(rects)
+
+
+def test_huge_and_infinite_stickers_go_to_overflow():
+    grid = StickerGrid()
+    grid.insert("huge", 0, 0, 1e6, 1e6)
+    grid.insert("inf", 0, 0, math.inf, 10)
+    grid.insert("small", 10, 10, 5, 5)
+    assert not grid._cells.keys() - {(0, 0)}
+    assert set(grid.query(2e5, 2e5, 2e5 + 1, 2e5 + 1)) == {"huge"}
+    assert set(grid.query(-1, -1, 20, 20)) == {"huge", "inf", "small"}
+    assert set(grid.query(-math.inf, -math.inf, math.inf, math.inf)) == {"huge", "inf", "small"}
+
+
+def test_state_query_follows_moves():
+    state = State()
+    board_id = state.add_board("board", "user")["id"]
+    sticker = {"dashboard_id": board_id, "text": "", "width": 10.0, "height": 10.0, "color": "#fff"}
+    near = state.add_sticker(board_id, {**sticker, "x": 0.0, "y": 0.0})["id"]
+    far = state.add_sticker(board_id, {**sticker, "x": 5000.0, "y": 5000.0})["id"]
+    assert [s["id"] for s in state.query_stickers(board_id, 0, 0, 100, 100)] == [near]
+
+    state.update_sticker(far, {"x": 50.0, "y": 50.0})
+    state.update_sticker(near, {"text": "still here"})
+    assert {s["id"] for s in state.query_stickers(board_id, 0, 0, 100, 100)} == {near, far}
+    state.remove_sticker(near)
+    assert [s["id"] for s in state.query_stickers(board_id, 0, 0, 100, 100)] == [far]
+
+
+@pytest.mark.parametrize("field, value", [("x", math.inf), ("y", math.nan), ("x", 2e9), ("width", 1e7)])
+def test_request_rejects_unbounded_geometry(field, value):
+    data = {"dashboard_id": "b", "x": 0, "y": 0, "text": "", "width": 10, "height": 10, "color": "#fff"}
+    with pytest.raises(ValidationError):
+        CreateStickerRequest(**{**data, field: value})
+
+
+def test_api_rejects_infinity_with_422(client, login):
+    _, headers = login()
+    board_id = client.post("/boards", json={"name": "board"}, headers=headers).json()["id"]
+    body = '{"dashboard_id": "%s", "x": Infinity, "y": NaN, "text": "", "width": 10, "height": 10, "color": "#fff"}'
+    response = client.post("/stickers", content=body % board_id, headers={**headers, "Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert {error["input"] for error in response.json()["detail"]} == {"inf", "nan"}
@@ -0,0 +1,34 @@
+"""State: обратный индекс участников досок."""
+from services.state import State
+
+
+def test_user_boards_follow_membership_changes():
+    state = State()
+    creator, guest = "creator", "guest"
+    first = state.add_board("first", creator)["id"]
+    second = state.add_board("second", creator)["id"]
+    assert state.get_user_boards(creator) == {first: "creator", second: "creator"}
+    assert state.get_user_boards(guest) == {}
+
+    state.set_member_role(first, guest, "viewer")
+    state.set_member_role(second, guest, "editor")
+    assert state.get_user_boards(guest) == {first: "viewer", second: "editor"}
+    assert state.update_member_role(first, guest, "editor")
+    assert state.get_user_boards(guest)[first] == "editor"
+
+    assert state.remove_member(first, guest)
+    assert state.get_user_boards(guest) == {second: "editor"}
+    state.delete_board(second)
+    assert state.get_user_boards(guest) == {}
+    assert state.get_user_boards(creator) == {first: "creator"}
+    # пустые записи индекса не копятся
+    assert guest not in state.memberships
+
+
+def test_user_boards_returns_a_copy():
+    state = State()
+    board_id = state.add_board("board", "user")["id"]
+    state.get_user_boards("user").clear()
+    assert state.get_user_boards("user") == {board_id: "creator"}
+    assert not state.update_member_role(board_id, "stranger", "viewer")
+    assert state.get_user_boards("stranger") == {}
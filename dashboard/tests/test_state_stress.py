@@ -0,0 +1,144 @@
+"""Стресс-тест State: много досок и потоков, мутации вперемешку с чтениями и снимками."""
+import asyncio
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.persistence import StatePersistence
+from services.state import State
+
+THREADS = 16
+WORKERS = 32
+OPS_PER_WORKER = 2000
+BOARDS = 200
+USERS = 50
+COLORS = [f"c{i}" for i in range(40)]
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    # потоки переключаются почти на каждой инструкции, а не раз в 5 мс
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _sticker(board_id: str, rnd: random.Random) -> dict:
+    return {
+        "dashboard_id": board_id,
+        "x": rnd.uniform(-1e4, 1e4),
+        "y": rnd.uniform(-1e4, 1e4),
+        "text": "t",
+        "width": 50,
+        "height": 50,
+        "color": rnd.choice(COLORS),
+    }
+
+
+@pytest.mark.parametrize("sticker_store", ["dict", "compact"])
+def test_many_boards_stay_consistent(tmp_path, sticker_store):
+    state = State(sticker_store=sticker_store)
+    persistence = StatePersistence(state, str(tmp_path), fsync_interval=0.01)
+    persistence.open()
+    users = [state.create_user(f"u{i}@x.io", "hash")["id"] for i in range(USERS)]
+    boards = [state.add_board(f"b{i}", users[i % USERS])["id"] for i in range(BOARDS)]
+
+    def worker(seed: int) -> None:
+        rnd = random.Random(seed)
+        mine = []
+        for _ in range(OPS_PER_WORKER):
+            board_id = rnd.choice(boards)
+            op = rnd.random()
+            if op < 0.4:
+                mine.append(state.add_sticker(board_id, _sticker(board_id, rnd))["id"])
+            elif op < 0.6 and mine:
+                state.update_sticker(rnd.choice(mine), {"x": rnd.uniform(-1e4, 1e4), "color": rnd.choice(COLORS)})
+            elif op < 0.7 and mine:
+                state.remove_sticker(mine.pop(rnd.randrange(len(mine))))
+            elif op < 0.85:
+                state.set_member_role(board_id, rnd.choice(users), rnd.choice(["editor", "viewer"]))
+            elif op < 0.95:
+                user_id = rnd.choice(users)
+                if user_id != state.boards[board_id]["creator_id"]:
+                    state.remove_member(board_id, user_id)
+            else:
+                state.query_stickers(board_id, -500, -500, 500, 500)
+                state.get_user_boards(rnd.choice(users))
+                state.get_board_stickers(board_id)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        snapshots = pool.submit(lambda: [asyncio.run(persistence.snapshot()) for _ in range(3)])
+        list(pool.map(worker, range(WORKERS)))
+        snapshots.result()
+
+    total = 0
+    for board_id, board in state.boards.items():
+        sticker_ids = set(board["stickers"])
+        assert len(sticker_ids) == len(board["stickers"])
+        total += len(sticker_ids)
+        grid = state.sticker_grids[board_id]
+        assert len(grid) == len(sticker_ids)
+        assert set(grid.query(-1e9, -1e9, 1e9, 1e9)) == sticker_ids
+        for sticker_id in sticker_ids:
+            assert state.stickers[sticker_id]["dashboard_id"] == board_id
+        for user_id, role in board["members"].items():
+            assert state.memberships[user_id][board_id] == role
+        # журнал изменений — подряд идущие версии, последняя — текущая версия доски
+        log = state.change_logs.get(board_id, ())
+        assert [entry[0] for entry in log] == list(range(board["version"] - len(log) + 1, board["version"] + 1))
+    assert total == len(state.stickers)
+    assert sum(map(len, state.memberships.values())) == sum(len(board["members"]) for board in state.boards.values())
+
+    # снимок, сделанный посреди мутаций, плюс хвост журнала дают то же состояние
+    persistence.close()
+    restored = State(sticker_store=sticker_store)
+    StatePersistence(restored, str(tmp_path)).open()
+    assert {board_id: board["members"] for board_id, board in restored.boards.items()} == {
+        board_id: board["members"] for board_id, board in state.boards.items()
+    }
+    assert {sticker_id: restored.stickers[sticker_id] for sticker_id in restored.stickers} == {
+        sticker_id: state.stickers[sticker_id] for sticker_id in state.stickers
+    }
+
+
+def test_one_board_is_linearizable():
+    state = State()
+    owner = state.create_user("owner@x.io", "hash")["id"]
+    board = state.add_board("b", owner)
+
+    def worker(seed: int) -> tuple:
+        rnd = random.Random(seed)
+        mine = []
+        added = applied = 0
+        for _ in range(OPS_PER_WORKER):
+            op = rnd.random()
+            if op < 0.5 or not mine:
+                mine.append(state.add_sticker(board["id"], _sticker(board["id"], rnd))["id"])
+                added += 1
+                applied += 1
+            elif op < 0.75:
+                applied += state.update_sticker(rnd.choice(mine), {"x": rnd.random()}) is not None
+            elif op < 0.95:
+                removed = state.remove_sticker(mine.pop(rnd.randrange(len(mine))))
+                added -= removed
+                applied += removed
+            else:
+                state.get_board_stickers(board["id"])
+                state.query_stickers(board["id"], -500, -500, 500, 500)
+        return added, applied
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(worker, range(THREADS)))
+    added = sum(result[0] for result in results)
+    applied = sum(result[1] for result in results)
+
+    # ни одна вставка или удаление не потерялись и не применились дважды
+    sticker_ids = set(board["stickers"])
+    assert len(sticker_ids) == len(board["stickers"]) == added
+    assert sticker_ids == set(state.stickers)
+    assert set(state.sticker_grids[board["id"]].query(-1e9, -1e9, 1e9, 1e9)) == sticker_ids
+    # каждая применённая мутация увеличила версию доски ровно на один
+    assert board["version"] == applied
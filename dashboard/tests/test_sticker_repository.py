@@ -0,0 +1,55 @@
+"""Записи репозиториев: проверка прав внутри самого UPDATE/DELETE/INSERT."""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from models.user_role import UserRole
+from repository.dashboard_repository import DashboardRepository
+from repository.dashboard_role_repository import DashboardRoleRepository
+from repository.exceptions.incorrect_role_exception import IncorrectRoleException
+from repository.exceptions.not_find_role_exception import NotFoundRoleException
+from repository.sticker_repository import StickerRepository
+
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def test_writes_check_roles_in_one_statement(database):
+    roles = DashboardRoleRepository()
+    dashboards = DashboardRepository(roles)
+    stickers = StickerRepository(roles)
+    owner, viewer, stranger = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    async def scenario():
+        async with database() as sessions:
+            async with sessions() as session, session.begin():
+                dashboard, _ = await dashboards.create_dashboard(session, "board", owner)
+                await roles.invite_user(session, dashboard.id, owner, viewer, UserRole.VIEWER)
+            statements = []
+            async with sessions() as session, session.begin():
+                event.listen(session.bind.sync_engine, "before_cursor_execute", lambda *_: statements.append(1))
+                sticker = await stickers.create_sticker(session, dashboard.id, owner, **STICKER)
+                updated = await stickers.update_sticker(session, sticker.id, owner, x=5.0)
+                member = await roles.update_user_role(session, dashboard.id, owner, viewer, UserRole.EDITOR)
+                assert updated.x == 5.0 and member.user_role == UserRole.EDITOR
+                assert len(statements) == 3
+
+                await roles.update_user_role(session, dashboard.id, owner, viewer, UserRole.VIEWER)
+                with pytest.raises(IncorrectRoleException):
+                    await stickers.update_sticker(session, sticker.id, viewer, x=9.0)
+                with pytest.raises(NotFoundRoleException):
+                    await stickers.delete_sticker(session, sticker.id, stranger)
+                with pytest.raises(IncorrectRoleException):
+                    await stickers.create_sticker(session, dashboard.id, viewer, **STICKER)
+                with pytest.raises(IncorrectRoleException):
+                    await roles.invite_user(session, dashboard.id, viewer, stranger, UserRole.EDITOR)
+                # создателя удалить нельзя, даже ему самому
+                assert not await roles.remove_user_role(session, dashboard.id, owner, owner)
+
+                assert await stickers.update_sticker(session, uuid.uuid4(), owner, x=1.0) is None
+                assert (await stickers.get_sticker(session, sticker.id, dashboard.id, owner)).x == 5.0
+                assert await stickers.delete_sticker(session, sticker.id, owner) == dashboard.id
+                assert await roles.remove_user_role(session, dashboard.id, owner, viewer)
+
+    asyncio.run(scenario())
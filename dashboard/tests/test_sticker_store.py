@@ -0,0 +1,63 @@
+"""Хранилища стикеров: compact ведёт себя так же, как dict."""
+import pickle
+import random
+from copy import copy
+
+import pytest
+
+from services.sticker_store import STICKER_STORES, CompactStickerStore, DictStickerStore
+
+COLORS = ["#fff", "#ffcc00", "#03a9f4"]
+
+
+def _sticker(sticker_id: str, board_id: str, rnd: random.Random) -> dict:
+    return {
+        "id": sticker_id,
+        "dashboard_id": board_id,
+        "x": rnd.uniform(-100, 100),
+        "y": rnd.uniform(-100, 100),
+        "text": f"text {sticker_id}",
+        "width": 10.0,
+        "height": 20.0,
+        "color": rnd.choice(COLORS),
+    }
+
+
+def test_compact_matches_dict():
+    rnd = random.Random(3)
+    reference, compact = DictStickerStore(), CompactStickerStore()
+    for step in range(2000):
+        op = rnd.random()
+        if op < 0.5 or not reference:
+            sticker = _sticker(f"s{step}", f"b{rnd.randrange(5)}", rnd)
+            assert compact.add(dict(sticker)) == reference.add(sticker)
+        elif op < 0.8:
+            sticker_id = rnd.choice(list(reference))
+            data = {"x": rnd.uniform(-100, 100), "color": rnd.choice(COLORS), "text": "edited"}
+            assert compact.update(sticker_id, data) == reference.update(sticker_id, data)
+        else:
+            sticker_id = rnd.choice(list(reference))
+            assert compact.remove(sticker_id) == reference.remove(sticker_id)
+    assert dict(compact) == dict(reference)
+    assert all(compact.board_of(sid) == reference.board_of(sid) for sid in reference)
+    assert compact.update("missing", {"x": 1.0}) is None
+    assert compact.remove("missing") is None
+
+
+@pytest.mark.parametrize("kind", STICKER_STORES)
+def test_copy_and_pickle_are_independent(kind):
+    rnd = random.Random(1)
+    store = STICKER_STORES[kind]()
+    for i in range(10):
+        store.add(_sticker(f"s{i}", "board", rnd))
+    clone = copy(store)
+    restored = pickle.loads(pickle.dumps(store))
+    before = dict(store)
+
+    store.update("s0", {"x": 500.0, "color": "#000"})
+    store.remove("s1")
+    store.add(_sticker("new", "board", rnd))
+    assert dict(clone) == before
+    assert dict(restored) == before
+    restored.add(_sticker("after-restore", "other", rnd))
+    assert restored["after-restore"]["color"] in COLORS
@@ -0,0 +1,81 @@
+"""JwtVerifier: проверка токенов AuthServer и LRU-кэш проверенных."""
+import time
+import uuid
+
+import jwt
+
+from core.token_verifier import JwtVerifier
+
+SECRET = "417ade868311a033a49979c3d4b46e3e"
+
+
+def _verifier(**kwargs) -> JwtVerifier:
+    return JwtVerifier(SECRET, issuer="AuthService", audience="AuthServiceUsers", **kwargs)
+
+
+def _token(secret: str = SECRET, **claims) -> str:
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "email": "user@example.com",
+        "iss": "AuthService",
+        "aud": "AuthServiceUsers",
+        "exp": int(time.time()) + 3600,
+        **claims,
+    }
+    return jwt.encode({key: value for key, value in payload.items() if value is not None}, secret, algorithm="HS256")
+
+
+def test_valid_token_is_verified_once_then_cached():
+    verifier = _verifier()
+    user_id = str(uuid.uuid4())
+    token = _token(sub=user_id)
+
+    assert verifier.verify(token) == {"id": user_id, "email": "user@example.com"}
+    assert verifier.verify(token) == {"id": user_id, "email": "user@example.com"}
+    assert verifier.stats() == {"cached": 1, "hits": 1, "misses": 1, "rejected": 0}
+
+
+def test_dotnet_nameid_claim_is_accepted():
+    user_id = str(uuid.uuid4())
+    assert _verifier().verify(_token(sub=None, nameid=user_id.upper()))["id"] == user_id
+
+
+def test_bad_tokens_are_rejected():
+    verifier = _verifier()
+    rejected = [
+        _token(secret="other-secret"),
+        _token(iss="Someone"),
+        _token(aud="Others"),
+        _token(exp=int(time.time()) - 10),
+        _token(exp=None),
+        _token(sub=None),
+        # id не UUID: дальше репозитории ответили бы 500
+        _token(sub="42"),
+        "not.a.token",
+    ]
+    for token in rejected:
+        assert verifier.verify(token) is None, token
+    assert verifier.stats()["rejected"] == len(rejected)
+    assert verifier.stats()["cached"] == 0
+
+
+def test_cached_token_expires():
+    verifier = _verifier()
+    expires_at = int(time.time()) + 1
+    token = _token(exp=expires_at)
+    assert verifier.verify(token) is not None
+    time.sleep(expires_at - time.time() + 0.05)
+    assert verifier.verify(token) is None
+    assert verifier.stats()["cached"] == 0
+
+
+def test_cache_keeps_recent_tokens():
+    verifier = _verifier(cache_size=2)
+    first, second, third = _token(), _token(), _token()
+    for token in (first, second, first, third):
+        verifier.verify(token)
+    verifier.verify(first)
+    verifier.verify(second)
+    # second вытеснен третьим токеном, first оставался свежим
+    assert verifier.stats()["hits"] == 2
+    assert verifier.stats()["misses"] == 4
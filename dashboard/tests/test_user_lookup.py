@@ -0,0 +1,46 @@
+"""Поиск пользователя по нормализованному email: UserStore и индекс lower(email) в SQL."""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from services.auth import AuthDbContext, Base, UserFields
+from services.user_store import UserStore
+
+
+def test_user_store_ignores_case_and_spaces():
+    users = UserStore()
+    user = {"id": "1", "email": "User@Example.com", "password_hash": ""}
+    users.add(user)
+    assert users.get_by_email("  user@EXAMPLE.COM ") is user
+    assert users.exists("USER@example.com")
+    assert users.get_by_email("other@example.com") is None
+    with pytest.raises(ValueError):
+        users.add({"id": "2", "email": "user@example.com ", "password_hash": ""})
+    assert len(users) == 1
+
+
+def test_sql_lookup_uses_lower_email_index():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    context = AuthDbContext(Session(engine))
+
+    async def scenario():
+        context.users_add(UserFields(id=uuid.uuid4(), email="User@Example.com", password_hash=""))
+        await context.save_changes_async()
+        assert (await context.users_find_by_email_async(" USER@example.com")).email == "User@Example.com"
+        assert await context.users_exists_by_email_async("user@example.com")
+        assert not await context.users_exists_by_email_async("other@example.com")
+
+    asyncio.run(scenario())
+    with Session(engine) as session:
+        plan = session.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM users WHERE lower(email) = :email"), {"email": "x"}
+        ).all()
+        assert "ix_users_email_lower" in plan[-1][-1]
+        # уникальность тоже без учёта регистра
+        with pytest.raises(IntegrityError):
+            session.execute(text("INSERT INTO users (id, email, password_hash) VALUES ('x', 'USER@example.com', '')"))
@@ -0,0 +1,83 @@
+"""StickerWriteBuffer: схлопывание изменений, запись пачкой и предел буфера."""
+import asyncio
+import uuid
+
+import pytest
+
+from exceptions import ServiceUnavailableException
+from repository.write_buffer import StickerWriteBuffer
+from services.backend.repository_backend import RepositoryBackend
+
+USER = str(uuid.uuid4())
+STICKER = {"x": 0.0, "y": 0.0, "text": "note", "width": 100.0, "height": 80.0, "color": "#ffcc00"}
+
+
+def _backend(session, buffer=None) -> RepositoryBackend:
+    backend = RepositoryBackend(session=session)
+    backend.buffer = buffer
+    backend.group = None
+    return backend
+
+
+def test_moves_are_coalesced_and_flushed_in_one_write(database):
+    async def scenario():
+        async with database() as sessions:
+            async with sessions() as session, session.begin():
+                backend = _backend(session)
+                board = await backend.create_board(USER, "b")
+                sticker = await backend.create_sticker(USER, {**STICKER, "dashboard_id": board["id"]})
+            buffer = StickerWriteBuffer(sessions, flush_interval=60, max_size=100)
+            for x in range(1, 4):
+                async with sessions() as session, session.begin():
+                    await _backend(session, buffer).update_sticker(sticker["id"], USER, {"x": float(x)})
+
+            async with sessions() as session:
+                buffered = await _backend(session, buffer).get_board(board["id"], USER)
+                stored = await _backend(session).get_board(board["id"], USER)
+            assert buffered["version"] == stored["version"] + 3
+            assert buffered["stickers"][0]["x"] == 3.0
+            assert stored["stickers"][0]["x"] == 0.0
+            assert buffer.stats()["coalesced"] == 2 and len(buffer) == 1
+
+            # текст, изменённый в обход буфера, сброс не затирает: пишутся только изменённые колонки
+            async with sessions() as session, session.begin():
+                await _backend(session).update_sticker(sticker["id"], USER, {"text": "edited"})
+            await buffer.close()
+
+            async with sessions() as session:
+                flushed = await _backend(session).get_board(board["id"], USER)
+            assert flushed["version"] == buffered["version"] + 1
+            assert flushed["stickers"][0]["x"] == 3.0
+            assert flushed["stickers"][0]["text"] == "edited"
+            assert buffer.stats()["rows"] == 1 and len(buffer) == 0
+
+    asyncio.run(scenario())
+
+
+def test_buffer_stops_growing_while_flushes_fail():
+    def database_down():
+        raise ConnectionRefusedError("database is down")
+
+    def values(sticker_id: uuid.UUID) -> dict:
+        return {"id": sticker_id, "dashboard_id": board_id, **STICKER}
+
+    board_id = uuid.uuid4()
+    stickers = [uuid.uuid4() for _ in range(4)]
+
+    async def scenario():
+        buffer = StickerWriteBuffer(database_down, flush_interval=60, max_size=2, max_pending=3)
+        for sticker_id in stickers[:3]:
+            await buffer.put(values(sticker_id), {"x": 1.0})
+        with pytest.raises(ServiceUnavailableException):
+            await buffer.put(values(stickers[3]), {"x": 1.0})
+        # стикер уже в буфере: изменение схлопывается и места не требует
+        await buffer.put(values(stickers[0]), {"x": 2.0})
+        buffer._flusher.cancel()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert len(buffer) == 3
+    assert buffer.get(stickers[0])["x"] == 2.0
+    # после неудачного сброса запросы не повторяют его каждый раз
+    assert buffer.stats()["errors"] == 1
+    assert buffer.stats()["rejected"] == 1